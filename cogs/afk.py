@@ -4,14 +4,34 @@ Allows users to set AFK status with custom reasons and auto-responds to mentions
 """
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import aiosqlite
 import asyncio
+import heapq
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Optional, Dict, cast, Union
+from typing import Optional, Dict, Tuple, cast, Union
 from pathlib import Path
 
+from utils.guild_settings import AfkSettings, get_settings
+
+MENTION_FLUSH_INTERVAL = 60  # Seconds between batched writes of mention counts and expiry purges
+DEFAULT_AFK_REASON = "No reason provided"
+AFK_NOTICE_COOLDOWN = 120  # Seconds before the same AFK user is announced again in a channel
+AFK_NOTICE_MAX_USERS = 10  # AFK users listed in one combined reply
+
+
+class AfkRecord:
+    """One member's AFK status in one guild; the (guild_id, user_id) key lives in the index"""
+    __slots__ = ("reason", "since", "mentions")
+
+    def __init__(self, reason: Optional[str], since: int, mentions: int = 0):
+        self.reason = reason  # None when no reason was given
+        self.since = since  # Unix time the status was set
+        self.mentions = mentions
+
 
 class AFKSystem(commands.Cog):
     """AFK System for automatic away message responses"""
@@ -19,16 +39,41 @@ class AFKSystem(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.database_path = Path("data/afk.db")
-        self.afk_cache: Dict[int, Dict] = {}  # Cache for quick lookups
-        self.ignored_channels_cache: set[int] = set() # Cache for ignored channels
+        # guild_id -> user_id -> AfkRecord; authoritative for mention counts
+        self.afk_by_guild: Dict[int, Dict[int, AfkRecord]] = {}
+        self.dirty_mentions: set[Tuple[int, int]] = set()  # (guild_id, user_id) with unsaved mention counts
+        # (channel_id, afk_user_id) -> expiry; a fixed TTL keeps insertion order equal to expiry order
+        self.recent_notices: "OrderedDict[Tuple[int, int], float]" = OrderedDict()
+        self.settings = get_settings(bot)  # Ignored channels per guild live in the "afk" section
         self.ready = asyncio.Event()
         
+        # Optional per-guild maximum AFK duration: (expires_at, guild_id, user_id, since) min-heap
+        self._expiry_heap: list = []
+        self._expiry_wakeup = asyncio.Event()
+        self._expiry_task: Optional[asyncio.Task] = None
+        self._expiry_limits: Dict[int, int] = {}  # guild_id -> max_afk_hours the heap was scheduled with
+        self.pending_purge: list = []  # (guild_id, user_id, since) evicted but still on disk
+        
     async def cog_load(self):
         """Initialize the AFK system when the cog loads"""
         await self.init_database()
         await self.load_afk_cache()
         await self.load_ignored_channels()
+        self.settings.subscribe("afk", self._on_settings_changed)
+        for guild_id in self.afk_by_guild:
+            self._schedule_guild_expiry(guild_id)
         self.ready.set()
+        self.flush_pending_writes.start()
+        self._expiry_task = asyncio.create_task(self._expiry_loop())
+        
+    async def cog_unload(self):
+        """Persist pending mention counts and purges before the cog goes away"""
+        self.flush_pending_writes.cancel()
+        self.settings.unsubscribe("afk", self._on_settings_changed)
+        if self._expiry_task:
+            self._expiry_task.cancel()
+        await self.save_mention_counts()
+        await self.purge_expired()
         
     async def init_database(self):
         """Initialize the AFK database"""
@@ -36,13 +81,21 @@ class AFKSystem(commands.Cog):
         self.database_path.parent.mkdir(exist_ok=True)
         
         async with aiosqlite.connect(self.database_path) as db:
+            await self._migrate_afk_users(db)
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS afk_users (
-                    user_id INTEGER PRIMARY KEY,
                     guild_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
                     reason TEXT,
-                    set_time TEXT NOT NULL,
-                    mention_count INTEGER DEFAULT 0
+                    set_time INTEGER NOT NULL,
+                    mention_count INTEGER DEFAULT 0,
+                    PRIMARY KEY (guild_id, user_id)
+                )
+            """)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS afk_guild_settings (
+                    guild_id INTEGER PRIMARY KEY,
+                    max_afk_hours INTEGER
                 )
             """)
             await db.execute("""
@@ -53,97 +106,276 @@ class AFKSystem(commands.Cog):
             """)
             await db.commit()
 
+    async def _migrate_afk_users(self, db: aiosqlite.Connection):
+        """Move the old user-keyed table (ISO set_time) to the guild-scoped layout"""
+        # A leftover afk_users_old means an earlier migration stopped after the rename
+        cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'afk_users_old'")
+        resuming = await cursor.fetchone() is not None
+        if not resuming:
+            cursor = await db.execute("PRAGMA table_info(afk_users)")
+            columns = {row[1]: row for row in await cursor.fetchall()}
+            if not columns or columns["guild_id"][5] != 0:
+                return  # No table yet, or guild_id is already part of the primary key
+        
+        source = "afk_users_old" if resuming else "afk_users"
+        cursor = await db.execute(f"SELECT guild_id, user_id, reason, set_time, mention_count FROM {source}")
+        rows = []
+        for guild_id, user_id, reason, set_time, mention_count in await cursor.fetchall():
+            try:
+                since = int(datetime.fromisoformat(set_time).timestamp())
+            except (TypeError, ValueError):
+                since = int(time.time())
+            reason = None if reason == DEFAULT_AFK_REASON else reason
+            rows.append((guild_id, user_id, reason, since, mention_count or 0))
+        
+        # One transaction, so a crash leaves either the old table or the finished migration
+        await db.execute("BEGIN")
+        if not resuming:
+            await db.execute("ALTER TABLE afk_users RENAME TO afk_users_old")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS afk_users (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                reason TEXT,
+                set_time INTEGER NOT NULL,
+                mention_count INTEGER DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id)
+            )
+        """)
+        # Users who went AFK since an interrupted migration keep their newer entry
+        await db.executemany("INSERT OR IGNORE INTO afk_users VALUES (?, ?, ?, ?, ?)", rows)
+        await db.execute("DROP TABLE afk_users_old")
+        await db.commit()
+        print(f"Migrated {len(rows)} AFK users to guild-scoped storage")
+
     async def load_ignored_channels(self):
-        """Load ignored channels into cache"""
+        """Load ignored channels and expiry limits into the settings service, grouped by guild"""
+        ignored: Dict[int, set] = {}
+        max_hours: Dict[int, int] = {}
         async with aiosqlite.connect(self.database_path) as db:
-            cursor = await db.execute("SELECT channel_id FROM ignored_channels")
+            cursor = await db.execute("SELECT guild_id, channel_id FROM ignored_channels")
             rows = await cursor.fetchall()
-            self.ignored_channels_cache = {row[0] for row in rows}
+            for guild_id, channel_id in rows:
+                ignored.setdefault(guild_id, set()).add(channel_id)
+            cursor = await db.execute("SELECT guild_id, max_afk_hours FROM afk_guild_settings")
+            max_hours = dict(await cursor.fetchall())
+        self._expiry_limits = {guild_id: hours for guild_id, hours in max_hours.items() if hours}
+        records = {
+            guild_id: AfkSettings(ignored.get(guild_id, ()), max_hours.get(guild_id))
+            for guild_id in ignored.keys() | max_hours.keys()
+        }
+        self.settings.register("afk", records, AfkSettings(), self._save_afk_settings)
+
+    async def _save_afk_settings(self, guild_id: int, old: Optional[AfkSettings], new: AfkSettings,
+                                 updated_by: Optional[int]):
+        """Write only the ignored channels that were added or removed"""
+        before = old.ignored_channels if old else frozenset()
+        async with aiosqlite.connect(self.database_path) as db:
+            for channel_id in before - new.ignored_channels:
+                await db.execute("DELETE FROM ignored_channels WHERE channel_id = ?", (channel_id,))
+            for channel_id in new.ignored_channels - before:
+                await db.execute(
+                    "INSERT OR REPLACE INTO ignored_channels (channel_id, guild_id) VALUES (?, ?)",
+                    (channel_id, guild_id)
+                )
+            if new.max_afk_hours != (old.max_afk_hours if old else None):
+                await db.execute(
+                    "INSERT OR REPLACE INTO afk_guild_settings (guild_id, max_afk_hours) VALUES (?, ?)",
+                    (guild_id, new.max_afk_hours)
+                )
+            await db.commit()
+
+    def get_ignored_channels(self, guild_id: int) -> frozenset:
+        return self.settings.get_or_default("afk", guild_id).ignored_channels
             
     async def load_afk_cache(self):
-        """Load all AFK users into cache for quick access"""
+        """Load all AFK users into the per-guild index"""
         async with aiosqlite.connect(self.database_path) as db:
-            cursor = await db.execute("SELECT user_id, guild_id, reason, set_time, mention_count FROM afk_users")
+            cursor = await db.execute("SELECT guild_id, user_id, reason, set_time, mention_count FROM afk_users")
             rows = await cursor.fetchall()
             
-            for row in rows:
-                user_id, guild_id, reason, set_time, mention_count = row
-                self.afk_cache[user_id] = {
-                    'guild_id': guild_id,
-                    'reason': reason,
-                    'set_time': set_time,
-                    'mention_count': mention_count
-                }
+        for guild_id, user_id, reason, since, mentions in rows:
+            self.afk_by_guild.setdefault(guild_id, {})[user_id] = AfkRecord(reason, since, mentions or 0)
                 
     async def set_afk(self, user_id: int, guild_id: int, reason: Optional[str] = None):
-        """Set a user as AFK"""
-        current_time = datetime.now(timezone.utc).isoformat()
-        afk_reason = reason or "No reason provided"
+        """Set a user as AFK in one guild"""
+        since = int(time.time())
         
         async with aiosqlite.connect(self.database_path) as db:
             await db.execute("""
-                INSERT OR REPLACE INTO afk_users (user_id, guild_id, reason, set_time, mention_count)
+                INSERT OR REPLACE INTO afk_users (guild_id, user_id, reason, set_time, mention_count)
                 VALUES (?, ?, ?, ?, 0)
-            """, (user_id, guild_id, afk_reason, current_time))
+            """, (guild_id, user_id, reason, since))
             await db.commit()
             
         # Update cache
-        self.afk_cache[user_id] = {
-            'guild_id': guild_id,
-            'reason': afk_reason,
-            'set_time': current_time,
-            'mention_count': 0
-        }
+        self.dirty_mentions.discard((guild_id, user_id))
+        record = AfkRecord(reason, since)
+        self.afk_by_guild.setdefault(guild_id, {})[user_id] = record
+        self._schedule_expiry(guild_id, user_id, record)
         
-    async def remove_afk(self, user_id: int):
-        """Remove a user from AFK status"""
+    async def remove_afk(self, user_id: int, guild_id: int):
+        """Remove a user's AFK status in one guild"""
         async with aiosqlite.connect(self.database_path) as db:
-            await db.execute("DELETE FROM afk_users WHERE user_id = ?", (user_id,))
+            await db.execute("DELETE FROM afk_users WHERE guild_id = ? AND user_id = ?", (guild_id, user_id))
             await db.commit()
             
         # Remove from cache
-        if user_id in self.afk_cache:
-            del self.afk_cache[user_id]
+        self._drop_from_cache(guild_id, user_id)
+        
+    def _drop_from_cache(self, guild_id: int, user_id: int) -> Optional[AfkRecord]:
+        self.dirty_mentions.discard((guild_id, user_id))
+        guild_afk = self.afk_by_guild.get(guild_id)
+        if guild_afk is None:
+            return None
+        record = guild_afk.pop(user_id, None)
+        if not guild_afk:
+            del self.afk_by_guild[guild_id]
+        return record
+        
+    def evict(self, guild_id: int, user_id: int):
+        """Drop an AFK status from memory now; the row is deleted by the next batched purge"""
+        record = self._drop_from_cache(guild_id, user_id)
+        if record:
+            self.pending_purge.append((guild_id, user_id, record.since))
+            
+    async def purge_expired(self):
+        """Delete every evicted AFK status from disk in one transaction"""
+        if not self.pending_purge:
+            return
+        rows, self.pending_purge = self.pending_purge, []
+        try:
+            async with aiosqlite.connect(self.database_path) as db:
+                # set_time keeps a status set again after eviction from being deleted
+                await db.executemany(
+                    "DELETE FROM afk_users WHERE guild_id = ? AND user_id = ? AND set_time = ?", rows
+                )
+                await db.commit()
+        except Exception as e:
+            self.pending_purge.extend(rows)
+            print(f"Failed to purge expired AFK statuses: {e}")
+            
+    def get_max_afk_seconds(self, guild_id: int) -> Optional[int]:
+        hours = self.settings.get_or_default("afk", guild_id).max_afk_hours
+        return hours * 3600 if hours else None
+        
+    def _schedule_expiry(self, guild_id: int, user_id: int, record: AfkRecord):
+        limit = self.get_max_afk_seconds(guild_id)
+        if not limit:
+            return
+        expires_at = record.since + limit
+        heapq.heappush(self._expiry_heap, (expires_at, guild_id, user_id, record.since))
+        if self._expiry_heap[0][0] == expires_at:
+            self._expiry_wakeup.set()
             
-    async def increment_mention_count(self, user_id: int):
-        """Increment the mention count for an AFK user"""
-        if user_id in self.afk_cache:
-            self.afk_cache[user_id]['mention_count'] += 1
+    def _schedule_guild_expiry(self, guild_id: int):
+        for user_id, record in self.afk_by_guild.get(guild_id, {}).items():
+            self._schedule_expiry(guild_id, user_id, record)
             
+    def _on_settings_changed(self, guild_id: int, settings: AfkSettings):
+        if settings.max_afk_hours == self._expiry_limits.get(guild_id):
+            return  # Only the ignored channels changed
+        if settings.max_afk_hours:
+            self._expiry_limits[guild_id] = settings.max_afk_hours
+        else:
+            self._expiry_limits.pop(guild_id, None)
+        # Entries pushed under an older limit no longer match and are skipped when popped
+        self._schedule_guild_expiry(guild_id)
+        
+    async def _expiry_loop(self):
+        while True:
+            self._expiry_wakeup.clear()
+            if not self._expiry_heap:
+                await self._expiry_wakeup.wait()
+                continue
+            
+            delay = self._expiry_heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._expiry_wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            expires_at, guild_id, user_id, since = heapq.heappop(self._expiry_heap)
+            record = self.get_afk_info(user_id, guild_id)
+            limit = self.get_max_afk_seconds(guild_id)
+            # Skip entries for statuses that were cleared, renewed, or scheduled under another limit
+            if record and record.since == since and limit and since + limit == expires_at:
+                self.evict(guild_id, user_id)
+            
+    def increment_mention_count(self, user_id: int, guild_id: int):
+        """Increment the mention count for an AFK user (written to disk by the next flush)"""
+        record = self.get_afk_info(user_id, guild_id)
+        if record:
+            record.mentions += 1
+            self.dirty_mentions.add((guild_id, user_id))
+            
+    async def save_mention_counts(self):
+        """Write every changed mention count in one transaction"""
+        if not self.dirty_mentions:
+            return
+        dirty, self.dirty_mentions = self.dirty_mentions, set()
+        rows = []
+        for guild_id, user_id in dirty:
+            record = self.get_afk_info(user_id, guild_id)
+            if record:
+                rows.append((record.mentions, guild_id, user_id, record.since))
+        try:
             async with aiosqlite.connect(self.database_path) as db:
-                await db.execute("""
-                    UPDATE afk_users SET mention_count = mention_count + 1 
-                    WHERE user_id = ?
-                """, (user_id,))
+                # set_time guards against overwriting a fresh AFK status set while this flush ran
+                await db.executemany(
+                    "UPDATE afk_users SET mention_count = ? WHERE guild_id = ? AND user_id = ? AND set_time = ?",
+                    rows
+                )
                 await db.commit()
+        except Exception as e:
+            # Keep them dirty so the next flush tries again
+            self.dirty_mentions |= {(guild_id, user_id) for _, guild_id, user_id, _ in rows}
+            print(f"Failed to save AFK mention counts: {e}")
+            
+    @tasks.loop(seconds=MENTION_FLUSH_INTERVAL)
+    async def flush_pending_writes(self):
+        await self.save_mention_counts()
+        await self.purge_expired()
                 
-    def is_afk(self, user_id: int) -> bool:
-        """Check if a user is currently AFK"""
-        return user_id in self.afk_cache
+    def is_afk(self, user_id: int, guild_id: int) -> bool:
+        """Check if a user is currently AFK in a guild"""
+        return user_id in self.afk_by_guild.get(guild_id, ())
         
-    def get_afk_info(self, user_id: int) -> Optional[Dict]:
-        """Get AFK information for a user"""
-        return self.afk_cache.get(user_id)
+    def get_afk_info(self, user_id: int, guild_id: int) -> Optional[AfkRecord]:
+        """Get a user's AFK record in a guild"""
+        guild_afk = self.afk_by_guild.get(guild_id)
+        return guild_afk.get(user_id) if guild_afk else None
         
-    def format_afk_duration(self, set_time_str: str) -> str:
-        """Format the AFK duration into a human-readable string"""
-        try:
-            set_time = datetime.fromisoformat(set_time_str)
-            current_time = datetime.now(timezone.utc)
-            duration = current_time - set_time
-            
-            days = duration.days
-            hours, remainder = divmod(duration.seconds, 3600)
-            minutes, _ = divmod(remainder, 60)
-            
-            if days > 0:
-                return f"{days}d {hours}h {minutes}m"
-            elif hours > 0:
-                return f"{hours}h {minutes}m"
-            else:
-                return f"{minutes}m"
-        except:
-            return "unknown time"
+    def should_notify(self, channel_id: int, user_id: int, now: float) -> bool:
+        """True unless this AFK user was announced in this channel within the cooldown; records the notice"""
+        # Drop expired entries from the front
+        while self.recent_notices:
+            key, expires = next(iter(self.recent_notices.items()))
+            if expires > now:
+                break
+            del self.recent_notices[key]
+        
+        key = (channel_id, user_id)
+        if key in self.recent_notices:
+            return False
+        self.recent_notices[key] = now + AFK_NOTICE_COOLDOWN
+        return True
+        
+    def format_afk_duration(self, since: int, now: Optional[float] = None) -> str:
+        """Format the time since a Unix timestamp into a human-readable string"""
+        elapsed = max(int((now or time.time()) - since), 0)
+        days, remainder = divmod(elapsed, 86400)
+        hours, remainder = divmod(remainder, 3600)
+        minutes = remainder // 60
+        
+        if days > 0:
+            return f"{days}d {hours}h {minutes}m"
+        elif hours > 0:
+            return f"{hours}h {minutes}m"
+        else:
+            return f"{minutes}m"
 
     @commands.hybrid_command(
         name="afk",
@@ -166,9 +398,8 @@ class AFKSystem(commands.Cog):
             return
             
         # Check if user is already AFK
-        was_afk = self.is_afk(ctx.author.id)
+        was_afk = self.is_afk(ctx.author.id, ctx.guild.id)
         if was_afk:
-            old_info = self.get_afk_info(ctx.author.id)
             action_text = "updated"
         else:
             action_text = "set"
@@ -196,7 +427,7 @@ class AFKSystem(commands.Cog):
         """Manually remove AFK status"""
         await self.ready.wait()
         
-        if not self.is_afk(ctx.author.id):
+        if not ctx.guild or not self.is_afk(ctx.author.id, ctx.guild.id):
             embed = discord.Embed(
                 description="You're not currently set as AFK.",
                 color=0x000000
@@ -205,8 +436,8 @@ class AFKSystem(commands.Cog):
             return
             
         # Get AFK info before removing
-        afk_info = self.get_afk_info(ctx.author.id)
-        await self.remove_afk(ctx.author.id)
+        afk_info = self.get_afk_info(ctx.author.id, ctx.guild.id)
+        await self.remove_afk(ctx.author.id, ctx.guild.id)
         
         # Create welcome back embed
         embed = discord.Embed(
@@ -215,8 +446,8 @@ class AFKSystem(commands.Cog):
         )
         
         if afk_info:
-            duration = self.format_afk_duration(afk_info['set_time'])
-            mention_count = afk_info['mention_count']
+            duration = self.format_afk_duration(afk_info.since)
+            mention_count = afk_info.mentions
             
             details = f"AFK Duration: {duration}"
             if mention_count > 0:
@@ -246,19 +477,12 @@ class AFKSystem(commands.Cog):
             await ctx.send(embed=embed, ephemeral=True)
             return
             
-        # Get AFK users in this guild
+        # Get AFK users in this guild straight from its index
         guild_afk_users = []
-        for user_id, afk_data in self.afk_cache.items():
-            if afk_data['guild_id'] == ctx.guild.id:
-                member = ctx.guild.get_member(user_id)
-                if member:  # Only include users still in the server
-                    duration = self.format_afk_duration(afk_data['set_time'])
-                    guild_afk_users.append({
-                        'member': member,
-                        'reason': afk_data['reason'],
-                        'duration': duration,
-                        'mentions': afk_data['mention_count']
-                    })
+        for user_id, record in self.afk_by_guild.get(ctx.guild.id, {}).items():
+            member = ctx.guild.get_member(user_id)
+            if member:  # Only include users still in the server
+                guild_afk_users.append((member, record))
                     
         if not guild_afk_users:
             embed = discord.Embed(
@@ -269,7 +493,7 @@ class AFKSystem(commands.Cog):
             return
             
         # Sort by AFK duration (longest first)
-        guild_afk_users.sort(key=lambda x: x['duration'], reverse=True)
+        guild_afk_users.sort(key=lambda item: item[1].since)
         
         # Create embed with AFK users
         embed = discord.Embed(
@@ -279,14 +503,12 @@ class AFKSystem(commands.Cog):
         )
         
         # Show up to 10 users
-        display_count = min(len(guild_afk_users), 10)
-        for i in range(display_count):
-            afk_user = guild_afk_users[i]
-            member = afk_user['member']
-            reason = afk_user['reason'][:100] if len(afk_user['reason']) > 100 else afk_user['reason']
+        now = time.time()
+        for member, record in guild_afk_users[:10]:
+            reason = (record.reason or DEFAULT_AFK_REASON)[:100]
             
             field_value = f"Reason: {reason}\n"
-            field_value += f"Duration: {afk_user['duration']} • Mentions: {afk_user['mentions']}"
+            field_value += f"Duration: {self.format_afk_duration(record.since, now)} • Mentions: {record.mentions}"
             
             embed.add_field(
                 name=member.display_name,
@@ -316,19 +538,16 @@ class AFKSystem(commands.Cog):
         channel_id = channel.id
         guild_id = ctx.guild.id
         
-        if channel_id in self.ignored_channels_cache:
+        ignored = self.get_ignored_channels(guild_id)
+        if channel_id in ignored:
             # Remove from ignore list
-            async with aiosqlite.connect(self.database_path) as db:
-                await db.execute("DELETE FROM ignored_channels WHERE channel_id = ?", (channel_id,))
-                await db.commit()
-            self.ignored_channels_cache.remove(channel_id)
+            await self.settings.update("afk", guild_id, updated_by=ctx.author.id,
+                                       ignored_channels=ignored - {channel_id})
             await ctx.send(f"✅ AFK mentions are now **enabled** in {channel.mention}")
         else:
             # Add to ignore list
-            async with aiosqlite.connect(self.database_path) as db:
-                await db.execute("INSERT INTO ignored_channels (channel_id, guild_id) VALUES (?, ?)", (channel_id, guild_id))
-                await db.commit()
-            self.ignored_channels_cache.add(channel_id)
+            await self.settings.update("afk", guild_id, updated_by=ctx.author.id,
+                                       ignored_channels=ignored | {channel_id})
             await ctx.send(f"🚫 AFK mentions are now **disabled** in {channel.mention}")
 
     @commands.command(name="afkignored", help="List channels where AFK mentions are ignored")
@@ -341,7 +560,7 @@ class AFKSystem(commands.Cog):
             return
 
         ignored_channels = []
-        for channel_id in self.ignored_channels_cache:
+        for channel_id in self.get_ignored_channels(ctx.guild.id):
             channel = ctx.guild.get_channel(channel_id)
             if channel:
                 ignored_channels.append(channel.mention)
@@ -351,6 +570,34 @@ class AFKSystem(commands.Cog):
         else:
             await ctx.send(f"AFK mentions are ignored in: {', '.join(ignored_channels)}")
 
+    @commands.command(name="afkexpire", help="Set how many hours AFK statuses last in this server (0 = forever)")
+    @commands.has_permissions(manage_guild=True)
+    @commands.guild_only()
+    async def afk_expire(self, ctx: commands.Context, hours: Optional[int] = None):
+        """View or set the maximum AFK duration for this server"""
+        await self.ready.wait()
+        
+        if not ctx.guild:
+            return
+        
+        if hours is None:
+            current = self.settings.get_or_default("afk", ctx.guild.id).max_afk_hours
+            if current:
+                await ctx.send(f"AFK statuses in this server expire after **{current}h**.")
+            else:
+                await ctx.send("AFK statuses in this server never expire.")
+            return
+        
+        if hours < 0 or hours > 24 * 365:
+            await ctx.send("Hours must be between 0 and 8760.")
+            return
+        
+        await self.settings.update("afk", ctx.guild.id, updated_by=ctx.author.id, max_afk_hours=hours or None)
+        if hours:
+            await ctx.send(f"✅ AFK statuses in this server now expire after **{hours}h**.")
+        else:
+            await ctx.send("✅ AFK statuses in this server no longer expire.")
+
     @commands.command(name="afkreset", help="Reset AFK status for a user (Admin only)")
     @commands.has_permissions(manage_messages=True)
     @commands.guild_only()
@@ -358,11 +605,11 @@ class AFKSystem(commands.Cog):
         """Reset AFK status for a user"""
         await self.ready.wait()
         
-        if not self.is_afk(member.id):
+        if not self.is_afk(member.id, ctx.guild.id):
             await ctx.send(f"{member.display_name} is not AFK.")
             return
             
-        await self.remove_afk(member.id)
+        await self.remove_afk(member.id, ctx.guild.id)
         await ctx.send(f"✅ Reset AFK status for {member.display_name}")
 
     @commands.command(name="afkclear", help="Clear AFK status for a user (Admin only)")
@@ -372,6 +619,12 @@ class AFKSystem(commands.Cog):
         """Clear AFK status for a user (Alias for reset)"""
         await self.afk_reset(ctx, member)
 
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        """Forget the AFK status of members who leave"""
+        if self.ready.is_set():
+            self.evict(member.guild.id, member.id)
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         """Handle messages to check for AFK users and auto-return"""
@@ -386,69 +639,82 @@ class AFKSystem(commands.Cog):
         await self.ready.wait()
         
         # Check if the message author is AFK and should be returned
-        if self.is_afk(message.author.id):
-            afk_info = self.get_afk_info(message.author.id)
-            if afk_info:
-                duration = self.format_afk_duration(afk_info['set_time'])
-                mention_count = afk_info['mention_count']
-                
-                # Remove from AFK
-                await self.remove_afk(message.author.id)
-                
-                # Send welcome back message
-                embed = discord.Embed(
-                    description=f"**{message.author.display_name}** is no longer AFK",
-                    color=0x000000
-                )
-                footer_text = f"Was AFK for {duration}"
-                if mention_count > 0:
-                    footer_text += f" • {mention_count} mentions received"
-                embed.set_footer(text=footer_text)
+        afk_info = self.get_afk_info(message.author.id, message.guild.id)
+        if afk_info:
+            duration = self.format_afk_duration(afk_info.since)
+            mention_count = afk_info.mentions
+            
+            # Remove from AFK
+            await self.remove_afk(message.author.id, message.guild.id)
+            
+            # Send welcome back message
+            embed = discord.Embed(
+                description=f"**{message.author.display_name}** is no longer AFK",
+                color=0x000000
+            )
+            footer_text = f"Was AFK for {duration}"
+            if mention_count > 0:
+                footer_text += f" • {mention_count} mentions received"
+            embed.set_footer(text=footer_text)
+            
+            try:
+                await message.channel.send(embed=embed, delete_after=10)
+            except:
+                pass  # Ignore if we can't send messages
                 
-                try:
-                    await message.channel.send(embed=embed, delete_after=10)
-                except:
-                    pass  # Ignore if we can't send messages
-                    
         # Check for mentions of AFK users
         if message.mentions:
             # Check if channel is ignored
-            if message.channel.id in self.ignored_channels_cache:
+            if message.channel.id in self.get_ignored_channels(message.guild.id):
                 return
 
+            now = time.time()
+            to_announce = []
             for mentioned_user in message.mentions:
                 # Skip if mentioning themselves
                 if mentioned_user.id == message.author.id:
                     continue
                     
-                if self.is_afk(mentioned_user.id):
-                    afk_info = self.get_afk_info(mentioned_user.id)
-                    if afk_info and afk_info['guild_id'] == message.guild.id:
-                        # Increment mention count
-                        await self.increment_mention_count(mentioned_user.id)
-                        
-                        # Create AFK response
-                        duration = self.format_afk_duration(afk_info['set_time'])
-                        reason = afk_info['reason']
-                        
-                        if reason and reason != "No reason provided":
-                            description = f"**{mentioned_user.display_name}** is currently AFK: {reason[:150]}"
-                        else:
-                            description = f"**{mentioned_user.display_name}** is currently AFK"
-                        
-                        embed = discord.Embed(
-                            description=description,
-                            color=0x000000
-                        )
-                        embed.set_footer(text=f"AFK for {duration} • {afk_info['mention_count'] + 1} mentions")
-                        
-                        try:
-                            await message.channel.send(embed=embed, delete_after=15)
-                        except:
-                            pass  # Ignore if we can't send messages
-                        
-                        # Only respond once per message, even if multiple AFK users are mentioned
-                        break
+                afk_info = self.get_afk_info(mentioned_user.id, message.guild.id)
+                if afk_info:
+                    # Every mention counts, even when the notice itself is suppressed
+                    self.increment_mention_count(mentioned_user.id, message.guild.id)
+                    if self.should_notify(message.channel.id, mentioned_user.id, now):
+                        to_announce.append((mentioned_user, afk_info))
+            
+            if not to_announce:
+                return
+            
+            # One reply for every AFK user mentioned in this message
+            if len(to_announce) == 1:
+                mentioned_user, afk_info = to_announce[0]
+                reason = afk_info.reason
+                if reason and reason != DEFAULT_AFK_REASON:
+                    description = f"**{mentioned_user.display_name}** is currently AFK: {reason[:150]}"
+                else:
+                    description = f"**{mentioned_user.display_name}** is currently AFK"
+                embed = discord.Embed(description=description, color=0x000000)
+                embed.set_footer(text=f"AFK for {self.format_afk_duration(afk_info.since, now)} • {afk_info.mentions} mentions")
+            else:
+                lines = []
+                for mentioned_user, afk_info in to_announce[:AFK_NOTICE_MAX_USERS]:
+                    line = f"**{mentioned_user.display_name}**"
+                    if afk_info.reason and afk_info.reason != DEFAULT_AFK_REASON:
+                        line += f": {afk_info.reason[:100]}"
+                    line += f" • {self.format_afk_duration(afk_info.since, now)}, {afk_info.mentions} mentions"
+                    lines.append(line)
+                if len(to_announce) > AFK_NOTICE_MAX_USERS:
+                    lines.append(f"...and {len(to_announce) - AFK_NOTICE_MAX_USERS} more")
+                embed = discord.Embed(
+                    title=f"{len(to_announce)} mentioned users are AFK",
+                    description="\n".join(lines),
+                    color=0x000000
+                )
+            
+            try:
+                await message.channel.send(embed=embed, delete_after=15)
+            except:
+                pass  # Ignore if we can't send messages
 
 
 async def setup(bot: commands.Bot):
@@ -1,241 +1,257 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import aiosqlite
 from utils.codebuddy_database import DB_PATH
-import ast
-import operator
+from utils.guild_settings import CountingSettings, get_settings
+from utils.arithmetic import evaluate_integer
 import random
 import asyncio
 
+COUNT_FLUSH_INTERVAL = 5  # Seconds between write-behind flushes of counting state
+DICE_EMOJI = "🎲"
+DICE_TIMEOUT = 60  # Seconds to gather helpers for the Dice of Fate
+DICE_HELPERS_NEEDED = 1  # Reactions needed besides the bot's own
+
+
+class DiceRoll:
+    """A pending Dice of Fate; helper reactions arrive through reaction events"""
+    __slots__ = ("message_id", "helpers", "ready")
+
+    def __init__(self):
+        self.message_id = None  # Set once the status message is sent
+        self.helpers = set()
+        self.ready = asyncio.Event()
+
+
+class CountingState:
+    """Authoritative counting state of one guild; the database copy is written behind"""
+    __slots__ = ("current_count", "last_user_id", "high_score", "dice")
+
+    def __init__(self, current_count: int = 0, last_user_id=None, high_score: int = 0):
+        self.current_count = current_count
+        self.last_user_id = last_user_id
+        self.high_score = high_score
+        self.dice = None  # DiceRoll while the count is paused for the Dice of Fate
+
+
 class Counting(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # Cache for counting channels: guild_id -> channel_id
-        self.counting_channels = {}
+        # Counting channels live in the shared settings service (guild_id -> CountingSettings)
+        self.settings = get_settings(bot)
+        self.states = {}  # guild_id -> CountingState
+        self.dirty_guilds = set()  # Guilds whose counting_config row is behind memory
+        self.pending_stats = {}  # (user_id, guild_id) -> [counts, ruined] not yet written
+        self.dice_messages = {}  # status message_id -> guild_id of a pending Dice of Fate
+        self._flush_lock = asyncio.Lock()
 
     async def cog_load(self):
-        """Load counting channels into memory on startup"""
+        """Load counting channels and their state into memory on startup"""
+        records = {}
         try:
             async with aiosqlite.connect(DB_PATH, timeout=30.0) as db:
                 try:
-                    async with db.execute("SELECT guild_id, channel_id FROM counting_config") as cursor:
+                    async with db.execute(
+                        "SELECT guild_id, channel_id, current_count, last_user_id, high_score FROM counting_config"
+                    ) as cursor:
                         rows = await cursor.fetchall()
-                        for guild_id, channel_id in rows:
-                            self.counting_channels[guild_id] = channel_id
-                    print(f"Loaded {len(self.counting_channels)} counting channels")
+                        for guild_id, channel_id, current_count, last_user_id, high_score in rows:
+                            records[guild_id] = CountingSettings(channel_id)
+                            self.states[guild_id] = CountingState(current_count, last_user_id, high_score)
+                    print(f"Loaded {len(records)} counting channels")
                 except aiosqlite.OperationalError:
                     print("counting_config table not found during cog load (likely first run)")
         except Exception as e:
             print(f"Error loading counting channels: {e}")
+        self.settings.register("counting", records, CountingSettings(), self._save_counting_settings)
+        self.flush_loop.start()
 
-    @app_commands.command(name="setcountingchannel", description="Set the channel for the counting game")
-    @app_commands.checks.has_permissions(administrator=True)
-    async def setcountingchannel(self, interaction: discord.Interaction, channel: discord.TextChannel):
+    async def cog_unload(self):
+        self.flush_loop.cancel()
+        await self.flush()
+
+    async def _save_counting_settings(self, guild_id, old, new, updated_by):
         async with aiosqlite.connect(DB_PATH, timeout=30.0) as db:
             await db.execute("""
                 INSERT INTO counting_config (guild_id, channel_id)
                 VALUES (?, ?)
                 ON CONFLICT(guild_id) DO UPDATE SET channel_id = excluded.channel_id
-            """, (interaction.guild_id, channel.id))
+            """, (guild_id, new.channel_id))
             await db.commit()
-        
-        # Update cache
-        self.counting_channels[interaction.guild_id] = channel.id
+        self.states.setdefault(guild_id, CountingState())
+
+    def _add_stats(self, user_id, guild_id, counts=0, ruined=0):
+        pending = self.pending_stats.setdefault((user_id, guild_id), [0, 0])
+        pending[0] += counts
+        pending[1] += ruined
+
+    async def flush(self):
+        """Write changed counting state and accumulated user stats in one transaction"""
+        async with self._flush_lock:
+            if not self.dirty_guilds and not self.pending_stats:
+                return
+            guilds, self.dirty_guilds = self.dirty_guilds, set()
+            stats, self.pending_stats = self.pending_stats, {}
+
+            config_rows = []
+            for guild_id in guilds:
+                state = self.states.get(guild_id)
+                if state:
+                    config_rows.append((state.current_count, state.last_user_id, state.high_score, guild_id))
+            stats_rows = [(user_id, guild_id, counts, ruined) for (user_id, guild_id), (counts, ruined) in stats.items()]
+
+            try:
+                async with aiosqlite.connect(DB_PATH, timeout=30.0) as db:
+                    await db.executemany("""
+                        UPDATE counting_config
+                        SET current_count = ?, last_user_id = ?, high_score = ?
+                        WHERE guild_id = ?
+                    """, config_rows)
+                    await db.executemany("""
+                        INSERT INTO counting_stats (user_id, guild_id, total_counts, ruined_counts)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                            total_counts = total_counts + excluded.total_counts,
+                            ruined_counts = ruined_counts + excluded.ruined_counts
+                    """, stats_rows)
+                    await db.commit()
+            except Exception as e:
+                # Nothing is lost: put everything back for the next flush
+                self.dirty_guilds |= guilds
+                for (user_id, guild_id), (counts, ruined) in stats.items():
+                    self._add_stats(user_id, guild_id, counts, ruined)
+                print(f"Error saving counting state: {e}")
+
+    @tasks.loop(seconds=COUNT_FLUSH_INTERVAL)
+    async def flush_loop(self):
+        await self.flush()
+
+    @app_commands.command(name="setcountingchannel", description="Set the channel for the counting game")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def setcountingchannel(self, interaction: discord.Interaction, channel: discord.TextChannel):
+        await self.settings.update("counting", interaction.guild_id, updated_by=interaction.user.id, channel_id=channel.id)
         
         await interaction.response.send_message(f"Counting channel set to {channel.mention}", ephemeral=True)
 
-    def safe_eval(self, expr):
-        operators = {
-            ast.Add: operator.add,
-            ast.Sub: operator.sub,
-            ast.Mult: operator.mul,
-            ast.Div: operator.truediv,
-            ast.Pow: operator.pow,
-            ast.BitXor: operator.pow, # Allow ^ for power
-            ast.USub: operator.neg
-        }
-
-        def eval_node(node):
-            if isinstance(node, ast.Constant):
-                if isinstance(node.value, (int, float)):
-                    return node.value
-                raise TypeError("Not a number")
-            elif isinstance(node, ast.BinOp):
-                op = type(node.op)
-                if op in operators:
-                    left = eval_node(node.left)
-                    right = eval_node(node.right)
-                    if op in (ast.Pow, ast.BitXor):
-                        if right > 100: # Limit exponent
-                            raise ValueError("Exponent too large")
-                    return operators[op](left, right)
-            elif isinstance(node, ast.UnaryOp):
-                op = type(node.op)
-                if op in operators:
-                    return operators[op](eval_node(node.operand))
-            raise TypeError("Unsupported type")
+    def check_count(self, guild_id, state, user_id, number):
+        """Validate and apply one count; returns None if accepted, otherwise the failure reason
 
-        try:
-            tree = ast.parse(expr, mode='eval')
-            return eval_node(tree.body)
-        except Exception:
-            return None
+        Runs without awaiting, so counts for a guild are decided one at a time in the order
+        the messages arrived.
+        """
+        if number != state.current_count + 1:
+            state.dice = DiceRoll()
+            return "Wrong number!"
+
+        if user_id == state.last_user_id:
+            state.dice = DiceRoll()
+            return "You can't count twice in a row!"
+
+        state.current_count += 1
+        state.last_user_id = user_id
+        state.high_score = max(state.high_score, state.current_count)
+        self.dirty_guilds.add(guild_id)
+        self._add_stats(user_id, guild_id, counts=1)
+        return None
 
     @commands.Cog.listener()
     async def on_message(self, message):
         if message.author.bot or not message.guild:
             return
 
-        # 1. OPTIMIZATION: Check cache first before touching DB
-        if message.guild.id not in self.counting_channels:
-            return
-        
-        if message.channel.id != self.counting_channels[message.guild.id]:
+        # 1. OPTIMIZATION: Check cache first, counting never reads the DB per message
+        config = self.settings.get("counting", message.guild.id)
+        if config is None or message.channel.id != config.channel_id:
             return
 
+        state = self.states.get(message.guild.id)
+        if state is None or state.dice is not None:
+            return  # Counting pauses while the Dice of Fate decides
+
         # 2. Process the message logic
-        # Wrap DB operations in retry loop for robustness
-        retries = 3
-        while retries > 0:
+        content = message.content.strip()
+        if not content:
+            return
+
+        # Evaluate math expression (plain numbers skip the parser)
+        number = evaluate_integer(content)
+        if number is None:
+            return # Not a valid number/expression, or not an integer
+
+        # Check rules
+        failure = self.check_count(message.guild.id, state, message.author.id, number)
+        if failure:
             try:
-                async with aiosqlite.connect(DB_PATH, timeout=30.0) as db:
-                    async with db.execute("SELECT current_count, last_user_id, high_score FROM counting_config WHERE guild_id = ?", (message.guild.id,)) as cursor:
-                        config = await cursor.fetchone()
-                    
-                    if not config:
-                        # Should not happen if in cache, but possible if DB was manually cleared
-                        return
-
-                    current_count, last_user_id, high_score = config
-
-                    # Try to parse the number
-                    content = message.content.strip()
-                    if not content:
-                        return
-
-                    # Evaluate math expression
-                    number = self.safe_eval(content)
-                    if number is None:
-                        return # Not a valid number/expression
-
-                    # Check if it's an integer
-                    if isinstance(number, float):
-                        if number.is_integer():
-                            number = int(number)
-                        else:
-                            # Not an int, ignore
-                            return
-
-                    # Check rules
-                    next_count = current_count + 1
-                    
-                    if number != next_count:
-                        await self.fail_count(message, current_count, "Wrong number!")
-                        return
-
-                    if message.author.id == last_user_id:
-                        await self.fail_count(message, current_count, "You can't count twice in a row!")
-                        return
-
-                    # Valid count - Update DB
-                    await message.add_reaction("✅")
-                    new_high_score = max(high_score, next_count)
-                    
-                    # Update configuration tables
-                    await db.execute("""
-                        UPDATE counting_config 
-                        SET current_count = ?, last_user_id = ?, high_score = ?
-                        WHERE guild_id = ?
-                    """, (next_count, message.author.id, new_high_score, message.guild.id))
-                    
-                    # Update user stats
-                    await db.execute("""
-                        INSERT INTO counting_stats (user_id, guild_id, total_counts, ruined_counts)
-                        VALUES (?, ?, 1, 0)
-                        ON CONFLICT(user_id, guild_id) DO UPDATE SET total_counts = total_counts + 1
-                    """, (message.author.id, message.guild.id))
-                    
-                    await db.commit()
-                    return # Success
-            
-            except aiosqlite.OperationalError as e:
-                # If specifically locked, retry
-                if "locked" in str(e):
-                    retries -= 1
-                    if retries == 0:
-                        print(f"Database locked repeatedly in counting for msg {message.id}")
-                        # Don't crash bot, just ignore or log
-                        return
-                    await asyncio.sleep(0.1 * (4 - retries)) # backoff
-                else:
-                    raise # Re-raise other operational errors
+                await self.fail_count(message, state.current_count, failure)
+            finally:
+                state.dice = None
+            return
+
+        await message.add_reaction("✅")
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload):
+        guild_id = self.dice_messages.get(payload.message_id)
+        if guild_id is None or str(payload.emoji) != DICE_EMOJI:
+            return
+        if payload.user_id == self.bot.user.id or (payload.member and payload.member.bot):
+            return
+
+        state = self.states.get(guild_id)
+        if state is None or state.dice is None:
+            return
+        state.dice.helpers.add(payload.user_id)
+        if len(state.dice.helpers) >= DICE_HELPERS_NEEDED:
+            state.dice.ready.set()
 
     async def fail_count(self, message, current_count, reason):
-        # 1. Send initial message
-        await message.add_reaction("❌")
-        status_msg = await message.channel.send(
-            f"{reason} {message.author.mention} messed up at {current_count}!\n"
-            "🎲 **Rolling the Dice of Fate...**\n"
-            "React with 🎲 to help roll! (Need 2 reactions in 60s)"
-        )
-        await status_msg.add_reaction("🎲")
-
-        # 2. Wait for reactions
+        state = self.states[message.guild.id]
+        dice = state.dice
+
+        # Any Discord error ends the wait as if nobody reacted; the outcome is applied regardless
+        status_msg = None
         reactions_collected = False
         try:
-            end_time = asyncio.get_event_loop().time() + 60
-            while True:
-                # Check current count
-                status_msg = await message.channel.fetch_message(status_msg.id)
-                reaction = discord.utils.get(status_msg.reactions, emoji="🎲")
-                
-                # If bot reacted, count is at least 1. We need 2 total.
-                if reaction and reaction.count >= 2:
-                    reactions_collected = True
-                    break
-                
-                timeout = end_time - asyncio.get_event_loop().time()
-                if timeout <= 0:
-                    break
-                
-                try:
-                    # Wait for any reaction on this message
-                    await self.bot.wait_for(
-                        'reaction_add', 
-                        check=lambda r, u: r.message.id == status_msg.id and str(r.emoji) == "🎲", 
-                        timeout=timeout
-                    )
-                except asyncio.TimeoutError:
-                    break
-        except Exception:
-            pass # Proceed if something fails
-
-        # 3. Determine Outcome
-        outcome_msg = ""
-        new_count = 0
-        new_last_user_id = None
-        
-        dice_db_ops = [] # List of DB operations to perform (query, args)
+            # 1. Send initial message
+            await message.add_reaction("❌")
+            status_msg = await message.channel.send(
+                f"{reason} {message.author.mention} messed up at {current_count}!\n"
+                f"{DICE_EMOJI} **Rolling the Dice of Fate...**\n"
+                f"React with {DICE_EMOJI} to help roll! (Need {DICE_HELPERS_NEEDED + 1} reactions in {DICE_TIMEOUT}s)"
+            )
+            dice.message_id = status_msg.id
+            self.dice_messages[status_msg.id] = message.guild.id
+
+            # 2. Wait for reactions, counted by on_raw_reaction_add
+            await status_msg.add_reaction(DICE_EMOJI)
+            await asyncio.wait_for(dice.ready.wait(), timeout=DICE_TIMEOUT)
+            reactions_collected = True
+        except (asyncio.TimeoutError, discord.HTTPException):
+            reactions_collected = False
+        finally:
+            if status_msg is not None:
+                self.dice_messages.pop(status_msg.id, None)
+            # 3. Determine and apply the outcome
+            outcome_msg, new_count = self.resolve_dice(message.guild.id, state, message.author.id,
+                                                       current_count, reactions_collected)
+
+        # 4. Edit message
+        if status_msg is None:
+            return
+        try:
+            await status_msg.edit(content=f"{reason} {message.author.mention} messed up at {current_count}!\n{outcome_msg}\nNext number is **{new_count + 1}**.")
+        except discord.HTTPException as e:
+            print(f"Failed to show Dice of Fate outcome: {e}")
+
+    def resolve_dice(self, guild_id, state, user_id, current_count, reactions_collected):
+        """Roll and apply the Dice of Fate in one step, then resume counting; returns (message, new count)"""
+        saved = False
 
         if not reactions_collected:
             # TIMEOUT / NOT ENOUGH REACTIONS -> RESET
             new_count = 0
-            new_last_user_id = None
             outcome_msg = "⏳ **Time's up!** Not enough people helped roll the dice.\n💥 **Reset!** The count goes back to 0."
-            
-            dice_db_ops.append(("""
-                UPDATE counting_config 
-                SET current_count = 0, last_user_id = NULL
-                WHERE guild_id = ?
-            """, (message.guild.id,)))
-
-            dice_db_ops.append(("""
-                INSERT INTO counting_stats (user_id, guild_id, total_counts, ruined_counts)
-                VALUES (?, ?, 0, 1)
-                ON CONFLICT(user_id, guild_id) DO UPDATE SET ruined_counts = ruined_counts + 1
-            """, (message.author.id, message.guild.id)))
-
         else:
             # REACTIONS COLLECTED -> ROLL DICE
             dice_roll = random.randint(1, 6)
@@ -244,61 +260,33 @@ class Counting(commands.Cog):
             if dice_roll in [2, 4, 6]:
                 # SAVE
                 new_count = current_count
+                saved = True
                 outcome_msg += "✨ **Saved!** The count continues!"
-                # No update to config needed except maybe verifying it? 
-                # Actually if saved, we do NOTHING to counting_config.
             elif dice_roll == 3:
                 # RESET
                 new_count = 0
-                new_last_user_id = None
                 outcome_msg += "💥 **Reset!** The count goes back to 0."
             elif dice_roll == 1:
                 # -10 Penalty
                 new_count = max(0, current_count - 10)
-                new_last_user_id = None
                 outcome_msg += "🔻 **-10 Penalty!** The count drops by 10."
-            elif dice_roll == 5:
+            else:
                 # -5 Penalty
                 new_count = max(0, current_count - 5)
-                new_last_user_id = None
                 outcome_msg += "🔻 **-5 Penalty!** The count drops by 5."
 
-            if dice_roll not in [2, 4, 6]:
-                dice_db_ops.append(("""
-                    UPDATE counting_config 
-                    SET current_count = ?, last_user_id = ?
-                    WHERE guild_id = ?
-                """, (new_count, new_last_user_id, message.guild.id)))
-            
-            dice_db_ops.append(("""
-                INSERT INTO counting_stats (user_id, guild_id, total_counts, ruined_counts)
-                VALUES (?, ?, 0, 1)
-                ON CONFLICT(user_id, guild_id) DO UPDATE SET ruined_counts = ruined_counts + 1
-            """, (message.author.id, message.guild.id)))
-
-        # EXECUTE DB OPS with Retry
-        if dice_db_ops:
-            retries = 3
-            while retries > 0:
-                try:
-                    async with aiosqlite.connect(DB_PATH, timeout=30.0) as db:
-                        for sql, args in dice_db_ops:
-                            await db.execute(sql, args)
-                        await db.commit()
-                    break # Success
-                except aiosqlite.OperationalError as e:
-                    if "locked" in str(e):
-                        retries -= 1
-                        await asyncio.sleep(0.5)
-                    else:
-                        print(f"Error saving count fail state: {e}")
-                        break
-
-        # 4. Edit message
-        await status_msg.edit(content=f"{reason} {message.author.mention} messed up at {current_count}!\n{outcome_msg}\nNext number is **{new_count + 1}**.")
+        # Applied to the in-memory state without awaiting; the flush loop persists it
+        if not saved:
+            state.current_count = new_count
+            state.last_user_id = None
+            self.dirty_guilds.add(guild_id)
+        self._add_stats(user_id, guild_id, ruined=1)
+        state.dice = None
+        return outcome_msg, new_count
 
     @commands.command(name="mcl", aliases=["tc"])
     async def most_count_leaderboard(self, ctx):
+        await self.flush()
         async with aiosqlite.connect(DB_PATH, timeout=30.0) as db:
             async with db.execute("""
                 SELECT user_id, total_counts 
@@ -322,6 +310,7 @@ class Counting(commands.Cog):
 
     @commands.command(name="mrl")
     async def most_ruined_leaderboard(self, ctx):
+        await self.flush()
         async with aiosqlite.connect(DB_PATH, timeout=30.0) as db:
             async with db.execute("""
                 SELECT user_id, ruined_counts 
@@ -345,15 +334,12 @@ class Counting(commands.Cog):
 
     @commands.command(name="scs")
     async def server_count_stats(self, ctx):
-        async with aiosqlite.connect(DB_PATH, timeout=30.0) as db:
-            async with db.execute("SELECT current_count, high_score FROM counting_config WHERE guild_id = ?", (ctx.guild.id,)) as cursor:
-                row = await cursor.fetchone()
-        
-        if not row:
+        state = self.states.get(ctx.guild.id)
+        if state is None:
             await ctx.send("Counting channel not set up or no data.")
             return
-            
-        current, high = row
+
+        current, high = state.current_count, state.high_score
         embed = discord.Embed(title="Server Count Stats", color=discord.Color.green())
         embed.add_field(name="Current Count", value=str(current))
         embed.add_field(name="High Score", value=str(high))
@@ -7,11 +7,12 @@ import time
 from pathlib import Path
 import logging
 
+from utils.guild_settings import StaffApplicationSettings, get_settings
+
 logger = logging.getLogger(__name__)
 
 # Constants
 STAFF_ROLE_ID = 1403059755001577543
-REVIEW_CHANNEL_ID = 1400075578391920792
 DB_PATH = Path("data/staff_applications.db")
 
 QUESTIONS = [
@@ -234,7 +235,10 @@ class PanelView(discord.ui.View):
                 await db.commit()
             
             # Post to Review Channel
-            review_channel = self.bot.get_channel(REVIEW_CHANNEL_ID)
+            review_channel_id = get_settings(self.bot).get_or_default(
+                "staff_applications", interaction.guild_id
+            ).review_channel_id
+            review_channel = self.bot.get_channel(review_channel_id)
             if review_channel:
                 review_embed = discord.Embed(title=f"New Staff Application: {user.name}", color=0x000000)
                 review_embed.set_thumbnail(url=user.display_avatar.url)
@@ -288,6 +292,7 @@ class PanelView(discord.ui.View):
 class StaffApplications(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.settings = get_settings(bot)
 
     async def cog_load(self):
         logger.info("loading StaffApplications cog with question description fix")
@@ -306,7 +311,19 @@ class StaffApplications(commands.Cog):
                     timestamp INTEGER
                 )
             """)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS application_settings (
+                    guild_id INTEGER PRIMARY KEY,
+                    review_channel_id INTEGER NOT NULL,
+                    set_by INTEGER
+                )
+            """)
             await db.commit()
+
+            async with db.execute("SELECT guild_id, review_channel_id FROM application_settings") as cursor:
+                records = {row[0]: StaffApplicationSettings(row[1]) for row in await cursor.fetchall()}
+        self.settings.register("staff_applications", records, StaffApplicationSettings(),
+                               self._save_application_settings)
             
         # Add persistent views
         self.bot.add_view(PanelView(self.bot))
@@ -359,6 +376,17 @@ class StaffApplications(commands.Cog):
                 # Let's load pending apps and register views.
                 pass
     
+    async def _save_application_settings(self, guild_id, old, new, updated_by):
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute("""
+                INSERT INTO application_settings (guild_id, review_channel_id, set_by)
+                VALUES (?, ?, ?)
+                ON CONFLICT(guild_id) DO UPDATE SET
+                    review_channel_id = excluded.review_channel_id,
+                    set_by = excluded.set_by
+            """, (guild_id, new.review_channel_id, updated_by))
+            await db.commit()
+
     async def register_persistent_views(self):
         # Fetch pending applications to restore views
         try:
@@ -394,6 +422,15 @@ class StaffApplications(commands.Cog):
         )
         await ctx.send(embed=embed, view=PanelView(self.bot))
 
+    @commands.hybrid_command(name="appreviewchannel", description="Set the channel staff applications are posted to")
+    @commands.has_permissions(administrator=True)
+    @commands.guild_only()
+    @app_commands.describe(channel="The channel to post submitted applications in")
+    async def appreviewchannel(self, ctx, channel: discord.TextChannel):
+        await self.settings.update("staff_applications", ctx.guild.id, updated_by=ctx.author.id,
+                                   review_channel_id=channel.id)
+        await ctx.send(f"Staff applications will now be posted to {channel.mention}.")
+
     @app_commands.command(name="applications", description="View a user's staff applications")
     @app_commands.describe(user="The user to check applications for")
     async def applications(self, interaction: discord.Interaction, user: discord.User):
@@ -4,19 +4,54 @@ Similar to Dyno bot functionality with self-starring allowed
 """
 
 import discord
+import ast
+import hashlib
 import logging
 from discord.ext import commands
 from discord import app_commands
 import aiosqlite
 import asyncio
-from datetime import datetime, timezone
-from typing import Optional, Dict, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, List, Tuple
 import os
 from pathlib import Path
 from utils.helpers import create_success_embed, create_error_embed, create_warning_embed
+from utils.guild_settings import StarboardSettings, get_settings
 from types import SimpleNamespace
 from typing import Any
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.webm', '.mkv')
+AUDIO_EXTENSIONS = ('.mp3', '.ogg', '.wav', '.flac', '.m4a')
+
+STARBOARD_SCHEMA_VERSION = 1  # PRAGMA user_version once legacy inline storage has been migrated
+
+
+def attachment_media_type(filename: str, content_type: Optional[str] = None) -> str:
+    """Classify an attachment as 'image', 'video', 'audio' or 'file'"""
+    if content_type:
+        major = str(content_type).split('/', 1)[0]
+        if major in ('image', 'video', 'audio'):
+            return major
+    name = (filename or '').lower()
+    if name.endswith(IMAGE_EXTENSIONS):
+        return 'image'
+    if name.endswith(VIDEO_EXTENSIONS):
+        return 'video'
+    if name.endswith(AUDIO_EXTENSIONS):
+        return 'audio'
+    return 'file'
+
+
+def content_hash(content: Optional[str]) -> Optional[str]:
+    """Hash used to store each distinct message text only once"""
+    if not content:
+        return None
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
 
 class ReactionProxy:
@@ -74,9 +109,20 @@ class StarboardSystem(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.database_path = Path("data/starboard.db")
-        self.star_cache: Dict[int, Dict] = {}  # Cache for quick lookups
+        self.settings = get_settings(bot)
+        # Index of posted entries: original message id <-> starboard message id
+        self.starred_index: Dict[int, int] = {}
+        self.starboard_post_index: Dict[int, int] = {}
+        # LRU of rendered embed parts keyed by (message_id, edited_at); shared by create and update
+        self.embed_cache: "OrderedDict[Tuple[int, Optional[datetime]], Dict[str, Any]]" = OrderedDict()
         # Locks to prevent race conditions creating duplicate starboard posts
         self._locks: Dict[int, asyncio.Lock] = {}
+        self._lock_users: Dict[int, int] = {}  # message id -> coroutines holding or waiting for its lock
+        # Running backfill jobs (guild_id -> task) and the shared post throttle
+        self._backfill_tasks: Dict[int, asyncio.Task] = {}
+        self._post_throttle = asyncio.Lock()
+        self._last_backfill_post = 0.0
+        self._reconcile_task: Optional[asyncio.Task] = None
         self.ready = False
         
     async def cog_load(self):
@@ -84,6 +130,16 @@ class StarboardSystem(commands.Cog):
         await self.init_database()
         await self.load_starboard_cache()
         self.ready = True
+        # Runs in the background after the bot is ready, so startup is never held up
+        self._reconcile_task = asyncio.create_task(self.reconcile_after_downtime())
+
+    async def cog_unload(self):
+        """Stop any running backfill or reconcile jobs"""
+        for task in self._backfill_tasks.values():
+            task.cancel()
+        self._backfill_tasks.clear()
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
         
     async def init_database(self):
         """Initialize the starboard database"""
@@ -113,12 +169,64 @@ class StarboardSystem(commands.Cog):
                     author_id INTEGER NOT NULL,
                     starboard_message_id INTEGER,
                     star_count INTEGER DEFAULT 0,
-                    content TEXT,
-                    attachments TEXT,
+                    content_hash TEXT,
                     created_at TEXT NOT NULL,
                     last_updated TEXT NOT NULL
                 )
             """)
+
+            # Message text, stored once per distinct content
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS starred_content (
+                    content_hash TEXT PRIMARY KEY,
+                    content TEXT NOT NULL
+                )
+            """)
+
+            # One row per attachment of a starred message
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS starred_attachments (
+                    message_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    guild_id INTEGER NOT NULL,
+                    filename TEXT NOT NULL,
+                    content_type TEXT,
+                    media_type TEXT NOT NULL,
+                    size INTEGER,
+                    url TEXT NOT NULL,
+                    starred_at TEXT NOT NULL,
+                    PRIMARY KEY (message_id, position)
+                )
+            """)
+
+            # Older databases stored text inline and attachments as a Python list repr. The column
+            # and the data move commit together, and user_version records that both happened
+            cursor = await db.execute("PRAGMA user_version")
+            if (await cursor.fetchone())[0] < STARBOARD_SCHEMA_VERSION:
+                await db.execute("BEGIN")
+                cursor = await db.execute("PRAGMA table_info(starred_messages)")
+                columns = [row[1] for row in await cursor.fetchall()]
+                if "content_hash" not in columns:
+                    await db.execute("ALTER TABLE starred_messages ADD COLUMN content_hash TEXT")
+                if "content" in columns:
+                    await self._migrate_starred_storage(db)
+                await db.execute(f"PRAGMA user_version = {STARBOARD_SCHEMA_VERSION}")
+                await db.commit()
+
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_starred_attachments_media "
+                "ON starred_attachments (guild_id, media_type, starred_at)"
+            )
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_starred_messages_content ON starred_messages (content_hash)")
+            # Child rows follow their starred message, and text is dropped once nothing references it
+            await db.execute("""
+                CREATE TRIGGER IF NOT EXISTS starred_messages_cleanup AFTER DELETE ON starred_messages
+                BEGIN
+                    DELETE FROM starred_attachments WHERE message_id = OLD.message_id;
+                    DELETE FROM starred_content WHERE content_hash = OLD.content_hash
+                        AND NOT EXISTS (SELECT 1 FROM starred_messages WHERE content_hash = OLD.content_hash);
+                END
+            """)
             
             # Individual stars table (to track who starred what)
             await db.execute("""
@@ -127,100 +235,124 @@ class StarboardSystem(commands.Cog):
                     message_id INTEGER NOT NULL,
                     user_id INTEGER NOT NULL,
                     guild_id INTEGER NOT NULL,
+                    channel_id INTEGER,
                     starred_at TEXT NOT NULL,
                     UNIQUE(message_id, user_id)
                 )
             """)
+
+            # Older databases lack user_stars.channel_id (needed to re-fetch messages after downtime)
+            cursor = await db.execute("PRAGMA table_info(user_stars)")
+            columns = [row[1] for row in await cursor.fetchall()]
+            if "channel_id" not in columns:
+                await db.execute("ALTER TABLE user_stars ADD COLUMN channel_id INTEGER")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_user_stars_starred_at ON user_stars (starred_at)")
+
+            # Backfill progress (last processed message per channel) so scans can resume
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS starboard_backfill (
+                    guild_id INTEGER NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    last_message_id INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (guild_id, channel_id)
+                )
+            """)
             
             await db.commit()
             
+    async def _migrate_starred_storage(self, db: aiosqlite.Connection):
+        """Move legacy inline content/attachments into starred_content and starred_attachments"""
+        cursor = await db.execute(
+            "SELECT message_id, guild_id, content, attachments, created_at FROM starred_messages "
+            "WHERE content IS NOT NULL OR attachments IS NOT NULL"
+        )
+        rows = await cursor.fetchall()
+
+        contents = []
+        attachments = []
+        hashes = []
+        for message_id, guild_id, content, raw_attachments, created_at in rows:
+            digest = content_hash(content)
+            if digest:
+                contents.append((digest, content))
+            hashes.append((digest, message_id))
+
+            try:
+                urls = ast.literal_eval(raw_attachments) if raw_attachments else []
+            except (ValueError, SyntaxError):
+                urls = []
+            for position, url in enumerate(u for u in urls if isinstance(u, str)):
+                filename = urlsplit(url).path.rsplit('/', 1)[-1] or "attachment"
+                attachments.append((
+                    message_id, position, guild_id, filename, None,
+                    attachment_media_type(filename), None, url, created_at
+                ))
+
+        await db.executemany("INSERT OR IGNORE INTO starred_content (content_hash, content) VALUES (?, ?)", contents)
+        await db.executemany("""
+            INSERT OR IGNORE INTO starred_attachments
+            (message_id, position, guild_id, filename, content_type, media_type, size, url, starred_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, attachments)
+        await db.executemany(
+            "UPDATE starred_messages SET content_hash = ?, content = NULL, attachments = NULL WHERE message_id = ?",
+            hashes
+        )
+        self.logger.info(f"Starboard: migrated {len(rows)} starred messages to structured storage")
+
     async def load_starboard_cache(self):
-        """Load starboard settings into cache for quick access"""
+        """Load starboard settings into the settings service and the starred-message index"""
         async with aiosqlite.connect(self.database_path) as db:
             cursor = await db.execute("SELECT guild_id, channel_id, threshold, star_emoji, enabled, self_star FROM starboard_settings")
-            rows = await cursor.fetchall()
-            
-            for row in rows:
-                guild_id, channel_id, threshold, star_emoji, enabled, self_star = row
-                self.star_cache[guild_id] = {
-                    'channel_id': channel_id,
-                    'threshold': threshold,
-                    'star_emoji': star_emoji,
-                    'enabled': bool(enabled),
-                    'self_star': bool(self_star)
-                }
+            records = {
+                guild_id: StarboardSettings(channel_id, threshold, star_emoji, bool(enabled), bool(self_star))
+                for guild_id, channel_id, threshold, star_emoji, enabled, self_star in await cursor.fetchall()
+            }
+            self.settings.register("starboard", records, StarboardSettings(), self._save_starboard_settings)
+
+            cursor = await db.execute("SELECT message_id, starboard_message_id FROM starred_messages")
+            for message_id, starboard_msg_id in await cursor.fetchall():
+                self._index_starred(message_id, starboard_msg_id)
+
+    def _index_starred(self, message_id: int, starboard_msg_id: Optional[int]):
+        """Record a posted starboard entry in the in-memory index"""
+        self.starred_index[message_id] = starboard_msg_id or 0
+        if starboard_msg_id:
+            self.starboard_post_index[starboard_msg_id] = message_id
+
+    def _unindex_starred(self, message_id: int) -> Optional[int]:
+        """Drop an entry from the index, returning its starboard message id"""
+        starboard_msg_id = self.starred_index.pop(message_id, None)
+        if starboard_msg_id:
+            self.starboard_post_index.pop(starboard_msg_id, None)
+        return starboard_msg_id
                 
-    async def get_starboard_settings(self, guild_id: int) -> Optional[Dict]:
-        """Get starboard settings for a guild"""
-        # Check cache first
-        if guild_id in self.star_cache:
-            return self.star_cache[guild_id]
-        
-        # If not in cache, load from database
-        async with aiosqlite.connect(self.database_path) as db:
-            cursor = await db.execute(
-                "SELECT channel_id, threshold, star_emoji, enabled, self_star FROM starboard_settings WHERE guild_id = ?",
-                (guild_id,)
-            )
-            row = await cursor.fetchone()
-            
-            if row:
-                settings = {
-                    'channel_id': row[0],
-                    'threshold': row[1],
-                    'star_emoji': row[2],
-                    'enabled': bool(row[3]),
-                    'self_star': bool(row[4])
-                }
-                # Update cache
-                self.star_cache[guild_id] = settings
-                return settings
-        
-        return None
+    def get_starboard_settings(self, guild_id: int) -> Optional[StarboardSettings]:
+        """Get starboard settings for a guild (None if the guild never set it up)"""
+        return self.settings.get("starboard", guild_id)
         
     async def update_starboard_settings(self, guild_id: int, **kwargs):
         """Update starboard settings for a guild"""
-        current_time = datetime.now(timezone.utc).isoformat()
-        
+        await self.settings.update("starboard", guild_id, **kwargs)
+
+    async def _save_starboard_settings(self, guild_id: int, old: Optional[StarboardSettings],
+                                       new: StarboardSettings, updated_by: Optional[int]):
         async with aiosqlite.connect(self.database_path) as db:
-            # Check if settings exist
-            cursor = await db.execute("SELECT guild_id FROM starboard_settings WHERE guild_id = ?", (guild_id,))
-            exists = await cursor.fetchone()
-            
-            if exists:
-                # Update existing settings
-                set_clauses = []
-                values = []
-                for key, value in kwargs.items():
-                    if key in ['channel_id', 'threshold', 'star_emoji', 'enabled', 'self_star']:
-                        set_clauses.append(f"{key} = ?")
-                        values.append(value)
-                
-                if set_clauses:
-                    query = f"UPDATE starboard_settings SET {', '.join(set_clauses)} WHERE guild_id = ?"
-                    values.append(guild_id)
-                    await db.execute(query, values)
-            else:
-                # Create new settings
-                await db.execute("""
-                    INSERT INTO starboard_settings (guild_id, channel_id, threshold, star_emoji, enabled, self_star, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    guild_id,
-                    kwargs.get('channel_id'),
-                    kwargs.get('threshold', 3),
-                    kwargs.get('star_emoji', '⭐'),
-                    kwargs.get('enabled', True),
-                    kwargs.get('self_star', True),
-                    current_time
-                ))
-            
+            await db.execute("""
+                INSERT INTO starboard_settings (guild_id, channel_id, threshold, star_emoji, enabled, self_star, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id) DO UPDATE SET
+                    channel_id = excluded.channel_id,
+                    threshold = excluded.threshold,
+                    star_emoji = excluded.star_emoji,
+                    enabled = excluded.enabled,
+                    self_star = excluded.self_star
+            """, (
+                guild_id, new.channel_id, new.threshold, new.star_emoji, new.enabled, new.self_star,
+                datetime.now(timezone.utc).isoformat()
+            ))
             await db.commit()
-            
-        # Update cache
-        if guild_id not in self.star_cache:
-            self.star_cache[guild_id] = {}
-        self.star_cache[guild_id].update(kwargs)
 
     @commands.hybrid_group(name="starboard", description="Starboard system management")
     @commands.has_permissions(manage_guild=True)
@@ -310,7 +442,7 @@ class StarboardSystem(commands.Cog):
         if not ctx.guild:
             return
             
-        settings = await self.get_starboard_settings(ctx.guild.id)
+        settings = self.get_starboard_settings(ctx.guild.id)
         if not settings:
             await ctx.send(embed=create_error_embed(
                 "Starboard Not Setup",
@@ -335,7 +467,7 @@ class StarboardSystem(commands.Cog):
             await ctx.send(embed=create_error_embed("Invalid Threshold", "Threshold must be between 1 and 50."))
             return
             
-        settings = await self.get_starboard_settings(ctx.guild.id)
+        settings = self.get_starboard_settings(ctx.guild.id)
         if not settings:
             await ctx.send(embed=create_error_embed(
                 "Starboard Not Setup",
@@ -360,7 +492,7 @@ class StarboardSystem(commands.Cog):
             await ctx.send(embed=create_error_embed("Invalid Emoji", "Emoji must be 10 characters or less."))
             return
             
-        settings = await self.get_starboard_settings(ctx.guild.id)
+        settings = self.get_starboard_settings(ctx.guild.id)
         if not settings:
             await ctx.send(embed=create_error_embed(
                 "Starboard Not Setup",
@@ -380,7 +512,7 @@ class StarboardSystem(commands.Cog):
         if not ctx.guild:
             return
             
-        settings = await self.get_starboard_settings(ctx.guild.id)
+        settings = self.get_starboard_settings(ctx.guild.id)
         if not settings:
             await ctx.send(embed=create_error_embed(
                 "Starboard Not Setup",
@@ -388,7 +520,7 @@ class StarboardSystem(commands.Cog):
             ))
             return
             
-        new_status = not settings.get('enabled', True)
+        new_status = not settings.enabled
         await self.update_starboard_settings(ctx.guild.id, enabled=new_status)
         
         status_text = "Enabled" if new_status else "Disabled"
@@ -407,7 +539,7 @@ class StarboardSystem(commands.Cog):
         if not ctx.guild:
             return
             
-        settings = await self.get_starboard_settings(ctx.guild.id)
+        settings = self.get_starboard_settings(ctx.guild.id)
         if not settings:
             await ctx.send(embed=create_error_embed(
                 "Starboard Not Setup",
@@ -434,13 +566,23 @@ class StarboardSystem(commands.Cog):
             
             # Get top starred message with more details
             cursor = await db.execute("""
-                SELECT star_count, message_id, author_id, content 
-                FROM starred_messages 
-                WHERE guild_id = ? 
-                ORDER BY star_count DESC 
+                SELECT m.star_count, m.message_id, m.author_id, c.content 
+                FROM starred_messages m
+                LEFT JOIN starred_content c ON c.content_hash = m.content_hash
+                WHERE m.guild_id = ? 
+                ORDER BY m.star_count DESC 
                 LIMIT 1
             """, (ctx.guild.id,))
             top_message = await cursor.fetchone()
+
+            # Starred images this month (served from the media index)
+            month_start = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            cursor = await db.execute("""
+                SELECT COUNT(DISTINCT message_id) FROM starred_attachments
+                WHERE guild_id = ? AND media_type = 'image' AND starred_at >= ?
+            """, (ctx.guild.id, month_start.isoformat()))
+            result = await cursor.fetchone()
+            images_this_month = result[0] if result else 0
             
             # Get top 3 most active users (who give the most stars)
             cursor = await db.execute("""
@@ -482,25 +624,30 @@ class StarboardSystem(commands.Cog):
         )
         embed.add_field(
             name=" Threshold", 
-            value=f"**{settings['threshold']}** {settings['star_emoji']}", 
+            value=f"**{settings.threshold}** {settings.star_emoji}", 
+            inline=True
+        )
+        embed.add_field(
+            name=" Images This Month", 
+            value=f"**{images_this_month:,}**", 
             inline=True
         )
         
         # Configuration info
         embed.add_field(
             name=" Channel", 
-            value=f"<#{settings['channel_id']}>", 
+            value=f"<#{settings.channel_id}>", 
             inline=True
         )
         embed.add_field(
             name=" Star Emoji", 
-            value=settings['star_emoji'], 
+            value=settings.star_emoji, 
             inline=True
         )
-        status_emoji = "🟢" if settings.get('enabled', True) else ""
+        status_emoji = "🟢" if settings.enabled else ""
         embed.add_field(
             name=" Status", 
-            value=f"{status_emoji} {'Active' if settings.get('enabled', True) else 'Disabled'}", 
+            value=f"{status_emoji} {'Active' if settings.enabled else 'Disabled'}", 
             inline=True
         )
         
@@ -514,7 +661,7 @@ class StarboardSystem(commands.Cog):
             display_content = content[:100] + "..." if content and len(content) > 100 else content or "*No text*"
             
             embed.add_field(
-                name=f" Most Starred ({star_count} {settings['star_emoji']})",
+                name=f" Most Starred ({star_count} {settings.star_emoji})",
                 value=f"By **{author_name}**\n*{display_content}*",
                 inline=False
             )
@@ -551,7 +698,7 @@ class StarboardSystem(commands.Cog):
         if not ctx.guild:
             return
             
-        settings = await self.get_starboard_settings(ctx.guild.id)
+        settings = self.get_starboard_settings(ctx.guild.id)
         
         if not settings:
             embed = create_warning_embed(
@@ -564,8 +711,8 @@ class StarboardSystem(commands.Cog):
                 inline=False
             )
         else:
-            status = "🟢 Enabled" if settings['enabled'] else " Disabled"
-            channel = f"<#{settings['channel_id']}>" if settings['channel_id'] else "Not set"
+            status = "🟢 Enabled" if settings.enabled else " Disabled"
+            channel = f"<#{settings.channel_id}>" if settings.channel_id else "Not set"
             
             embed = discord.Embed(
                 title="⭐ Starboard Configuration",
@@ -573,8 +720,8 @@ class StarboardSystem(commands.Cog):
             )
             embed.add_field(name=" Status", value=status, inline=True)
             embed.add_field(name=" Channel", value=channel, inline=True)
-            embed.add_field(name=" Threshold", value=str(settings['threshold']), inline=True)
-            embed.add_field(name=" Emoji", value=settings['star_emoji'], inline=True)
+            embed.add_field(name=" Threshold", value=str(settings.threshold), inline=True)
+            embed.add_field(name=" Emoji", value=settings.star_emoji, inline=True)
             embed.add_field(name=" Self-starring", value="Allowed", inline=True)
             
         await ctx.send(embed=embed)
@@ -592,8 +739,8 @@ class StarboardSystem(commands.Cog):
             return
         
         # Quick check if it might be a star emoji before doing heavy processing
-        settings = await self.get_starboard_settings(reaction.message.guild.id)
-        if settings and str(reaction.emoji) == settings.get('star_emoji', '⭐'):
+        settings = self.get_starboard_settings(reaction.message.guild.id)
+        if settings and str(reaction.emoji) == settings.star_emoji:
             self.logger.debug(f"⭐ Starboard: Star reaction added by {user.name} on message {reaction.message.id}")
             await self.handle_star_reaction(reaction, user, added=True)
         
@@ -608,8 +755,8 @@ class StarboardSystem(commands.Cog):
             return
         
         # Quick check if it might be a star emoji before doing heavy processing
-        settings = await self.get_starboard_settings(reaction.message.guild.id)
-        if settings and str(reaction.emoji) == settings.get('star_emoji', '⭐'):
+        settings = self.get_starboard_settings(reaction.message.guild.id)
+        if settings and str(reaction.emoji) == settings.star_emoji:
             self.logger.debug(f"⭐ Starboard: Star reaction removed by {user.name} on message {reaction.message.id}")
             await self.handle_star_reaction(reaction, user, added=False)
 
@@ -623,13 +770,13 @@ class StarboardSystem(commands.Cog):
         if payload.guild_id is None:
             return
 
-        settings = await self.get_starboard_settings(payload.guild_id)
-        if not settings or not settings.get('enabled', True):
+        settings = self.get_starboard_settings(payload.guild_id)
+        if not settings or not settings.enabled:
             return
 
         # Quick emoji check to avoid extra fetches
         try:
-            if str(payload.emoji) != settings.get('star_emoji', '⭐'):
+            if str(payload.emoji) != settings.star_emoji:
                 return
         except Exception:
             return
@@ -686,12 +833,12 @@ class StarboardSystem(commands.Cog):
         if payload.guild_id is None:
             return
 
-        settings = await self.get_starboard_settings(payload.guild_id)
-        if not settings or not settings.get('enabled', True):
+        settings = self.get_starboard_settings(payload.guild_id)
+        if not settings or not settings.enabled:
             return
 
         try:
-            if str(payload.emoji) != settings.get('star_emoji', '⭐'):
+            if str(payload.emoji) != settings.star_emoji:
                 return
         except Exception:
             return
@@ -735,6 +882,133 @@ class StarboardSystem(commands.Cog):
 
         await self.handle_star_reaction(reaction_obj, user_obj, added=False)
         
+    # ==================== MESSAGE LIFECYCLE ====================
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        """Remove the starboard entry when a starred original (or its starboard post) is deleted"""
+        if not self.ready or payload.guild_id is None:
+            return
+
+        if payload.message_id in self.starred_index:
+            await self.purge_starred_messages(payload.guild_id, [payload.message_id])
+        elif payload.message_id in self.starboard_post_index:
+            await self._forget_starboard_post(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        """Same as a single delete, for purges"""
+        if not self.ready or payload.guild_id is None:
+            return
+
+        starred = [mid for mid in payload.message_ids if mid in self.starred_index]
+        if starred:
+            await self.purge_starred_messages(payload.guild_id, starred)
+        for mid in payload.message_ids:
+            if mid in self.starboard_post_index:
+                await self._forget_starboard_post(mid)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        """Refresh the starboard embed when a starred original is edited"""
+        if not self.ready or payload.guild_id is None:
+            return
+
+        starboard_msg_id = self.starred_index.get(payload.message_id)
+        if not starboard_msg_id:
+            return
+
+        settings = self.get_starboard_settings(payload.guild_id)
+        if not settings:
+            return
+
+        message = getattr(payload, 'message', None)
+        if message is None:
+            channel = self.bot.get_channel(payload.channel_id)
+            if not isinstance(channel, (discord.TextChannel, discord.Thread)):
+                return
+            try:
+                message = await channel.fetch_message(payload.message_id)
+            except discord.NotFound:
+                await self.purge_starred_messages(payload.guild_id, [payload.message_id])
+                return
+            except Exception:
+                return
+
+        async with self._message_lock(message.id):
+            async with aiosqlite.connect(self.database_path) as db:
+                cursor = await db.execute(
+                    "SELECT star_count, content_hash, created_at FROM starred_messages WHERE message_id = ?",
+                    (message.id,)
+                )
+                row = await cursor.fetchone()
+                if row:
+                    await self.update_starred_content(db, message, row[1], row[2])
+                    await db.commit()
+            if row:
+                await self.update_starboard_message(message, row[0], starboard_msg_id, settings)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear(self, payload: discord.RawReactionClearEvent):
+        """All reactions were removed from a message, so all of its stars are gone too"""
+        if not self.ready or payload.guild_id is None:
+            return
+
+        settings = self.get_starboard_settings(payload.guild_id)
+        if settings:
+            await self.purge_starred_messages(payload.guild_id, [payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear_emoji(self, payload: discord.RawReactionClearEmojiEvent):
+        """Only the star emoji was cleared from a message"""
+        if not self.ready or payload.guild_id is None:
+            return
+
+        settings = self.get_starboard_settings(payload.guild_id)
+        if settings and str(payload.emoji) == settings.star_emoji:
+            await self.purge_starred_messages(payload.guild_id, [payload.message_id])
+
+    @asynccontextmanager
+    async def _message_lock(self, message_id: int):
+        """Per-message lock, dropped from the map only once nobody holds or waits for it"""
+        lock = self._locks.setdefault(message_id, asyncio.Lock())
+        self._lock_users[message_id] = self._lock_users.get(message_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[message_id] -= 1
+            if not self._lock_users[message_id]:
+                del self._lock_users[message_id]
+                self._locks.pop(message_id, None)
+
+    async def purge_starred_messages(self, guild_id: int, message_ids: List[int]):
+        """Delete starboard posts plus starred_messages/user_stars rows for the given originals"""
+        settings = self.get_starboard_settings(guild_id)
+
+        for message_id in message_ids:
+            async with self._message_lock(message_id):
+                # Unindex first so deleting the post below is not handled as a second event
+                starboard_msg_id = self._unindex_starred(message_id)
+                if starboard_msg_id and settings:
+                    await self.remove_starboard_message(starboard_msg_id, settings)
+
+        placeholders = ", ".join("?" for _ in message_ids)
+        async with aiosqlite.connect(self.database_path) as db:
+            await db.execute(f"DELETE FROM starred_messages WHERE message_id IN ({placeholders})", message_ids)
+            await db.execute(f"DELETE FROM user_stars WHERE message_id IN ({placeholders})", message_ids)
+            await db.commit()
+
+    async def _forget_starboard_post(self, starboard_msg_id: int):
+        """A starboard post was deleted by hand; drop its row so the next star reposts it"""
+        message_id = self.starboard_post_index.get(starboard_msg_id)
+        if message_id is None:
+            return
+        self._unindex_starred(message_id)
+        async with aiosqlite.connect(self.database_path) as db:
+            await db.execute("DELETE FROM starred_messages WHERE starboard_message_id = ?", (starboard_msg_id,))
+            await db.commit()
+
     async def handle_star_reaction(self, reaction: Any, user: Any, added: bool):
         """Process star reactions (add or remove) - assumes pre-validated emoji"""
         message = reaction.message
@@ -746,36 +1020,31 @@ class StarboardSystem(commands.Cog):
             pass
         
         # Get starboard settings (should exist from pre-check)
-        settings = await self.get_starboard_settings(message.guild.id)
-        if not settings or not settings.get('enabled', True):
+        settings = self.get_starboard_settings(message.guild.id)
+        if not settings or not settings.enabled:
             return
             
         # Skip bot messages in starboard channel to prevent loops
-        if message.channel.id == settings.get('channel_id'):
+        if message.channel.id == settings.channel_id:
             return
 
         # Enforce self-starring setting: if disabled, ignore reactions by the message author
-        if not settings.get('self_star', True) and user.id == message.author.id:
+        if not settings.self_star and user.id == message.author.id:
             return
             
         # Handle the star with a per-message lock to avoid duplicate postings when reactions come in quick succession
         current_time = datetime.now(timezone.utc).isoformat()
 
         # Acquire/create lock for this message id
-        lock = self._locks.get(message.id)
-        if lock is None:
-            lock = asyncio.Lock()
-            self._locks[message.id] = lock
-
-        async with lock:
+        async with self._message_lock(message.id):
             async with aiosqlite.connect(self.database_path) as db:
                 if added:
                     # Add star
                     try:
                         await db.execute("""
-                            INSERT INTO user_stars (message_id, user_id, guild_id, starred_at)
-                            VALUES (?, ?, ?, ?)
-                        """, (message.id, user.id, message.guild.id, current_time))
+                            INSERT INTO user_stars (message_id, user_id, guild_id, channel_id, starred_at)
+                            VALUES (?, ?, ?, ?, ?)
+                        """, (message.id, user.id, message.guild.id, message.channel.id, current_time))
                         await db.commit()
                         self.logger.debug(f"💫 Starboard: Star added to DB for message {message.id} by user {user.id}")
                     except Exception as e:
@@ -796,68 +1065,124 @@ class StarboardSystem(commands.Cog):
                 """, (message.id,))
                 result = await cursor.fetchone()
                 star_count = result[0] if result else 0
-                self.logger.debug(f"📊 Starboard: Message {message.id} now has {star_count} stars (threshold: {settings['threshold']})")
+                self.logger.debug(f"📊 Starboard: Message {message.id} now has {star_count} stars (threshold: {settings.threshold})")
 
-                # Check if message exists in starred_messages
-                cursor = await db.execute("""
-                    SELECT starboard_message_id, star_count FROM starred_messages WHERE message_id = ?
-                """, (message.id,))
-                existing = await cursor.fetchone()
+                await self.sync_starboard_entry(db, message, star_count, settings, current_time)
 
-                threshold = settings['threshold']
+    async def sync_starboard_entry(self, db: aiosqlite.Connection, message: discord.Message,
+                                   star_count: int, settings: StarboardSettings, current_time: str):
+        """Create, update or remove the starboard post so it matches star_count (caller holds the message lock)"""
+        # Check if message exists in starred_messages
+        cursor = await db.execute("""
+            SELECT starboard_message_id, star_count FROM starred_messages WHERE message_id = ?
+        """, (message.id,))
+        existing = await cursor.fetchone()
 
-                if star_count >= threshold:
-                    if existing:
-                        # Update existing starboard message
-                        self.logger.debug(f"📝 Starboard: Updating message {message.id} with {star_count} stars")
-                        await self.update_starboard_message(message, star_count, existing[0], settings)
-                        await db.execute("""
-                            UPDATE starred_messages 
-                            SET star_count = ?, last_updated = ?
-                            WHERE message_id = ?
-                        """, (star_count, current_time, message.id))
-                    else:
-                        # Create new starboard message
-                        self.logger.debug(f"⭐ Starboard: Creating new starboard message for {message.id} with {star_count} stars (threshold: {threshold})")
-                        starboard_msg = await self.create_starboard_message(message, star_count, settings)
-                        if starboard_msg:
-                            starboard_msg_id = starboard_msg.id
-                            self.logger.debug(f"✅ Starboard: Created message {starboard_msg_id} in starboard channel")
-                            try:
-                                await db.execute("""
-                                    INSERT INTO starred_messages 
-                                    (message_id, guild_id, channel_id, author_id, starboard_message_id, 
-                                     star_count, content, attachments, created_at, last_updated)
-                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                """, (
-                                    message.id, message.guild.id, message.channel.id, message.author.id,
-                                    starboard_msg_id, star_count, message.content or "", 
-                                    str([att.url for att in message.attachments]), current_time, current_time
-                                ))
-                                await db.commit()
-                            except Exception as e:
-                                self.logger.exception(f"Error inserting starred_messages for {message.id}: {e}")
-                        else:
-                            self.logger.error(f"❌ Starboard: Failed to create starboard message for {message.id}")
-                else:
-                    if existing and star_count < threshold:
-                        # Remove from starboard if below threshold
-                        await self.remove_starboard_message(existing[0], settings)
-                        await db.execute("DELETE FROM starred_messages WHERE message_id = ?", (message.id,))
+        threshold = settings.threshold
+
+        if star_count >= threshold:
+            if existing:
+                # Update existing starboard message
+                self.logger.debug(f"📝 Starboard: Updating message {message.id} with {star_count} stars")
+                await self.update_starboard_message(message, star_count, existing[0], settings)
+                await db.execute("""
+                    UPDATE starred_messages 
+                    SET star_count = ?, last_updated = ?
+                    WHERE message_id = ?
+                """, (star_count, current_time, message.id))
+                await db.commit()
+            else:
+                # Create new starboard message
+                self.logger.debug(f"⭐ Starboard: Creating new starboard message for {message.id} with {star_count} stars (threshold: {threshold})")
+                starboard_msg = await self.create_starboard_message(message, star_count, settings)
+                if starboard_msg:
+                    starboard_msg_id = starboard_msg.id
+                    self.logger.debug(f"✅ Starboard: Created message {starboard_msg_id} in starboard channel")
+                    try:
+                        await self.insert_starred_message(db, message, starboard_msg_id, star_count, current_time)
                         await db.commit()
-            
-    async def create_starboard_message(self, message: discord.Message, star_count: int, settings: Dict) -> Optional[discord.Message]:
+                    except Exception as e:
+                        self.logger.exception(f"Error inserting starred_messages for {message.id}: {e}")
+                else:
+                    self.logger.error(f"❌ Starboard: Failed to create starboard message for {message.id}")
+        elif existing:
+            # Remove from starboard if below threshold
+            self._unindex_starred(message.id)
+            await self.remove_starboard_message(existing[0], settings)
+            await db.execute("DELETE FROM starred_messages WHERE message_id = ?", (message.id,))
+            await db.commit()
+
+    async def insert_starred_message(self, db: aiosqlite.Connection, message: discord.Message,
+                                     starboard_msg_id: int, star_count: int, current_time: str):
+        """Insert the starred_messages row for a freshly posted starboard entry (caller commits)"""
+        digest = content_hash(message.content)
+        if digest:
+            await db.execute(
+                "INSERT OR IGNORE INTO starred_content (content_hash, content) VALUES (?, ?)",
+                (digest, message.content)
+            )
+        await db.execute("""
+            INSERT INTO starred_messages 
+            (message_id, guild_id, channel_id, author_id, starboard_message_id, 
+             star_count, content_hash, created_at, last_updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            message.id, message.guild.id, message.channel.id, message.author.id,
+            starboard_msg_id, star_count, digest, current_time, current_time
+        ))
+        await self.insert_starred_attachments(db, message, current_time)
+        self._index_starred(message.id, starboard_msg_id)
+
+    async def insert_starred_attachments(self, db: aiosqlite.Connection, message: discord.Message, starred_at: str):
+        """Store one starred_attachments row per attachment of the message (caller commits)"""
+        await db.executemany("""
+            INSERT OR IGNORE INTO starred_attachments
+            (message_id, position, guild_id, filename, content_type, media_type, size, url, starred_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (message.id, position, message.guild.id, att.filename, att.content_type,
+             attachment_media_type(att.filename, att.content_type), att.size, att.url, starred_at)
+            for position, att in enumerate(message.attachments)
+        ])
+
+    async def update_starred_content(self, db: aiosqlite.Connection, message: discord.Message,
+                                     old_digest: Optional[str], starred_at: str):
+        """Store an edited message's text and attachments, dropping the old text once unreferenced (caller commits)"""
+        # Edits can remove attachments, so the rows are rebuilt from the message as it is now
+        await db.execute("DELETE FROM starred_attachments WHERE message_id = ?", (message.id,))
+        await self.insert_starred_attachments(db, message, starred_at)
+
+        digest = content_hash(message.content)
+        if digest == old_digest:
+            return
+        if digest:
+            await db.execute(
+                "INSERT OR IGNORE INTO starred_content (content_hash, content) VALUES (?, ?)",
+                (digest, message.content)
+            )
+        await db.execute(
+            "UPDATE starred_messages SET content_hash = ?, last_updated = ? WHERE message_id = ?",
+            (digest, datetime.now(timezone.utc).isoformat(), message.id)
+        )
+        if old_digest:
+            await db.execute(
+                "DELETE FROM starred_content WHERE content_hash = ? "
+                "AND NOT EXISTS (SELECT 1 FROM starred_messages WHERE content_hash = ?)",
+                (old_digest, old_digest)
+            )
+
+    async def create_starboard_message(self, message: discord.Message, star_count: int, settings: StarboardSettings) -> Optional[discord.Message]:
         """Create a new starboard message"""
         if not message.guild:
             self.logger.error(f"❌ Starboard: Message {message.id} is not in a guild")
             return None
 
-        starboard_channel = message.guild.get_channel(settings['channel_id'])
+        starboard_channel = message.guild.get_channel(settings.channel_id)
         if not starboard_channel:
-            self.logger.error(f"❌ Starboard: Channel {settings['channel_id']} not found in guild {message.guild.id}")
+            self.logger.error(f"❌ Starboard: Channel {settings.channel_id} not found in guild {message.guild.id}")
             return None
         if not isinstance(starboard_channel, discord.TextChannel):
-            self.logger.error(f"❌ Starboard: Channel {settings['channel_id']} is not a text channel")
+            self.logger.error(f"❌ Starboard: Channel {settings.channel_id} is not a text channel")
             return None
 
         try:
@@ -867,14 +1192,14 @@ class StarboardSystem(commands.Cog):
 
             # Try to add the star emoji reaction to both starboard msg and original message so it's obvious
             try:
-                star_emoji = settings.get('star_emoji', '⭐')
+                star_emoji = settings.star_emoji
                 await starboard_msg.add_reaction(star_emoji)
             except Exception:
                 pass
 
             try:
                 # Add reaction to original message as well (if permissions allow)
-                star_emoji = settings.get('star_emoji', '⭐')
+                star_emoji = settings.star_emoji
                 await message.add_reaction(star_emoji)
             except Exception:
                 pass
@@ -886,12 +1211,12 @@ class StarboardSystem(commands.Cog):
             return None
             
     async def update_starboard_message(self, message: discord.Message, star_count: int, 
-                                     starboard_msg_id: int, settings: Dict):
+                                     starboard_msg_id: int, settings: StarboardSettings):
         """Update an existing starboard message"""
         if not message.guild:
             return
             
-        starboard_channel = message.guild.get_channel(settings['channel_id'])
+        starboard_channel = message.guild.get_channel(settings.channel_id)
         if not starboard_channel or not isinstance(starboard_channel, discord.TextChannel):
             return
             
@@ -901,25 +1226,26 @@ class StarboardSystem(commands.Cog):
             await starboard_msg.edit(embed=embed)
             # Ensure the bot reacts to both starboard and original messages
             try:
-                await starboard_msg.add_reaction(settings.get('star_emoji', '⭐'))
+                await starboard_msg.add_reaction(settings.star_emoji)
             except Exception:
                 pass
 
             try:
-                await message.add_reaction(settings.get('star_emoji', '⭐'))
+                await message.add_reaction(settings.star_emoji)
             except Exception:
                 pass
         except discord.NotFound:
             # Starboard message was deleted, remove from database
+            self._unindex_starred(message.id)
             async with aiosqlite.connect(self.database_path) as db:
                 await db.execute("DELETE FROM starred_messages WHERE starboard_message_id = ?", (starboard_msg_id,))
                 await db.commit()
         except Exception as e:
             self.logger.exception(f"Error updating starboard message {starboard_msg_id} for original {message.id}")
             
-    async def remove_starboard_message(self, starboard_msg_id: int, settings: Dict):
+    async def remove_starboard_message(self, starboard_msg_id: int, settings: StarboardSettings):
         """Remove a starboard message"""
-        starboard_channel = self.bot.get_channel(settings['channel_id'])
+        starboard_channel = self.bot.get_channel(settings.channel_id)
         if not starboard_channel or not isinstance(starboard_channel, discord.TextChannel):
             return
             
@@ -931,9 +1257,11 @@ class StarboardSystem(commands.Cog):
         except Exception as e:
             self.logger.exception(f"Error removing starboard message {starboard_msg_id}")
             
-    async def create_starboard_embed(self, message: discord.Message, star_count: int, settings: Dict) -> discord.Embed:
+    EMBED_CACHE_SIZE = 512  # Rendered starboard messages kept in the LRU
+
+    async def create_starboard_embed(self, message: discord.Message, star_count: int, settings: StarboardSettings) -> discord.Embed:
         """Create a beautiful, modern embed for starboard message"""
-        star_emoji = settings.get('star_emoji', '⭐')
+        star_emoji = settings.star_emoji
         # Keep the starboard embed compact: author, avatar, highlighted message, and jump link
         # Dynamic color retained for slight visual cue
         if star_count >= 20:
@@ -945,35 +1273,53 @@ class StarboardSystem(commands.Cog):
         else:
             color = 0xF7DC6F
 
-        content = message.content or "*No text content*"
-        if len(content) > 1500:
-            content = content[:1500] + "..."
-
-        # Highlight the message by using a block quote style in the description
-        description = f"> {content.replace('\n', '\n> ')}"
+        # The message body only changes when it is edited, so its rendered parts are
+        # cached and only the color and star count differ between updates
+        key = (message.id, message.edited_at)
+        static = self.embed_cache.get(key)
+        if static is None:
+            static = self._render_starboard_static(message)
+            self.embed_cache[key] = static
+            if len(self.embed_cache) > self.EMBED_CACHE_SIZE:
+                self.embed_cache.popitem(last=False)
+        else:
+            self.embed_cache.move_to_end(key)
 
         embed = discord.Embed(
-            description=description,
+            description=static['description'],
             color=color
         )
 
         # Author with avatar only
-        embed.set_author(name=f"{message.author.display_name}", icon_url=message.author.display_avatar.url)
+        embed.set_author(name=static['author_name'], icon_url=static['author_icon'])
 
         # Add star count field (single, non-duplicated display)
         embed.add_field(name="Stars", value=f"{star_emoji} {star_count}", inline=True)
 
+        if static['image_url']:
+            try:
+                embed.set_image(url=static['image_url'])
+            except Exception:
+                pass
+
+        # Minimal jump link field
+        embed.add_field(name="Jump", value=f"[Jump to message]({static['jump_url']})", inline=False)
+
+        # No extra footer or timestamp to keep it compact
+        return embed
+
+    def _render_starboard_static(self, message: discord.Message) -> Dict[str, Any]:
+        """Extract the parts of a starboard embed that only change when the message is edited"""
+        content = message.content or "*No text content*"
+        if len(content) > 1500:
+            content = content[:1500] + "..."
+
         # Try to attach first image from attachments or embeds
         image_url = None
         try:
             for att in getattr(message, 'attachments', []):
-                fname = getattr(att, 'filename', '') or ''
-                content_type = getattr(att, 'content_type', None)
-                if content_type and str(content_type).startswith('image'):
-                    image_url = att.url
-                    break
-                # Fallback to extension check
-                if any(fname.lower().endswith(ext) for ext in ('.png', '.jpg', '.jpeg', '.gif', '.webp')):
+                # Content type first, falling back to the file extension
+                if attachment_media_type(getattr(att, 'filename', ''), getattr(att, 'content_type', None)) == 'image':
                     image_url = att.url
                     break
 
@@ -986,19 +1332,354 @@ class StarboardSystem(commands.Cog):
         except Exception:
             image_url = None
 
-        if image_url:
+        return {
+            # Highlight the message by using a block quote style in the description
+            'description': "> " + content.replace("\n", "\n> "),
+            'author_name': f"{message.author.display_name}",
+            'author_icon': message.author.display_avatar.url,
+            'image_url': image_url,
+            'jump_url': message.jump_url,
+        }
+
+    # ==================== HISTORICAL BACKFILL ====================
+
+    BACKFILL_CONCURRENCY = 3      # Channels scanned at the same time
+    BACKFILL_BATCH_SIZE = 50      # Candidates written per DB transaction
+    BACKFILL_POST_INTERVAL = 2.0  # Seconds between new starboard posts
+
+    @starboard.command(name="backfill", description="Rebuild the starboard from channel history")
+    @app_commands.describe(
+        channel="Channel to scan (default: every text channel)",
+        days="How many days of history to scan (1-365, default: 30)",
+        restart="Ignore saved progress and rescan from the start"
+    )
+    @commands.has_permissions(manage_guild=True)
+    async def starboard_backfill(self, ctx: commands.Context, channel: Optional[discord.TextChannel] = None,
+                                 days: int = 30, restart: bool = False):
+        """Scan channel history and add messages that already have enough stars"""
+        if not ctx.guild:
+            return
+
+        settings = self.get_starboard_settings(ctx.guild.id)
+        if not settings or not settings.channel_id:
+            await ctx.send(embed=create_error_embed(
+                "Starboard Not Setup",
+                "Please run `/starboard setup` first to configure the starboard system."
+            ))
+            return
+
+        if days < 1 or days > 365:
+            await ctx.send(embed=create_error_embed("Invalid Range", "Days must be between 1 and 365."))
+            return
+
+        running = self._backfill_tasks.get(ctx.guild.id)
+        if running and not running.done():
+            await ctx.send(embed=create_warning_embed(
+                "Backfill Running",
+                "A backfill is already in progress for this server. Please wait for it to finish."
+            ))
+            return
+
+        me = ctx.guild.me
+        candidates = [channel] if channel else ctx.guild.text_channels
+        channels = [
+            c for c in candidates
+            if c.id != settings.channel_id
+            and c.permissions_for(me).read_message_history
+            and c.permissions_for(me).read_messages
+        ]
+        if not channels:
+            await ctx.send(embed=create_error_embed("No Channels", "I can't read message history in any selected channel."))
+            return
+
+        if restart:
+            async with aiosqlite.connect(self.database_path) as db:
+                await db.executemany(
+                    "DELETE FROM starboard_backfill WHERE guild_id = ? AND channel_id = ?",
+                    [(ctx.guild.id, c.id) for c in channels]
+                )
+                await db.commit()
+
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        task = asyncio.create_task(self._run_backfill(ctx.guild, channels, since, ctx.channel))
+        self._backfill_tasks[ctx.guild.id] = task
+
+        embed = create_success_embed(
+            "Backfill Started",
+            f"Scanning **{len(channels)}** channel(s) for the last **{days}** day(s).\n"
+            f"I'll post a summary here when it's done. Progress is saved, so an interrupted run can be resumed."
+        )
+        await ctx.send(embed=embed)
+
+    async def _run_backfill(self, guild: discord.Guild, channels: List[discord.TextChannel],
+                            since: datetime, report_channel: Any):
+        """Scan several channels concurrently and report the totals"""
+        semaphore = asyncio.Semaphore(self.BACKFILL_CONCURRENCY)
+
+        async def scan(channel: discord.TextChannel) -> Tuple[int, int]:
+            async with semaphore:
+                return await self._backfill_channel(guild, channel, since)
+
+        try:
+            results = await asyncio.gather(*(scan(c) for c in channels), return_exceptions=True)
+            scanned = starred = failed = 0
+            for channel, result in zip(channels, results):
+                if isinstance(result, BaseException):
+                    failed += 1
+                    self.logger.error(f"Starboard backfill failed in #{channel.name} ({channel.id}): {result}")
+                    continue
+                scanned += result[0]
+                starred += result[1]
+
+            embed = discord.Embed(
+                title="⭐ Starboard Backfill Complete",
+                description=f"Scanned **{scanned:,}** messages in **{len(channels) - failed}** channel(s).",
+                color=0xFFD700
+            )
+            embed.add_field(name="Starred Messages", value=f"**{starred:,}**", inline=True)
+            if failed:
+                embed.add_field(name="Failed Channels", value=f"**{failed}** (run again to resume)", inline=True)
             try:
-                embed.set_image(url=image_url)
+                await report_channel.send(embed=embed)
             except Exception:
                 pass
+        finally:
+            self._backfill_tasks.pop(guild.id, None)
 
-        # Minimal jump link field
-        embed.add_field(name="Jump", value=f"[Jump to message]({message.jump_url})", inline=False)
+    async def _backfill_channel(self, guild: discord.Guild, channel: discord.TextChannel,
+                                since: datetime) -> Tuple[int, int]:
+        """Stream one channel's history from the saved cursor; returns (scanned, starred)"""
+        settings = self.get_starboard_settings(guild.id)
+        if not settings:
+            return 0, 0
 
-        # (Removed display of individual starrers to keep starboard compact)
+        async with aiosqlite.connect(self.database_path) as db:
+            cursor = await db.execute(
+                "SELECT last_message_id FROM starboard_backfill WHERE guild_id = ? AND channel_id = ?",
+                (guild.id, channel.id)
+            )
+            row = await cursor.fetchone()
 
-        # No extra footer or timestamp to keep it compact
-        return embed
+        after: Any = since
+        if row and row[0] > discord.utils.time_snowflake(since):
+            after = discord.Object(id=row[0])
+
+        scanned = starred = 0
+        batch: List[Tuple[discord.Message, List[int]]] = []
+        last_id: Optional[int] = None
+
+        async for message in channel.history(limit=None, after=after, oldest_first=True):
+            scanned += 1
+            last_id = message.id
+            candidate = await self._backfill_candidate(message, settings)
+            if candidate:
+                batch.append(candidate)
+            # Checkpoint regularly so a restart only repeats a small window
+            if len(batch) >= self.BACKFILL_BATCH_SIZE or scanned % 500 == 0:
+                starred += await self._flush_backfill_batch(guild.id, batch, last_id, channel.id, settings)
+                batch.clear()
+
+        if last_id is not None:
+            starred += await self._flush_backfill_batch(guild.id, batch, last_id, channel.id, settings)
+
+        return scanned, starred
+
+    async def _backfill_candidate(self, message: discord.Message,
+                                  settings: StarboardSettings) -> Optional[Tuple[discord.Message, List[int]]]:
+        """Return (message, starrer ids) if the message has enough stars, reading users only when needed"""
+        star_emoji = settings.star_emoji
+        reaction = discord.utils.find(lambda r: str(r.emoji) == star_emoji, message.reactions)
+        # The payload count includes bots and self-stars, so it is an upper bound:
+        # anything below the threshold can be skipped without listing reactors.
+        if reaction is None or reaction.count < settings.threshold:
+            return None
+
+        self_star = settings.self_star
+        user_ids = [
+            user.id async for user in reaction.users()
+            if not user.bot and (self_star or user.id != message.author.id)
+        ]
+        if len(user_ids) < settings.threshold:
+            return None
+        return message, user_ids
+
+    async def _flush_backfill_batch(self, guild_id: int, batch: List[Tuple[discord.Message, List[int]]],
+                                    last_id: int, channel_id: int, settings: StarboardSettings) -> int:
+        """Bulk-write a batch of starred messages, post new ones, and save the channel cursor"""
+        current_time = datetime.now(timezone.utc).isoformat()
+        posted = 0
+
+        async with aiosqlite.connect(self.database_path) as db:
+            if batch:
+                await db.executemany("""
+                    INSERT OR IGNORE INTO user_stars (message_id, user_id, guild_id, channel_id, starred_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (message.id, user_id, guild_id, channel_id, current_time)
+                    for message, user_ids in batch for user_id in user_ids
+                ])
+
+                placeholders = ", ".join("?" for _ in batch)
+                cursor = await db.execute(
+                    f"SELECT message_id FROM starred_messages WHERE message_id IN ({placeholders})",
+                    [message.id for message, _ in batch]
+                )
+                existing = {row[0] for row in await cursor.fetchall()}
+
+                await db.executemany(
+                    "UPDATE starred_messages SET star_count = ?, last_updated = ? WHERE message_id = ?",
+                    [(len(user_ids), current_time, message.id) for message, user_ids in batch if message.id in existing]
+                )
+                await db.commit()
+
+                for message, user_ids in batch:
+                    if message.id in existing:
+                        continue
+                    if await self._backfill_post(db, message, len(user_ids), settings, current_time):
+                        posted += 1
+
+            await db.execute("""
+                INSERT INTO starboard_backfill (guild_id, channel_id, last_message_id, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(guild_id, channel_id) DO UPDATE SET
+                    last_message_id = excluded.last_message_id, updated_at = excluded.updated_at
+            """, (guild_id, channel_id, last_id, current_time))
+            await db.commit()
+
+        return posted
+
+    async def _backfill_post(self, db: aiosqlite.Connection, message: discord.Message,
+                             star_count: int, settings: StarboardSettings, current_time: str) -> bool:
+        """Post one backfilled message, throttled and under the same per-message lock as live reactions"""
+        async with self._message_lock(message.id):
+            # A live reaction may have posted it while we were scanning
+            cursor = await db.execute("SELECT 1 FROM starred_messages WHERE message_id = ?", (message.id,))
+            if await cursor.fetchone():
+                return False
+
+            async with self._post_throttle:
+                loop = asyncio.get_running_loop()
+                delay = self._last_backfill_post + self.BACKFILL_POST_INTERVAL - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                starboard_msg = await self.create_starboard_message(message, star_count, settings)
+                self._last_backfill_post = loop.time()
+
+            if not starboard_msg:
+                return False
+            await self.insert_starred_message(db, message, starboard_msg.id, star_count, current_time)
+            await db.commit()
+            return True
+
+    # ==================== DOWNTIME RECONCILIATION ====================
+
+    RECONCILE_DAYS = 3           # How far back to look for near-threshold messages
+    RECONCILE_LIMIT = 150        # Max messages revisited per startup
+    RECONCILE_NEAR_MARGIN = 2    # "Near" means within this many stars of the threshold
+    RECONCILE_INTERVAL = 1.0     # Seconds between message fetches
+
+    async def reconcile_after_downtime(self):
+        """Re-read star reactions that may have changed while the bot was offline"""
+        await self.bot.wait_until_ready()
+
+        since = (datetime.now(timezone.utc) - timedelta(days=self.RECONCILE_DAYS)).isoformat()
+        async with aiosqlite.connect(self.database_path) as db:
+            # Messages likely to have crossed the threshold while we were away
+            cursor = await db.execute("""
+                SELECT guild_id, channel_id, message_id, COUNT(*) AS stars
+                FROM user_stars
+                WHERE starred_at >= ? AND channel_id IS NOT NULL
+                  AND message_id NOT IN (SELECT message_id FROM starred_messages)
+                GROUP BY guild_id, channel_id, message_id
+                ORDER BY MAX(starred_at) DESC
+                LIMIT ?
+            """, (since, self.RECONCILE_LIMIT))
+            near = await cursor.fetchall()
+
+            # Posted entries, most recently active first
+            cursor = await db.execute("""
+                SELECT guild_id, channel_id, message_id, star_count
+                FROM starred_messages
+                ORDER BY last_updated DESC
+                LIMIT ?
+            """, (self.RECONCILE_LIMIT,))
+            starred = await cursor.fetchall()
+
+        # Posted entries always get checked; near-threshold messages fill whatever budget is left
+        candidates = [(guild_id, channel_id, message_id) for guild_id, channel_id, message_id, _ in starred]
+        for guild_id, channel_id, message_id, stars in near:
+            if len(candidates) >= self.RECONCILE_LIMIT:
+                break
+            settings = self.get_starboard_settings(guild_id)
+            if settings and stars >= settings.threshold - self.RECONCILE_NEAR_MARGIN:
+                candidates.append((guild_id, channel_id, message_id))
+
+        fixed = 0
+        for guild_id, channel_id, message_id in candidates:
+            settings = self.get_starboard_settings(guild_id)
+            if not settings or not settings.enabled:
+                continue
+            try:
+                if await self._reconcile_message(guild_id, channel_id, message_id, settings):
+                    fixed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Starboard: reconcile failed for message {message_id}: {e}")
+            await asyncio.sleep(self.RECONCILE_INTERVAL)
+
+        if candidates:
+            self.logger.info(f"⭐ Starboard: Reconciled {len(candidates)} messages after startup, {fixed} corrected")
+
+    async def _reconcile_message(self, guild_id: int, channel_id: int, message_id: int, settings: StarboardSettings) -> bool:
+        """Diff one message's star reactors against user_stars; returns True if anything changed"""
+        if channel_id == settings.channel_id:
+            return False
+
+        channel = self.bot.get_channel(channel_id)
+        if not isinstance(channel, (discord.TextChannel, discord.Thread)):
+            return False
+        try:
+            message = await channel.fetch_message(message_id)
+        except discord.NotFound:
+            await self.purge_starred_messages(guild_id, [message_id])
+            return True
+        except discord.HTTPException:
+            return False
+
+        star_emoji = settings.star_emoji
+        self_star = settings.self_star
+        reaction = discord.utils.find(lambda r: str(r.emoji) == star_emoji, message.reactions)
+        actual = set()
+        if reaction:
+            actual = {
+                user.id async for user in reaction.users()
+                if not user.bot and (self_star or user.id != message.author.id)
+            }
+
+        current_time = datetime.now(timezone.utc).isoformat()
+        async with self._message_lock(message.id):
+            async with aiosqlite.connect(self.database_path) as db:
+                cursor = await db.execute("SELECT user_id FROM user_stars WHERE message_id = ?", (message.id,))
+                recorded = {row[0] for row in await cursor.fetchall()}
+
+                posted = message.id in self.starred_index
+                should_post = len(actual) >= settings.threshold
+                if actual == recorded and posted == should_post:
+                    return False
+
+                await db.executemany(
+                    "DELETE FROM user_stars WHERE message_id = ? AND user_id = ?",
+                    [(message.id, user_id) for user_id in recorded - actual]
+                )
+                await db.executemany("""
+                    INSERT OR IGNORE INTO user_stars (message_id, user_id, guild_id, channel_id, starred_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [(message.id, user_id, guild_id, channel_id, current_time) for user_id in actual - recorded])
+                await db.commit()
+
+                await self.sync_starboard_entry(db, message, len(actual), settings, current_time)
+        return True
 
     # ==================== ADMIN UTILITIES ====================
     
@@ -1024,7 +1705,7 @@ class StarboardSystem(commands.Cog):
         if not ctx.guild:
             return
             
-        settings = await self.get_starboard_settings(ctx.guild.id)
+        settings = self.get_starboard_settings(ctx.guild.id)
         if not settings:
             embed = create_error_embed("Starboard not configured for this server")
             await ctx.send(embed=embed)
@@ -1066,7 +1747,7 @@ class StarboardSystem(commands.Cog):
                 # Check if starboard message exists
                 if not should_clean and starboard_msg_id:
                     try:
-                        starboard_channel = ctx.guild.get_channel(settings['channel_id'])
+                        starboard_channel = ctx.guild.get_channel(settings.channel_id)
                         if starboard_channel and isinstance(starboard_channel, discord.TextChannel):
                             await starboard_channel.fetch_message(starboard_msg_id)
                     except discord.NotFound:
@@ -1078,6 +1759,7 @@ class StarboardSystem(commands.Cog):
                     # Remove from database
                     await db.execute("DELETE FROM starred_messages WHERE message_id = ?", (message_id,))
                     await db.execute("DELETE FROM user_stars WHERE message_id = ?", (message_id,))
+                    self._unindex_starred(message_id)
                     cleaned_count += 1
                     
             await db.commit()
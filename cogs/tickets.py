@@ -2,17 +2,76 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import sqlite3
-from datetime import datetime, timezone
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 import asyncio
-import io
+import heapq
 import logging
+import time
 
 from utils.database import DATABASE_NAME
 from utils.helpers import create_error_embed, create_success_embed, create_info_embed
+from utils.transcripts import TRANSCRIPT_FORMATS, TranscriptWriter, message_record
+from utils.ticket_archive import ARCHIVE_BATCH_SIZE, TicketArchive
+from utils.attachment_store import STATUS_STORED, AttachmentStore
+from utils.job_queue import JobQueue
+from utils.admission import AdmissionQueue
+from utils.ticket_log_sink import TicketLogSink
+from utils.guild_settings import DEFAULT_TICKET_LOG_CHANNEL_ID, TicketSettings, get_settings
+from utils.ticket_metrics import (
+    METRIC_CLAIM, METRIC_CLOSE, METRIC_FIRST_RESPONSE, TicketMetrics, ticket_age_seconds
+)
 
 logger = logging.getLogger("codeverse.tickets")
 
+TICKET_ARCHIVE_DELAY = 10  # Seconds between closing a ticket and archiving/locking its thread
+PENDING_TICKET_MAX_AGE = 300  # Seconds before an unfinished ticket reservation is swept
+
+# Background panel validation: one fetch every few seconds, well after startup
+PANEL_VALIDATE_START_DELAY = 600
+PANEL_VALIDATE_INTERVAL = 5
+PANEL_VALIDATE_BATCH_SIZE = 25
+PANEL_RECHECK_DAYS = 7
+
+TICKET_AUTO_ARCHIVE_MINUTES = 10080  # Longest auto-archive Discord allows (7 days)
+
+AUTOCLOSE_ALL = "*"  # Category key for a guild-wide auto-close threshold
+AUTOCLOSE_MAX_HOURS = TICKET_AUTO_ARCHIVE_MINUTES // 60  # Idle tickets are warned before Discord archives them
+AUTOCLOSE_RETRY_DELAY = 300  # Seconds before retrying a ticket whose thread could not be reached
+ACTIVITY_SAVE_INTERVAL = 60  # Seconds between stored activity updates for a busy ticket
+
+# Settings field -> (table, column) for the per-guild ticket configuration
+TICKET_SETTING_TABLES = {
+    "log_channel_id": ("ticket_log_channels", "channel_id"),
+    "support_role_id": ("ticket_support_roles", "role_id"),
+    "report_role_id": ("ticket_report_roles", "role_id"),
+    "partner_role_id": ("ticket_partner_roles", "role_id"),
+    "log_digest_seconds": ("ticket_log_digests", "digest_seconds"),
+    "staff_role_id": ("ticket_staff_roles", "role_id"),
+}
+
+# Log entries for these categories skip the digest and are sent right away
+LOG_PRIORITY_CATEGORIES = {"report"}
+
+# Ticket creation admission: concurrent thread creations and queue length per guild
+TICKET_CREATE_CONCURRENCY = 2
+TICKET_CREATE_QUEUE_LIMIT = 50
+
+TICKET_PAGE_SIZE = 10
+USER_NAME_CACHE_TTL = 600  # Seconds a fetched display name is reused
+USER_NAME_CACHE_SIZE = 1000  # Least recently used names are dropped beyond this
+USER_FETCH_CONCURRENCY = 5
+
+TICKET_CATEGORY_NAMES = {
+    "support": "General Support",
+    "bug_reports": "Bug Reports",
+    "feature_requests": "Feature Requests",
+    "partnership": "Partnership",
+    "report": "Reports",
+    "other": "Other Issues",
+}
+
 
 class TicketCategoryView(discord.ui.View):
     """View for selecting ticket category"""
@@ -104,12 +163,12 @@ class TicketPanelView(discord.ui.View):
     )
     async def create_ticket_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Handle ticket creation button"""
-        # Check if user already has an open ticket
+        # Check if user already has an open ticket in this server
         conn = sqlite3.connect(DATABASE_NAME)
         cursor = conn.cursor()
         cursor.execute(
-            'SELECT ticket_thread_id FROM tickets WHERE user_id = ? AND status = "open"',
-            (interaction.user.id,)
+            'SELECT ticket_thread_id FROM tickets WHERE guild_id = ? AND user_id = ? AND status = "open"',
+            (interaction.guild_id, interaction.user.id)
         )
         existing = cursor.fetchone()
         conn.close()
@@ -136,74 +195,271 @@ class TicketPanelView(discord.ui.View):
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 
+class TicketListView(discord.ui.View):
+    """Paginated ticket listing; pages are walked with a (created_at, ticket_id) keyset"""
+    
+    def __init__(self, cog, author_id: int, guild: discord.Guild, filters: dict):
+        super().__init__(timeout=180)
+        self.cog = cog
+        self.author_id = author_id
+        self.guild = guild
+        self.filters = filters
+        self.cursors = [None]  # Keyset cursor that starts each visited page
+        self.has_next = False
+        self.empty = False
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message(
+                embed=create_error_embed("Not Yours", "Run `/tickets` to browse tickets yourself."),
+                ephemeral=True
+            )
+            return False
+        return True
+    
+    async def render(self) -> discord.Embed:
+        rows = self.cog._fetch_ticket_page(self.guild.id, self.filters, self.cursors[-1])
+        self.has_next = len(rows) > TICKET_PAGE_SIZE
+        rows = rows[:TICKET_PAGE_SIZE]
+        self.empty = not rows
+        if self.has_next:
+            last = rows[-1]
+            self.next_cursor = (last[-1], last[0])
+        
+        self.previous_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = not self.has_next
+        return await self.cog._build_ticket_list_embed(self.guild, self.filters, rows, len(self.cursors))
+    
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.grey)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        embed = await self.render()
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.grey)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.has_next:
+            self.cursors.append(self.next_cursor)
+        embed = await self.render()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+
 class Tickets(commands.Cog):
     """Advanced ticket system using threads for support and moderation"""
     
     def __init__(self, bot):
         self.bot = bot
         self._init_database()
+        self.archive = TicketArchive()
+        self.attachments = AttachmentStore()
+        self.panel_ids = self._load_panel_ids()
+        self.metrics = TicketMetrics()
+        self._user_name_cache: OrderedDict = OrderedDict()  # LRU of user_id -> (name, expires_at)
+        self._user_fetch_semaphore = asyncio.Semaphore(USER_FETCH_CONCURRENCY)
+        # Open tickets still waiting for a staff reply: thread_id -> (ticket_id, guild_id, owner_id, opened_ts)
+        self.awaiting_response = self._load_awaiting_response()
+        
+        # Inactivity auto-close: activity is tracked in memory, deadlines live in a heap
+        self.autoclose_settings = self._load_autoclose_settings()
+        self.open_tickets: dict = {}  # thread_id -> (ticket_id, guild_id, owner_id, category, created_at)
+        self.last_activity: dict = {}  # thread_id -> unix time of the last non-bot message
+        self._activity_saved: dict = {}  # thread_id -> last_activity value last written to the tickets table
+        self.autoclose_warned: dict = {}  # thread_id -> unix time the warned ticket closes
+        self.autoclose_deadlines: dict = {}  # thread_id -> deadline of its live heap entry
+        self._autoclose_heap: list = []
+        self._autoclose_wakeup = asyncio.Event()
+        self._autoclose_task: Optional[asyncio.Task] = None
+        
+        # Delayed actions (archive/lock, transcripts, logs) survive restarts
+        self.jobs = JobQueue(bot)
+        self.jobs.register("ticket_archive", self._job_archive_thread)
+        self.jobs.register("ticket_transcript", self._job_transcript)
+        self.jobs.register("ticket_log", self._job_log_action)
+        self.jobs.register("ticket_attachments", self._job_archive_attachments)
+        self.log_sink = TicketLogSink()
+        self.admission = AdmissionQueue(TICKET_CREATE_CONCURRENCY, TICKET_CREATE_QUEUE_LIMIT)
         
         # Configuration
         self.ticket_channel_id = None  # Set this to the channel where tickets will be created as threads
         # Note: Logs will be sent to #ticketlog channel in each server (optional)
-        self.staff_role_id = 1417900662053671073  # Your staff role ID
-        
-        # Ticket naming
-        self.ticket_counter = self._get_ticket_counter()
+        # Per-guild roles and log channel live in the shared settings service
+        self.settings = get_settings(bot)
+        self.settings.register("tickets", self._load_ticket_settings(), TicketSettings(), self._save_ticket_settings)
         
         # Register persistent views on bot startup
         self.bot.loop.create_task(self._restore_persistent_views())
     
+    async def cog_load(self):
+        # Buttons use static custom_ids, so one registration covers every panel and ticket
+        # thread without fetching their messages
+        self.bot.add_view(TicketPanelView(self))
+        self.bot.add_view(TicketControlView(self))
+        self.jobs.start()
+        self._autoclose_task = asyncio.create_task(self._autoclose_loop())
+    
+    async def cog_unload(self):
+        self.jobs.stop()
+        await self.log_sink.flush_all()
+        if self._autoclose_task:
+            self._autoclose_task.cancel()
+    
+    def _schedule_close_jobs(self, thread: discord.Thread, ticket_id: int, category: Optional[str] = None):
+        """Queue the transcript now and the archive/lock after the usual delay"""
+        payload = {"ticket_id": ticket_id, "guild_id": thread.guild.id, "thread_id": thread.id}
+        self.jobs.schedule("ticket_transcript", {**payload, "category": category})
+        self.jobs.schedule("ticket_archive", payload, delay=TICKET_ARCHIVE_DELAY)
+    
+    def _schedule_log(self, ticket_id: int, thread: discord.abc.GuildChannel, user: discord.abc.User,
+                      action: str, category: Optional[str] = None, reason: Optional[str] = None):
+        self.jobs.schedule("ticket_log", {
+            "ticket_id": ticket_id,
+            "guild_id": thread.guild.id,
+            "thread_id": thread.id,
+            "user_id": user.id,
+            "action": action,
+            "category": category,
+            "reason": reason,
+        })
+    
+    async def _resolve_job_thread(self, payload: dict) -> Optional[discord.abc.GuildChannel]:
+        """Look up a job's thread, returning None when it no longer exists"""
+        guild = self.bot.get_guild(payload["guild_id"])
+        if not guild:
+            return None
+        thread = guild.get_thread(payload["thread_id"]) or guild.get_channel(payload["thread_id"])
+        if thread:
+            return thread
+        try:
+            return await guild.fetch_channel(payload["thread_id"])
+        except (discord.NotFound, discord.Forbidden):
+            return None
+    
+    async def _job_archive_thread(self, payload: dict):
+        thread = await self._resolve_job_thread(payload)
+        if not isinstance(thread, discord.Thread):
+            return
+        await thread.edit(archived=True, locked=True)
+        print(f"[Tickets] 🔒 Thread archived for closed ticket #{payload['ticket_id']}")
+    
+    async def _job_transcript(self, payload: dict):
+        thread = await self._resolve_job_thread(payload)
+        if not isinstance(thread, discord.Thread):
+            return
+        transcript = await self._generate_transcript(
+            thread, payload["ticket_id"], save_to_log=True, archive=True, category=payload.get("category")
+        )
+        if transcript is None:
+            raise RuntimeError(f"transcript for ticket #{payload['ticket_id']} failed")
+    
+    async def _job_archive_attachments(self, payload: dict):
+        counts = await self.attachments.archive(payload, payload["attachments"])
+        print(f"[Tickets] 📎 Archived attachments for ticket #{payload['ticket_id']}: "
+              f"{counts['stored']} stored, {counts['skipped']} skipped")
+    
+    async def _job_log_action(self, payload: dict):
+        thread = await self._resolve_job_thread(payload)
+        if not thread:
+            return
+        user = self.bot.get_user(payload["user_id"]) or await self.bot.fetch_user(payload["user_id"])
+        await self._log_ticket_action(
+            payload["action"],
+            payload["ticket_id"],
+            thread,
+            user,
+            payload.get("category"),
+            payload.get("reason")
+        )
+    
     async def _restore_persistent_views(self):
-        """Restore persistent views for all ticket panels on bot startup"""
+        """Startup maintenance once the gateway is ready (panel views are registered in cog_load)"""
         await self.bot.wait_until_ready()
+        await self._assign_legacy_ticket_guilds()
+        await self.log_sink.resume(self.bot)
         
+        await asyncio.sleep(PANEL_VALIDATE_START_DELAY)
         try:
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            
-            # Get all ticket panels from database
-            cursor.execute('SELECT guild_id, channel_id, message_id FROM ticket_panels')
-            panels = cursor.fetchall()
-            conn.close()
-            
-            # Re-register the view for each panel
-            for guild_id, channel_id, message_id in panels:
+            # Runs after the delay, so every reservation from before this start is old enough to go
+            self._sweep_pending_tickets()
+            await self._validate_panels()
+        except Exception as e:
+            logger.error(f"Error validating ticket panels: {e}")
+    
+    async def _validate_panels(self):
+        """Low-priority sweep that prunes panel rows whose message is gone, oldest check first"""
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT guild_id, channel_id, message_id FROM ticket_panels
+            WHERE last_checked IS NULL OR last_checked < datetime('now', '-{PANEL_RECHECK_DAYS} days')
+            ORDER BY last_checked IS NOT NULL, last_checked
+        ''')
+        panels = cursor.fetchall()
+        conn.close()
+        
+        pruned = 0
+        for start in range(0, len(panels), PANEL_VALIDATE_BATCH_SIZE):
+            stale, alive = [], []
+            for guild_id, channel_id, message_id in panels[start:start + PANEL_VALIDATE_BATCH_SIZE]:
+                guild = self.bot.get_guild(guild_id)
+                if not guild or guild.unavailable:
+                    continue  # Might be an outage, check again next sweep
+                
+                channel = guild.get_channel(channel_id)
+                if not isinstance(channel, discord.TextChannel):
+                    stale.append(message_id)
+                    continue
+                
                 try:
-                    guild = self.bot.get_guild(guild_id)
-                    if not guild:
-                        continue
-                    
-                    channel = guild.get_channel(channel_id)
-                    if not channel or not isinstance(channel, discord.TextChannel):
-                        continue
-                    
-                    # Fetch the message to ensure it exists
-                    try:
-                        message = await channel.fetch_message(message_id)
-                        # Create and attach the persistent view
-                        view = TicketPanelView(self)
-                        # The view is automatically registered due to persistent custom_id
-                        self.bot.add_view(view, message_id=message_id)
-                        logger.info(f"Restored ticket panel view for message {message_id} in guild {guild_id}")
-                    except discord.NotFound:
-                        # Message was deleted, remove from database
-                        conn = sqlite3.connect(DATABASE_NAME)
-                        cursor = conn.cursor()
-                        cursor.execute('DELETE FROM ticket_panels WHERE message_id = ?', (message_id,))
-                        conn.commit()
-                        conn.close()
-                        logger.warning(f"Ticket panel message {message_id} not found, removed from database")
-                    except Exception as e:
-                        logger.error(f"Error fetching ticket panel message {message_id}: {e}")
-                        
-                except Exception as e:
-                    logger.error(f"Error restoring ticket panel for guild {guild_id}: {e}")
-            
-            logger.info(f"Restored {len(panels)} ticket panel views")
+                    await channel.fetch_message(message_id)
+                    alive.append(message_id)
+                except discord.NotFound:
+                    stale.append(message_id)
+                except discord.HTTPException as e:
+                    logger.warning(f"Could not validate ticket panel {message_id}: {e}")
+                await asyncio.sleep(PANEL_VALIDATE_INTERVAL)
             
-        except Exception as e:
-            logger.error(f"Error restoring persistent ticket views: {e}")
+            self._forget_panels(stale)
+            if alive:
+                conn = sqlite3.connect(DATABASE_NAME)
+                conn.executemany(
+                    'UPDATE ticket_panels SET last_checked = CURRENT_TIMESTAMP WHERE message_id = ?',
+                    [(message_id,) for message_id in alive]
+                )
+                conn.commit()
+                conn.close()
+            pruned += len(stale)
+        
+        if pruned:
+            logger.info(f"Pruned {pruned} stale ticket panel(s)")
+    
+    def _load_panel_ids(self) -> set:
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute('SELECT message_id FROM ticket_panels')
+        panel_ids = {row[0] for row in cursor.fetchall()}
+        conn.close()
+        return panel_ids
+    
+    def _forget_panels(self, message_ids: list):
+        """Drop panel rows for messages that no longer exist"""
+        if not message_ids:
+            return
+        conn = sqlite3.connect(DATABASE_NAME)
+        conn.executemany('DELETE FROM ticket_panels WHERE message_id = ?', [(message_id,) for message_id in message_ids])
+        conn.commit()
+        conn.close()
+        self.panel_ids.difference_update(message_ids)
+        logger.info(f"Removed {len(message_ids)} stale ticket panel(s)")
+    
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.message_id in self.panel_ids:
+            self._forget_panels([payload.message_id])
+    
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        self._forget_panels([message_id for message_id in payload.message_ids if message_id in self.panel_ids])
     
     def _init_database(self):
         """Initialize tickets database table"""
@@ -213,6 +469,8 @@ class Tickets(commands.Cog):
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS tickets (
                 ticket_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                ticket_number INTEGER,
                 ticket_thread_id INTEGER NOT NULL,
                 user_id INTEGER NOT NULL,
                 category TEXT NOT NULL,
@@ -224,6 +482,42 @@ class Tickets(commands.Cog):
             )
         ''')
         
+        # Older databases predate per-guild tickets; their numbers were global
+        cursor.execute('PRAGMA table_info(tickets)')
+        columns = [row[1] for row in cursor.fetchall()]
+        if 'guild_id' not in columns:
+            cursor.execute('ALTER TABLE tickets ADD COLUMN guild_id INTEGER')
+        if 'ticket_number' not in columns:
+            cursor.execute('ALTER TABLE tickets ADD COLUMN ticket_number INTEGER')
+            cursor.execute('UPDATE tickets SET ticket_number = ticket_id')
+        if 'first_response_at' not in columns:
+            cursor.execute('ALTER TABLE tickets ADD COLUMN first_response_at TIMESTAMP')
+        if 'claimed_at' not in columns:
+            cursor.execute('ALTER TABLE tickets ADD COLUMN claimed_at TIMESTAMP')
+        # Auto-close state (unix times), so restarts neither reset idle timers nor repeat warnings
+        if 'last_user_activity' not in columns:
+            cursor.execute('ALTER TABLE tickets ADD COLUMN last_user_activity REAL')
+        if 'warned_at' not in columns:
+            cursor.execute('ALTER TABLE tickets ADD COLUMN warned_at REAL')
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_guild_status_user ON tickets (guild_id, status, user_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_guild_created ON tickets (guild_id, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_thread ON tickets (ticket_thread_id)')
+        # Listing filters; ticket_id is the rowid so each index already ends in (created_at, ticket_id)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_guild_status_created ON tickets (guild_id, status, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_guild_category_created ON tickets (guild_id, category, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_guild_claimer_created ON tickets (guild_id, claimed_by, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_guild_user_created ON tickets (guild_id, user_id, created_at)')
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_tickets_guild_number ON tickets (guild_id, ticket_number)')
+        
+        # Last ticket number handed out per guild
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_sequences (
+                guild_id INTEGER PRIMARY KEY,
+                last_number INTEGER NOT NULL
+            )
+        ''')
+        
         # Table for storing persistent ticket panels
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS ticket_panels (
@@ -237,6 +531,23 @@ class Tickets(commands.Cog):
             )
         ''')
         
+        # Inactivity auto-close thresholds; category '*' is the guild-wide default
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_autoclose_settings (
+                guild_id INTEGER NOT NULL,
+                category TEXT NOT NULL,
+                idle_hours INTEGER NOT NULL,
+                warn_hours INTEGER NOT NULL,
+                set_by INTEGER,
+                set_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (guild_id, category)
+            )
+        ''')
+        
+        cursor.execute('PRAGMA table_info(ticket_panels)')
+        if 'last_checked' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE ticket_panels ADD COLUMN last_checked TIMESTAMP')
+        
         # Table for storing custom ticket log channel settings
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS ticket_log_channels (
@@ -247,6 +558,16 @@ class Tickets(commands.Cog):
             )
         ''')
         
+        # Table for storing ticket log digest intervals
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_log_digests (
+                guild_id INTEGER PRIMARY KEY,
+                digest_seconds INTEGER NOT NULL,
+                set_by INTEGER NOT NULL,
+                set_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
         # Table for storing ticket support team role settings
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS ticket_support_roles (
@@ -277,49 +598,135 @@ class Tickets(commands.Cog):
             )
         ''')
         
+        # Table for storing the staff role that may claim and close tickets
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_staff_roles (
+                guild_id INTEGER PRIMARY KEY,
+                role_id INTEGER NOT NULL,
+                set_by INTEGER NOT NULL,
+                set_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
         conn.commit()
         conn.close()
     
-    def _get_ticket_counter(self) -> int:
-        """Get the next ticket number"""
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM tickets')
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count + 1
+    def _reserve_ticket(self, guild_id: int, user_id: int, category: str) -> tuple[int, int]:
+        """Allocate the next ticket number for the guild and insert a pending ticket in one transaction"""
+        conn = sqlite3.connect(DATABASE_NAME, timeout=10)
+        try:
+            with conn:
+                # The first ticket of a guild starts above any legacy (pre guild_id) numbers
+                conn.execute('''
+                    INSERT INTO ticket_sequences (guild_id, last_number)
+                    VALUES (?, (SELECT COALESCE(MAX(ticket_number), 0) FROM tickets WHERE guild_id = ? OR guild_id IS NULL) + 1)
+                    ON CONFLICT(guild_id) DO UPDATE SET last_number = last_number + 1
+                ''', (guild_id, guild_id))
+                ticket_number = conn.execute(
+                    'SELECT last_number FROM ticket_sequences WHERE guild_id = ?', (guild_id,)
+                ).fetchone()[0]
+                cursor = conn.execute('''
+                    INSERT INTO tickets (guild_id, ticket_number, ticket_thread_id, user_id, category, status)
+                    VALUES (?, ?, 0, ?, ?, 'pending')
+                ''', (guild_id, ticket_number, user_id, category))
+                return cursor.lastrowid, ticket_number
+        finally:
+            conn.close()
     
-    def _get_ticket_log_channel(self, guild: discord.Guild) -> Optional[discord.TextChannel]:
-        """Get the ticketlog channel for the guild if it exists"""
-        # Check for hardcoded ticket log channel
-        TICKET_LOGS_CHANNEL = 1438487366305190018
-        channel = guild.get_channel(TICKET_LOGS_CHANNEL)
-        if channel and isinstance(channel, discord.TextChannel):
-            return channel
-
-        # First check if a custom channel is set in database
+    async def _assign_legacy_ticket_guilds(self):
+        """Fill in guild_id for tickets created before tickets were scoped per guild"""
         try:
             conn = sqlite3.connect(DATABASE_NAME)
             cursor = conn.cursor()
-            cursor.execute('SELECT channel_id FROM ticket_log_channels WHERE guild_id = ?', (guild.id,))
-            result = cursor.fetchone()
+            cursor.execute('SELECT ticket_id, ticket_thread_id FROM tickets WHERE guild_id IS NULL')
+            rows = cursor.fetchall()
             conn.close()
+            if not rows:
+                return
             
-            if result:
-                channel = guild.get_channel(result[0])
-                if channel and isinstance(channel, discord.TextChannel):
-                    return channel
-                else:
-                    # Clean up invalid channel reference
-                    conn = sqlite3.connect(DATABASE_NAME)
-                    cursor = conn.cursor()
-                    cursor.execute('DELETE FROM ticket_log_channels WHERE guild_id = ?', (guild.id,))
-                    conn.commit()
-                    conn.close()
+            # Single-server deployments own every legacy ticket; otherwise look the thread up,
+            # fetching it when it is archived and no longer cached
+            only_guild = self.bot.guilds[0].id if len(self.bot.guilds) == 1 else None
+            updates = []
+            for ticket_id, thread_id in rows:
+                guild_id = only_guild
+                if guild_id is None:
+                    thread = self.bot.get_channel(thread_id)
+                    if thread is None:
+                        try:
+                            thread = await self.bot.fetch_channel(thread_id)
+                        except (discord.NotFound, discord.Forbidden):
+                            thread = None
+                    guild_id = thread.guild.id if thread and getattr(thread, 'guild', None) else None
+                if guild_id is not None:
+                    updates.append((guild_id, ticket_id))
+            
+            conn = sqlite3.connect(DATABASE_NAME)
+            conn.executemany('UPDATE tickets SET guild_id = ? WHERE ticket_id = ?', updates)
+            conn.commit()
+            conn.close()
+            self.metrics.credit_tickets([ticket_id for _, ticket_id in updates])
+            logger.info(f"Assigned guilds to {len(updates)} of {len(rows)} legacy tickets")
+            if len(updates) < len(rows):
+                logger.warning(f"{len(rows) - len(updates)} legacy tickets belong to deleted or inaccessible "
+                               f"threads; they keep no guild and will be retried on the next start")
         except Exception as e:
-            print(f"[Tickets] Error checking custom log channel: {e}")
+            logger.error(f"Error assigning guilds to legacy tickets: {e}")
+    
+    def _sweep_pending_tickets(self):
+        """Delete reservations left behind by a creation that never finished (e.g. the bot stopped mid-way)"""
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.execute(
+            "DELETE FROM tickets WHERE status = 'pending' AND created_at < datetime('now', ?)",
+            (f"-{PENDING_TICKET_MAX_AGE} seconds",)
+        )
+        conn.commit()
+        conn.close()
+        if cursor.rowcount:
+            logger.info(f"Removed {cursor.rowcount} unfinished ticket reservations")
+    
+    def _ticket_settings(self, guild_id: int) -> TicketSettings:
+        return self.settings.get_or_default("tickets", guild_id)
+    
+    def _load_ticket_settings(self) -> dict:
+        """Build one TicketSettings record per configured guild from the ticket settings tables"""
+        values: dict = {}
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        for field, (table, column) in TICKET_SETTING_TABLES.items():
+            cursor.execute(f'SELECT guild_id, {column} FROM {table}')
+            for guild_id, value in cursor.fetchall():
+                values.setdefault(guild_id, {})[field] = value
+        conn.close()
+        return {guild_id: TicketSettings(**fields) for guild_id, fields in values.items()}
+    
+    async def _save_ticket_settings(self, guild_id: int, old: Optional[TicketSettings], new: TicketSettings,
+                                    updated_by: Optional[int]):
+        old = old or TicketSettings()
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        for field, (table, column) in TICKET_SETTING_TABLES.items():
+            value = getattr(new, field)
+            if value == getattr(old, field):
+                continue
+            if value is None:
+                cursor.execute(f'DELETE FROM {table} WHERE guild_id = ?', (guild_id,))
+            else:
+                cursor.execute(f'''
+                    INSERT OR REPLACE INTO {table} (guild_id, {column}, set_by, set_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ''', (guild_id, value, updated_by))
+        conn.commit()
+        conn.close()
+    
+    def _get_ticket_log_channel(self, guild: discord.Guild) -> Optional[discord.TextChannel]:
+        """Get the ticketlog channel for the guild if it exists"""
+        # Configured channel first, then the default log channel, then well-known names
+        for channel_id in (self._ticket_settings(guild.id).log_channel_id, DEFAULT_TICKET_LOG_CHANNEL_ID):
+            channel = guild.get_channel(channel_id) if channel_id else None
+            if channel and isinstance(channel, discord.TextChannel):
+                return channel
         
-        # Fall back to checking channel names
         for channel in guild.text_channels:
             if channel.name.lower() in ['ticketlog', 'ticket-log', 'ticketlogs', 'ticket-logs']:
                 return channel
@@ -327,84 +734,38 @@ class Tickets(commands.Cog):
     
     def _get_support_team_role(self, guild: discord.Guild) -> Optional[discord.Role]:
         """Get the support team role for the guild if it exists"""
-        try:
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('SELECT role_id FROM ticket_support_roles WHERE guild_id = ?', (guild.id,))
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result:
-                role = guild.get_role(result[0])
-                if role:
-                    return role
-                else:
-                    # Clean up invalid role reference
-                    conn = sqlite3.connect(DATABASE_NAME)
-                    cursor = conn.cursor()
-                    cursor.execute('DELETE FROM ticket_support_roles WHERE guild_id = ?', (guild.id,))
-                    conn.commit()
-                    conn.close()
-        except Exception as e:
-            print(f"[Tickets] Error checking custom support role: {e}")
-        
-        # Fall back to checking for default staff role
-        for role in guild.roles:
-            if role.id == self.staff_role_id:
-                return role
-        return None
+        settings = self._ticket_settings(guild.id)
+        role = guild.get_role(settings.support_role_id) if settings.support_role_id else None
+        # Fall back to the default staff role
+        return role or guild.get_role(settings.staff_role_id)
     
     def _get_report_team_role(self, guild: discord.Guild) -> Optional[discord.Role]:
         """Get the report team role for the guild if it exists"""
-        try:
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('SELECT role_id FROM ticket_report_roles WHERE guild_id = ?', (guild.id,))
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result:
-                role = guild.get_role(result[0])
-                if role:
-                    return role
-                else:
-                    # Clean up invalid role reference
-                    conn = sqlite3.connect(DATABASE_NAME)
-                    cursor = conn.cursor()
-                    cursor.execute('DELETE FROM ticket_report_roles WHERE guild_id = ?', (guild.id,))
-                    conn.commit()
-                    conn.close()
-        except Exception as e:
-            print(f"[Tickets] Error checking report team role: {e}")
-        
+        role_id = self._ticket_settings(guild.id).report_role_id
+        role = guild.get_role(role_id) if role_id else None
         # Fall back to support team role if no report role set
-        return self._get_support_team_role(guild)
+        return role or self._get_support_team_role(guild)
     
     def _get_partner_team_role(self, guild: discord.Guild) -> Optional[discord.Role]:
         """Get the partner team role for the guild if it exists"""
-        try:
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('SELECT role_id FROM ticket_partner_roles WHERE guild_id = ?', (guild.id,))
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result:
-                role = guild.get_role(result[0])
-                if role:
-                    return role
-                else:
-                    # Clean up invalid role reference
-                    conn = sqlite3.connect(DATABASE_NAME)
-                    cursor = conn.cursor()
-                    cursor.execute('DELETE FROM ticket_partner_roles WHERE guild_id = ?', (guild.id,))
-                    conn.commit()
-                    conn.close()
-        except Exception as e:
-            print(f"[Tickets] Error checking partner team role: {e}")
-        
+        role_id = self._ticket_settings(guild.id).partner_role_id
+        role = guild.get_role(role_id) if role_id else None
         # Fall back to support team role if no partner role set
-        return self._get_support_team_role(guild)
+        return role or self._get_support_team_role(guild)
+    
+    def _get_category_staff_role(self, guild: discord.Guild, category: str) -> Optional[discord.Role]:
+        """The role whose members are brought into tickets of this category"""
+        if category == "report":
+            role = self._get_report_team_role(guild)
+        elif category == "partnership":
+            role = self._get_partner_team_role(guild)
+        else:
+            role = self._get_support_team_role(guild)
+        
+        # A role mention only adds members to a private thread if the bot may mention that role
+        if role and not role.mentionable and not guild.me.guild_permissions.mention_everyone:
+            print(f"[Tickets] ⚠️ {role.name} in {guild.name} is not mentionable - staff will not be added to new tickets")
+        return role
     
     async def show_ticket_info(self, interaction: discord.Interaction, category: str):
         """Show information about the selected ticket type"""
@@ -535,16 +896,81 @@ class Tickets(commands.Cog):
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
     
     async def create_ticket(self, interaction: discord.Interaction, category: str):
-        """Create a new ticket thread"""
+        """Create a new ticket thread once the guild's admission queue lets it through"""
         # Defer the response to avoid timeout
         await interaction.response.defer(ephemeral=True)
         
         if not interaction.guild:
             return
-            
+        
         guild = interaction.guild
         user = interaction.user
         
+        # Repeated clicks while a ticket is queued or being created are answered, not re-run
+        position = self.admission.position(guild.id, user.id)
+        if position is not None:
+            status = "is being created now" if position == 0 else f"is queued at position **#{position}**"
+            await interaction.followup.send(
+                embed=create_info_embed("Ticket In Progress", f"Your ticket {status}. Please wait a moment."),
+                ephemeral=True
+            )
+            return
+        
+        if self.admission.is_full(guild.id):
+            await interaction.followup.send(
+                embed=create_error_embed(
+                    "Tickets Busy",
+                    "A lot of tickets are being opened right now. Please try again in a few minutes."
+                ),
+                ephemeral=True
+            )
+            return
+        
+        queued_message = None
+        
+        async def notify_queued(position: int):
+            nonlocal queued_message
+            queued_message = await interaction.followup.send(
+                embed=create_info_embed(
+                    "You're in the Queue",
+                    f"Many tickets are being opened right now. You are **#{position}** in line; "
+                    "your ticket will be created automatically."
+                ),
+                ephemeral=True,
+                wait=True
+            )
+        
+        async with self.admission.slot(guild.id, user.id, on_queued=notify_queued):
+            if queued_message:
+                try:
+                    await queued_message.edit(
+                        embed=create_info_embed("Creating Your Ticket", "It's your turn, setting up your ticket now...")
+                    )
+                except discord.HTTPException:
+                    pass
+            await self._create_ticket(interaction, category)
+    
+    async def _create_ticket(self, interaction: discord.Interaction, category: str):
+        """Create the ticket thread, row and welcome message for an admitted request"""
+        guild = interaction.guild
+        user = interaction.user
+        
+        # The panel checks this too, but another request may have opened a ticket while this one waited
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT ticket_thread_id FROM tickets WHERE guild_id = ? AND user_id = ? AND status = "open"',
+            (guild.id, user.id)
+        )
+        existing = cursor.fetchone()
+        conn.close()
+        if existing:
+            await interaction.followup.send(
+                embed=create_error_embed("Ticket Already Open", f"You already have an open ticket: <#{existing[0]}>"),
+                ephemeral=True
+            )
+            return
+        
         # Category emojis and names
         category_info = {
             "support": ("❓", "General Support"),
@@ -575,50 +1001,59 @@ class Tickets(commands.Cog):
             )
             return
         
-        # Create ticket thread
-        ticket_number = self.ticket_counter
-        self.ticket_counter += 1
+        # Reserve the ticket number and row together so numbers never repeat within a guild
+        try:
+            ticket_id, ticket_number = self._reserve_ticket(guild.id, user.id, category)
+        except sqlite3.Error as e:
+            await interaction.followup.send(
+                embed=create_error_embed("Failed to Create Ticket", f"Error: {str(e)}"),
+                ephemeral=True
+            )
+            return
         
         thread_name = f"{emoji} Ticket-{ticket_number:04d} | {category_name}"
         
+        # Staff join through the role mention in the welcome message, so a ticket costs the
+        # same three API calls (create, add owner, welcome) whatever the size of the team
+        staff_role = self._get_category_staff_role(guild, category)
+        
         try:
             # Create the thread
             thread = await ticket_channel.create_thread(
                 name=thread_name,
-                auto_archive_duration=4320  # 3 days
+                auto_archive_duration=TICKET_AUTO_ARCHIVE_MINUTES
             )
             
             # Add user to thread
             await thread.add_user(user)
-            
-            # Add staff role members based on ticket category
-            staff_role = None
-            if category == "report":
-                staff_role = self._get_report_team_role(guild)
-            elif category == "partnership":
-                staff_role = self._get_partner_team_role(guild)
-            else:
-                staff_role = self._get_support_team_role(guild)
-            
-            
         except Exception as e:
+            # Drop the reservation; the number is simply skipped
+            conn = sqlite3.connect(DATABASE_NAME)
+            conn.execute('DELETE FROM tickets WHERE ticket_id = ?', (ticket_id,))
+            conn.commit()
+            conn.close()
             await interaction.followup.send(
                 embed=create_error_embed("Failed to Create Ticket", f"Error: {str(e)}"),
                 ephemeral=True
             )
             return
         
-        # Save to database
+        # Attach the thread and open the ticket
         conn = sqlite3.connect(DATABASE_NAME)
         cursor = conn.cursor()
         cursor.execute(
-            'INSERT INTO tickets (ticket_thread_id, user_id, category) VALUES (?, ?, ?)',
-            (thread.id, user.id, category)
+            'UPDATE tickets SET ticket_thread_id = ?, status = "open" WHERE ticket_id = ?',
+            (thread.id, ticket_id)
         )
-        ticket_id = cursor.lastrowid
         conn.commit()
         conn.close()
         
+        self.awaiting_response[thread.id] = (ticket_id, guild.id, user.id, time.time())
+        self._track_ticket(thread.id, ticket_id, guild.id, user.id, category,
+                           datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"))
+        self.metrics.record(guild.id, "opened")
+        self.metrics.record(guild.id, f"opened:{category}")
+        
         # Send welcome message in thread
         embed = discord.Embed(
             title=f"{emoji} Ticket #{ticket_number} - {category_name}",
@@ -646,7 +1081,14 @@ class Tickets(commands.Cog):
         
         view = TicketControlView(self)
         staff_mention = staff_role.mention if staff_role else "@Staff"
-        await thread.send(content=f"{user.mention} | Staff: {staff_mention}", embed=embed, view=view)
+        await thread.send(
+            content=f"{user.mention} | Staff: {staff_mention}",
+            embed=embed,
+            view=view,
+            allowed_mentions=discord.AllowedMentions(
+                everyone=False, users=[user], roles=[staff_role] if staff_role else False
+            )
+        )
         
         # Confirm to user
         await interaction.followup.send(
@@ -664,7 +1106,7 @@ class Tickets(commands.Cog):
                 ticket_id,
                 thread,
                 user,
-                category_name
+                category
             )
         
         print(f"[Tickets] Ticket #{ticket_number} created by {user} ({user.id}) - Category: {category_name}")
@@ -684,7 +1126,7 @@ class Tickets(commands.Cog):
         conn = sqlite3.connect(DATABASE_NAME)
         cursor = conn.cursor()
         cursor.execute(
-            'SELECT ticket_id, user_id, category FROM tickets WHERE ticket_thread_id = ? AND status = "open"',
+            'SELECT ticket_id, user_id, category, created_at FROM tickets WHERE ticket_thread_id = ? AND status = "open"',
             (thread.id,)
         )
         result = cursor.fetchone()
@@ -697,14 +1139,14 @@ class Tickets(commands.Cog):
             conn.close()
             return
         
-        ticket_id, user_id, category = result
+        ticket_id, user_id, category, created_at = result
         
         # Check permissions (ticket owner or staff)
         has_permission = False
         if isinstance(interaction.user, discord.Member):
             has_permission = (
                 interaction.user.id == user_id or
-                any(role.id == self.staff_role_id for role in interaction.user.roles) or
+                any(role.id == self._ticket_settings(interaction.guild_id).staff_role_id for role in interaction.user.roles) or
                 interaction.user.guild_permissions.administrator
             )
         elif interaction.user.id == user_id:
@@ -725,6 +1167,7 @@ class Tickets(commands.Cog):
         )
         conn.commit()
         conn.close()
+        self._record_close(thread, created_at, interaction.user, user_id)
         
         # Send closure message
         embed = discord.Embed(
@@ -741,28 +1184,345 @@ class Tickets(commands.Cog):
         
         await interaction.response.send_message(embed=embed)
         
-        # Log closure
-        await self._log_ticket_action(
-            "CLOSED",
-            ticket_id,
-            thread,
-            interaction.user,
-            category,
-            f"Closed by {interaction.user.name}"
+        # Log closure, save the transcript and archive the thread in the background
+        self._schedule_log(ticket_id, thread, interaction.user, "CLOSED", category, f"Closed by {interaction.user.name}")
+        self._schedule_close_jobs(thread, ticket_id, category)
+        
+        print(f"[Tickets] Ticket #{ticket_id} closed by {interaction.user}")
+    
+    def _load_awaiting_response(self) -> dict:
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT ticket_thread_id, ticket_id, guild_id, user_id, created_at FROM tickets '
+            'WHERE status = "open" AND first_response_at IS NULL'
         )
+        rows = cursor.fetchall()
+        conn.close()
+        now = time.time()
+        return {
+            thread_id: (ticket_id, guild_id, user_id, now - ticket_age_seconds(created_at))
+            for thread_id, ticket_id, guild_id, user_id, created_at in rows
+        }
+    
+    def _is_staff(self, member: discord.Member) -> bool:
+        if member.guild_permissions.administrator:
+            return True
+        staff_roles = {self._ticket_settings(member.guild.id).staff_role_id}
+        for role in (self._get_support_team_role(member.guild), self._get_report_team_role(member.guild),
+                     self._get_partner_team_role(member.guild)):
+            if role:
+                staff_roles.add(role.id)
+        return any(role.id in staff_roles for role in member.roles)
+    
+    def _record_close(self, thread: discord.Thread, created_at: str, closer: discord.abc.User, owner_id: int):
+        self.awaiting_response.pop(thread.id, None)
+        self._untrack_ticket(thread.id)
+        # Owners closing their own ticket don't count towards staff throughput
+        staff_id = closer.id if closer.id != owner_id else None
+        self.metrics.record(thread.guild.id, METRIC_CLOSE, ticket_age_seconds(created_at), staff_id, "closed")
+    
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        """Track ticket activity and record the first staff reply in a ticket thread"""
+        if message.author.bot or message.channel.id not in self.open_tickets:
+            return
+        
+        now = time.time()
+        self.last_activity[message.channel.id] = now
+        if self.autoclose_warned.pop(message.channel.id, None) is not None:
+            self._save_activity(message.channel.id, clear_warning=True)
+            self._schedule_autoclose(message.channel.id)
+        elif now - self._activity_saved.get(message.channel.id, 0) >= ACTIVITY_SAVE_INTERVAL:
+            self._save_activity(message.channel.id)
+        
+        pending = self.awaiting_response.get(message.channel.id)
+        if not pending:
+            return
+        
+        ticket_id, guild_id, owner_id, opened_ts = pending
+        if message.author.id == owner_id or not isinstance(message.author, discord.Member):
+            return
+        if not self._is_staff(message.author):
+            return
         
-        # Generate transcript before archiving
-        await self._generate_transcript(thread, ticket_id, save_to_log=True)
+        del self.awaiting_response[message.channel.id]
+        conn = sqlite3.connect(DATABASE_NAME)
+        conn.execute('UPDATE tickets SET first_response_at = CURRENT_TIMESTAMP WHERE ticket_id = ?', (ticket_id,))
+        conn.commit()
+        conn.close()
+        self.metrics.record(guild_id, METRIC_FIRST_RESPONSE, time.time() - opened_ts, message.author.id, "responses")
+    
+    # ------------------------------------------------------------------
+    # Inactivity auto-close
+    # ------------------------------------------------------------------
+    
+    def _load_autoclose_settings(self) -> dict:
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute('SELECT guild_id, category, idle_hours, warn_hours FROM ticket_autoclose_settings')
+        settings = {(guild_id, category): (idle_hours, warn_hours) for guild_id, category, idle_hours, warn_hours in cursor.fetchall()}
+        conn.close()
+        return settings
+    
+    def _autoclose_thresholds(self, guild_id: int, category: str) -> Optional[tuple]:
+        """(idle_seconds, warn_seconds) for a ticket, category setting first, then the guild default"""
+        config = self.autoclose_settings.get((guild_id, category)) or self.autoclose_settings.get((guild_id, AUTOCLOSE_ALL))
+        if not config or config[0] <= 0:
+            return None
+        idle_hours = min(config[0], AUTOCLOSE_MAX_HOURS)  # Settings saved before the cap
+        return idle_hours * 3600, min(config[1], idle_hours) * 3600
+    
+    async def _fetch_ticket_thread(self, guild_id: int, thread_id: int) -> Optional[discord.Thread]:
+        """A ticket's thread, fetched when archived threads have left the cache; None once it is deleted"""
+        guild = self.bot.get_guild(guild_id)
+        thread = guild.get_thread(thread_id) if guild else None
+        if thread is None:
+            try:
+                thread = await self.bot.fetch_channel(thread_id)
+            except discord.NotFound:
+                return None
+        return thread if isinstance(thread, discord.Thread) else None
+    
+    async def _unarchived(self, thread: discord.Thread) -> discord.Thread:
+        """Reopen an archived thread so the bot can post in it"""
+        if thread.archived:
+            thread = await thread.edit(archived=False)
+        return thread
+    
+    async def _load_open_tickets(self):
+        """Seed activity tracking for open tickets from stored timestamps, fetching only legacy threads"""
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT ticket_thread_id, ticket_id, guild_id, user_id, category, created_at, last_user_activity, warned_at '
+            'FROM tickets WHERE status = "open"'
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        
+        now = time.time()
+        for thread_id, ticket_id, guild_id, user_id, category, created_at, last_user_activity, warned_at in rows:
+            last_active = now - ticket_age_seconds(created_at)
+            if last_user_activity:
+                last_active = max(last_active, last_user_activity)
+                self._activity_saved[thread_id] = last_user_activity
+            else:
+                # Tickets from before activity was stored: the thread's last message is the best guess
+                try:
+                    thread = await self._fetch_ticket_thread(guild_id, thread_id)
+                except discord.HTTPException:
+                    thread = None
+                if thread and thread.last_message_id:
+                    last_active = max(last_active, discord.utils.snowflake_time(thread.last_message_id).timestamp())
+            self.open_tickets[thread_id] = (ticket_id, guild_id, user_id, category, created_at)
+            self.last_activity[thread_id] = last_active
+            if not last_user_activity:
+                self._save_activity(thread_id)  # Only guessed once
+            
+            thresholds = self._autoclose_thresholds(guild_id, category)
+            if warned_at and thresholds:
+                # Same deadline as when the warning was posted
+                idle_seconds, warn_seconds = thresholds
+                self.autoclose_warned[thread_id] = max(last_active + idle_seconds, warned_at + warn_seconds)
+    
+    def _save_activity(self, thread_id: int, clear_warning: bool = False):
+        meta = self.open_tickets.get(thread_id)
+        if not meta:
+            return
+        last_active = self.last_activity[thread_id]
+        conn = sqlite3.connect(DATABASE_NAME)
+        if clear_warning:
+            conn.execute(
+                'UPDATE tickets SET last_user_activity = ?, warned_at = NULL WHERE ticket_id = ?',
+                (last_active, meta[0])
+            )
+        else:
+            conn.execute('UPDATE tickets SET last_user_activity = ? WHERE ticket_id = ?', (last_active, meta[0]))
+        conn.commit()
+        conn.close()
+        self._activity_saved[thread_id] = last_active
+    
+    def _track_ticket(self, thread_id: int, ticket_id: int, guild_id: int, owner_id: int, category: str, created_at: str):
+        self.open_tickets[thread_id] = (ticket_id, guild_id, owner_id, category, created_at)
+        self.last_activity[thread_id] = time.time()
+        self._schedule_autoclose(thread_id)
+    
+    def _untrack_ticket(self, thread_id: int):
+        self.open_tickets.pop(thread_id, None)
+        self.last_activity.pop(thread_id, None)
+        self._activity_saved.pop(thread_id, None)
+        self.autoclose_warned.pop(thread_id, None)
+        self.autoclose_deadlines.pop(thread_id, None)
+    
+    def _schedule_autoclose(self, thread_id: int):
+        """Push the ticket's next warn/close deadline; older heap entries for it become stale"""
+        meta = self.open_tickets.get(thread_id)
+        thresholds = self._autoclose_thresholds(meta[1], meta[3]) if meta else None
+        if not thresholds:
+            self.autoclose_deadlines.pop(thread_id, None)
+            return
         
-        # Archive and lock thread after delay
-        await asyncio.sleep(10)
+        idle_seconds, warn_seconds = thresholds
+        if thread_id in self.autoclose_warned:
+            deadline = self.autoclose_warned[thread_id]
+        else:
+            deadline = self.last_activity[thread_id] + idle_seconds - warn_seconds
+        
+        self.autoclose_deadlines[thread_id] = deadline
+        heapq.heappush(self._autoclose_heap, (deadline, thread_id))
+        if self._autoclose_heap[0][1] == thread_id:
+            self._autoclose_wakeup.set()
+    
+    def _retry_autoclose(self, thread_id: int):
+        """Check the ticket again shortly, e.g. after Discord could not be reached"""
+        deadline = time.time() + AUTOCLOSE_RETRY_DELAY
+        self.autoclose_deadlines[thread_id] = deadline
+        heapq.heappush(self._autoclose_heap, (deadline, thread_id))
+    
+    def _reschedule_autoclose(self):
+        """Rebuild every deadline, e.g. after thresholds change"""
+        self._autoclose_heap = []
+        self.autoclose_deadlines.clear()
+        for thread_id in self.open_tickets:
+            self._schedule_autoclose(thread_id)
+        self._autoclose_wakeup.set()
+    
+    async def _autoclose_loop(self):
+        await self.bot.wait_until_ready()
+        await self._load_open_tickets()
+        self._reschedule_autoclose()
+        
+        while True:
+            self._autoclose_wakeup.clear()
+            if not self._autoclose_heap:
+                await self._autoclose_wakeup.wait()
+                continue
+            
+            deadline, thread_id = self._autoclose_heap[0]
+            delay = deadline - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._autoclose_wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            heapq.heappop(self._autoclose_heap)
+            if self.autoclose_deadlines.get(thread_id) != deadline:
+                continue  # Superseded entry
+            try:
+                await self._autoclose_due(thread_id)
+            except Exception as e:
+                print(f"[Tickets] Auto-close check failed for thread {thread_id}: {e}")
+    
+    async def _autoclose_due(self, thread_id: int):
+        meta = self.open_tickets.get(thread_id)
+        thresholds = self._autoclose_thresholds(meta[1], meta[3]) if meta else None
+        if not thresholds:
+            self.autoclose_deadlines.pop(thread_id, None)
+            return
+        
+        ticket_id, guild_id, owner_id, category, created_at = meta
+        idle_seconds, warn_seconds = thresholds
+        now = time.time()
+        close_at = self.autoclose_warned.get(thread_id)
+        
+        if close_at is None:
+            if now < self.last_activity[thread_id] + idle_seconds - warn_seconds:
+                self._schedule_autoclose(thread_id)  # Activity moved the deadline
+                return
+            
+            try:
+                thread = await self._fetch_ticket_thread(guild_id, thread_id)
+                if thread:
+                    thread = await self._unarchived(thread)
+            except discord.HTTPException as e:
+                print(f"[Tickets] Could not reach thread {thread_id} to warn about inactivity, retrying: {e}")
+                self._retry_autoclose(thread_id)
+                return
+            if not thread:
+                self._untrack_ticket(thread_id)
+                return
+            
+            # Always leave the full warning period, even if the bot was offline past the deadline
+            self.autoclose_warned[thread_id] = max(self.last_activity[thread_id] + idle_seconds, now + warn_seconds)
+            conn = sqlite3.connect(DATABASE_NAME)
+            conn.execute(
+                'UPDATE tickets SET last_user_activity = ?, warned_at = ? WHERE ticket_id = ?',
+                (self.last_activity[thread_id], now, ticket_id)
+            )
+            conn.commit()
+            conn.close()
+            embed = discord.Embed(
+                title="⏰ Ticket Inactive",
+                description=(
+                    f"This ticket has been quiet for a while and will be closed automatically "
+                    f"<t:{int(self.autoclose_warned[thread_id])}:R> unless someone replies."
+                ),
+                color=0xf39c12
+            )
+            await thread.send(content=f"<@{owner_id}>", embed=embed)
+            self._schedule_autoclose(thread_id)
+            return
+        
+        if now < close_at:
+            self._schedule_autoclose(thread_id)
+            return
+        
+        await self._auto_close_ticket(thread_id, idle_seconds)
+    
+    async def _auto_close_ticket(self, thread_id: int, idle_seconds: float):
+        """Close an idle ticket through the same jobs as a manual close"""
+        ticket_id, guild_id, owner_id, category, created_at = self.open_tickets[thread_id]
         try:
-            if isinstance(thread, discord.Thread):
-                await thread.edit(archived=True, locked=True)
-        except Exception as e:
-            print(f"[Tickets] Failed to archive ticket thread: {e}")
+            thread = await self._fetch_ticket_thread(guild_id, thread_id)
+            if thread:
+                thread = await self._unarchived(thread)
+        except discord.HTTPException as e:
+            print(f"[Tickets] Could not reach thread {thread_id} to auto-close it, retrying: {e}")
+            self._retry_autoclose(thread_id)
+            return
+        self._untrack_ticket(thread_id)
+        self.awaiting_response.pop(thread_id, None)
         
-        print(f"[Tickets] Ticket #{ticket_id} closed by {interaction.user}")
+        reason = f"Closed automatically after {idle_seconds / 3600:g} hours of inactivity"
+        
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute(
+            'UPDATE tickets SET status = "closed", closed_at = CURRENT_TIMESTAMP, close_reason = ? WHERE ticket_id = ? AND status = "open"',
+            (reason, ticket_id)
+        )
+        closed = cursor.rowcount
+        conn.commit()
+        conn.close()
+        if not closed:
+            return
+        
+        self.metrics.record(guild_id, METRIC_CLOSE, ticket_age_seconds(created_at))
+        if not thread:
+            return  # Deleted thread: nothing to post in, transcribe or archive
+        
+        embed = discord.Embed(
+            title="🔒 Ticket Closed",
+            description="This ticket was closed automatically due to inactivity.",
+            color=0xe74c3c
+        )
+        embed.add_field(
+            name="📋 Next Steps",
+            value=f"This thread will be archived and locked in {TICKET_ARCHIVE_DELAY} seconds.\nA transcript has been saved.",
+            inline=False
+        )
+        embed.timestamp = datetime.now(timezone.utc)
+        try:
+            await thread.send(embed=embed)
+        except discord.HTTPException as e:
+            print(f"[Tickets] Failed to send auto-close message: {e}")
+        
+        self._schedule_log(ticket_id, thread, self.bot.user, "CLOSED", category, reason)
+        self._schedule_close_jobs(thread, ticket_id, category)
+        print(f"[Tickets] Ticket #{ticket_id} auto-closed after inactivity")
     
     async def handle_claim_ticket(self, interaction: discord.Interaction):
         """Handle ticket claiming by staff"""
@@ -779,7 +1539,7 @@ class Tickets(commands.Cog):
         is_staff = False
         if isinstance(interaction.user, discord.Member):
             is_staff = (
-                any(role.id == self.staff_role_id for role in interaction.user.roles) or
+                any(role.id == self._ticket_settings(interaction.guild_id).staff_role_id for role in interaction.user.roles) or
                 interaction.user.guild_permissions.administrator
             )
         
@@ -794,7 +1554,7 @@ class Tickets(commands.Cog):
         conn = sqlite3.connect(DATABASE_NAME)
         cursor = conn.cursor()
         cursor.execute(
-            'SELECT ticket_id, user_id, claimed_by FROM tickets WHERE ticket_thread_id = ? AND status = "open"',
+            'SELECT ticket_id, user_id, claimed_by, created_at FROM tickets WHERE ticket_thread_id = ? AND status = "open"',
             (thread.id,)
         )
         result = cursor.fetchone()
@@ -807,7 +1567,7 @@ class Tickets(commands.Cog):
             conn.close()
             return
         
-        ticket_id, user_id, claimed_by = result
+        ticket_id, user_id, claimed_by, created_at = result
         
         if claimed_by:
             try:
@@ -832,11 +1592,12 @@ class Tickets(commands.Cog):
         
         # Claim ticket
         cursor.execute(
-            'UPDATE tickets SET claimed_by = ? WHERE ticket_id = ?',
+            'UPDATE tickets SET claimed_by = ?, claimed_at = CURRENT_TIMESTAMP WHERE ticket_id = ?',
             (interaction.user.id, ticket_id)
         )
         conn.commit()
         conn.close()
+        self.metrics.record(thread.guild.id, METRIC_CLAIM, ticket_age_seconds(created_at), interaction.user.id, "claimed")
         
         # Send claim message
         embed = discord.Embed(
@@ -848,51 +1609,122 @@ class Tickets(commands.Cog):
         
         await interaction.response.send_message(embed=embed)
         
-        print(f"[Tickets] Ticket #{ticket_id} claimed by {interaction.user}")
+        print(f"[Tickets] Ticket #{ticket_id} claimed by {interaction.user}")
+    
+    async def _generate_transcript(self, thread: discord.Thread, ticket_id: int, save_to_log: bool = False,
+                                   fmt: str = "txt", archive: bool = False,
+                                   category: Optional[str] = None) -> Optional[int]:
+        """Stream the whole ticket history into a transcript and return the message count"""
+        writer = TranscriptWriter(fmt, ticket_id, title=thread.name)
+        try:
+            ticket = self._get_archive_ticket(thread, ticket_id) if archive else None
+            if ticket:
+                await asyncio.to_thread(self.archive.begin, ticket)
+            
+            batch = []
+            attachments = []
+            async for message in thread.history(limit=None, oldest_first=True):
+                record = message_record(message)
+                writer.write_message(record)
+                if ticket:
+                    batch.append(record)
+                    attachments.extend({**att, "message_id": message.id} for att in record["attachments"])
+                    if len(batch) >= ARCHIVE_BATCH_SIZE:
+                        await asyncio.to_thread(self.archive.add_messages, ticket, batch)
+                        batch = []
+            if ticket and batch:
+                await asyncio.to_thread(self.archive.add_messages, ticket, batch)
+            if ticket and attachments:
+                # CDN links expire, keep local copies (downloaded in the background)
+                self.jobs.schedule("ticket_attachments", {
+                    "ticket_id": ticket_id,
+                    "guild_id": ticket["guild_id"],
+                    "attachments": attachments,
+                })
+            writer.finish()
+            
+            # Save to log channel if requested
+            if save_to_log and thread.guild:
+                log_channel = self._get_ticket_log_channel(thread.guild)
+                if log_channel:
+                    await self._send_transcript(
+                        log_channel, writer, "Transcript saved for closed ticket.", log=True, category=category
+                    )
+            
+            return writer.message_count
+        except Exception as e:
+            print(f"[Tickets] Failed to generate transcript: {e}")
+            return None
+        finally:
+            writer.close()
+    
+    def _get_archive_ticket(self, thread: discord.Thread, ticket_id: int) -> Optional[dict]:
+        """Ticket metadata stored alongside archived transcript messages"""
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT guild_id, ticket_number, user_id, category FROM tickets WHERE ticket_id = ?',
+            (ticket_id,)
+        )
+        result = cursor.fetchone()
+        conn.close()
+        
+        if not result:
+            return None
+        
+        guild_id, ticket_number, user_id, category = result
+        return {
+            "ticket_id": ticket_id,
+            "guild_id": guild_id or thread.guild.id,
+            "ticket_number": ticket_number,
+            "thread_id": thread.id,
+            "user_id": user_id,
+            "category": category,
+            "title": thread.name,
+        }
+    
+    async def _send_transcript(self, channel: discord.abc.Messageable, writer: TranscriptWriter, description: str,
+                               log: bool = False, category: Optional[str] = None):
+        """Upload a finished transcript, falling back to a notice when it exceeds the upload limit"""
+        embed = discord.Embed(
+            title=f"📄 Ticket #{writer.ticket_id} Transcript",
+            description=description,
+            color=0x95a5a6
+        )
+        embed.add_field(name="Messages", value=str(writer.message_count), inline=True)
+        embed.add_field(name="Format", value=writer.fmt.upper(), inline=True)
+        embed.timestamp = datetime.now(timezone.utc)
+        
+        limit = channel.guild.filesize_limit if getattr(channel, "guild", None) else 8 * 1024 * 1024
+        size = await asyncio.to_thread(writer.upload_size)
+        if size > limit:
+            embed.add_field(
+                name="⚠️ Not Attached",
+                value=f"Transcript is {size / (1024 * 1024):.1f} MB, above this server's upload limit.",
+                inline=False
+            )
+            if log:
+                await self._send_log(channel, embed, category)
+            else:
+                await channel.send(embed=embed)
+            return
+        
+        if log:
+            await self._send_log(channel, embed, category, file=writer.to_file(), file_size=size)
+        else:
+            await channel.send(embed=embed, file=writer.to_file())
     
-    async def _generate_transcript(self, thread: discord.Thread, ticket_id: int, save_to_log: bool = False) -> Optional[str]:
-        """Generate a text transcript of the ticket"""
-        try:
-            messages = []
-            async for message in thread.history(limit=500, oldest_first=True):
-                timestamp = message.created_at.strftime("%Y-%m-%d %H:%M:%S UTC")
-                author = f"{message.author.display_name}"
-                content = message.content or "[No text content]"
-                
-                # Include attachments
-                if message.attachments:
-                    for attachment in message.attachments:
-                        content += f"\n[Attachment: {attachment.url}]"
-                
-                messages.append(f"[{timestamp}] {author}: {content}")
-            
-            transcript = f"Ticket #{ticket_id} Transcript\n"
-            transcript += f"Generated: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}\n"
-            transcript += "=" * 80 + "\n\n"
-            transcript += "\n".join(messages)
-            
-            # Save to log channel if requested
-            if save_to_log and thread.guild:
-                log_channel = self._get_ticket_log_channel(thread.guild)
-                if log_channel:
-                    file = discord.File(
-                        io.BytesIO(transcript.encode('utf-8')),
-                        filename=f"ticket-{ticket_id}-transcript.txt"
-                    )
-                    
-                    embed = discord.Embed(
-                        title=f"📄 Ticket #{ticket_id} Transcript",
-                        description="Transcript saved for closed ticket.",
-                        color=0x95a5a6
-                    )
-                    embed.timestamp = datetime.now(timezone.utc)
-                    
-                    await log_channel.send(embed=embed, file=file)
-            
-            return transcript
-        except Exception as e:
-            print(f"[Tickets] Failed to generate transcript: {e}")
-            return None
+    async def _send_log(self, channel: discord.TextChannel, embed: discord.Embed, category: Optional[str] = None,
+                        file: Optional[discord.File] = None, file_size: int = 0):
+        """Send a log entry through the digest sink using the guild's digest interval"""
+        await self.log_sink.send(
+            channel,
+            embed,
+            interval=self._ticket_settings(channel.guild.id).log_digest_seconds or 0,
+            priority=category in LOG_PRIORITY_CATEGORIES,
+            file=file,
+            file_size=file_size,
+        )
     
     async def _log_ticket_action(self, action: str, ticket_id: int, thread: discord.Thread, 
                                   user: discord.User | discord.Member, category: Optional[str] = None, 
@@ -928,7 +1760,7 @@ class Tickets(commands.Cog):
         embed.add_field(name="Thread", value=thread.mention, inline=True)
         
         if category:
-            embed.add_field(name="Category", value=category, inline=True)
+            embed.add_field(name="Category", value=TICKET_CATEGORY_NAMES.get(category, category), inline=True)
         
         if reason:
             embed.add_field(name="📝 Reason", value=reason, inline=False)
@@ -937,7 +1769,7 @@ class Tickets(commands.Cog):
         embed.set_footer(text="Ticket System")
         
         try:
-            await log_channel.send(embed=embed)
+            await self._send_log(log_channel, embed, category)
         except Exception as e:
             print(f"[Tickets] Failed to send log: {e}")
     
@@ -990,6 +1822,7 @@ class Tickets(commands.Cog):
                 
                 conn.commit()
                 conn.close()
+                self.panel_ids.add(panel_message.id)
             except Exception as e:
                 logger.error(f"Error saving ticket panel to database: {e}")
         
@@ -1000,35 +1833,25 @@ class Tickets(commands.Cog):
         roles_saved = []
         if ctx.guild:
             try:
-                conn = sqlite3.connect(DATABASE_NAME)
-                cursor = conn.cursor()
+                role_changes = {}
                 
                 # Save support role
                 if support_role:
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO ticket_support_roles (guild_id, role_id, set_by, set_at)
-                        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                    ''', (ctx.guild.id, support_role.id, ctx.author.id))
+                    role_changes["support_role_id"] = support_role.id
                     roles_saved.append(f"**Support:** {support_role.mention}")
                 
                 # Save report role
                 if report_role:
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO ticket_report_roles (guild_id, role_id, set_by, set_at)
-                        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                    ''', (ctx.guild.id, report_role.id, ctx.author.id))
+                    role_changes["report_role_id"] = report_role.id
                     roles_saved.append(f"**Report:** {report_role.mention}")
                 
                 # Save partner role
                 if partner_role:
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO ticket_partner_roles (guild_id, role_id, set_by, set_at)
-                        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                    ''', (ctx.guild.id, partner_role.id, ctx.author.id))
+                    role_changes["partner_role_id"] = partner_role.id
                     roles_saved.append(f"**Partner:** {partner_role.mention}")
                 
-                conn.commit()
-                conn.close()
+                if role_changes:
+                    await self.settings.update("tickets", ctx.guild.id, updated_by=ctx.author.id, **role_changes)
                 
                 if roles_saved:
                     role_info = "\n".join(roles_saved)
@@ -1126,15 +1949,8 @@ class Tickets(commands.Cog):
             # Delete test message
             await test_message.delete()
             
-            # Save the channel to database
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO ticket_log_channels (guild_id, channel_id, set_by, set_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (ctx.guild.id, channel.id, ctx.author.id))
-            conn.commit()
-            conn.close()
+            # Save the setting
+            await self.settings.update("tickets", ctx.guild.id, updated_by=ctx.author.id, log_channel_id=channel.id)
             
             # Update the helper function to recognize this specific channel
             # We'll store it in a simple way by checking if it's the designated channel
@@ -1200,13 +2016,10 @@ class Tickets(commands.Cog):
             return
         
         try:
-            # Remove custom log channel setting from database
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM ticket_log_channels WHERE guild_id = ?', (ctx.guild.id,))
-            deleted = cursor.rowcount > 0
-            conn.commit()
-            conn.close()
+            # Remove custom log channel setting
+            deleted = self._ticket_settings(ctx.guild.id).log_channel_id is not None
+            if deleted:
+                await self.settings.update("tickets", ctx.guild.id, updated_by=ctx.author.id, log_channel_id=None)
             
             if deleted:
                 embed = discord.Embed(
@@ -1243,6 +2056,61 @@ class Tickets(commands.Cog):
                 ephemeral=True
             )
     
+    @commands.hybrid_command(name="ticketlog-digest")
+    @commands.has_permissions(administrator=True)
+    @app_commands.describe(
+        minutes="Batch ticket logs into a digest every N minutes (0 sends each log right away, leave empty to view)"
+    )
+    async def ticket_log_digest(self, ctx, minutes: Optional[app_commands.Range[int, 0, 60]] = None):
+        """Set or view how often ticket logs are batched into digest messages"""
+        if not ctx.guild:
+            await ctx.send(embed=create_error_embed("Error", "This command can only be used in servers."), ephemeral=True)
+            return
+        
+        priority = ", ".join(TICKET_CATEGORY_NAMES[category] for category in sorted(LOG_PRIORITY_CATEGORIES))
+        if minutes is None:
+            seconds = self._ticket_settings(ctx.guild.id).log_digest_seconds
+            if seconds:
+                description = f"Ticket logs are sent as a digest every **{seconds // 60} min**.\n{priority} tickets are still logged immediately."
+            else:
+                description = "Each ticket log is sent as soon as it happens."
+            await ctx.send(embed=create_info_embed("Ticket Log Digest", description), ephemeral=True)
+            return
+        
+        await self.settings.update(
+            "tickets", ctx.guild.id, updated_by=ctx.author.id, log_digest_seconds=minutes * 60 if minutes else None
+        )
+        if minutes:
+            message = f"Ticket logs will be batched into a digest every **{minutes} min** (up to 10 entries per message).\n{priority} tickets are still logged immediately."
+        else:
+            message = "Digest mode disabled. Each ticket log will be sent right away."
+        await ctx.send(embed=create_success_embed("Ticket Log Digest Updated", message))
+    
+    @commands.hybrid_command(name="ticketstaff")
+    @commands.has_permissions(administrator=True)
+    @app_commands.describe(role="The role allowed to claim and close tickets (leave empty to view current setting)")
+    async def ticket_staff_role(self, ctx, role: Optional[discord.Role] = None):
+        """Set or view the staff role for tickets"""
+        if not ctx.guild:
+            await ctx.send(embed=create_error_embed("Error", "This command can only be used in servers."), ephemeral=True)
+            return
+        
+        if role is None:
+            role_id = self._ticket_settings(ctx.guild.id).staff_role_id
+            current = ctx.guild.get_role(role_id)
+            description = (
+                f"Current staff role: {current.mention}" if current
+                else f"The staff role (ID: {role_id}) does not exist in this server. Set one with `/ticketstaff @role`."
+            )
+            await ctx.send(embed=create_info_embed("Ticket Staff Role", description), ephemeral=True)
+            return
+        
+        await self.settings.update("tickets", ctx.guild.id, updated_by=ctx.author.id, staff_role_id=role.id)
+        await ctx.send(embed=create_success_embed(
+            "Staff Role Set",
+            f"{role.mention} can now claim and close tickets, and is used when no support role is set."
+        ))
+    
     @commands.hybrid_command(name="ticketsupport")
     @commands.has_permissions(administrator=True)
     @app_commands.describe(
@@ -1291,15 +2159,8 @@ class Tickets(commands.Cog):
         
         # Set new support role
         try:
-            # Save the role to database
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO ticket_support_roles (guild_id, role_id, set_by, set_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (ctx.guild.id, role.id, ctx.author.id))
-            conn.commit()
-            conn.close()
+            # Save the setting
+            await self.settings.update("tickets", ctx.guild.id, updated_by=ctx.author.id, support_role_id=role.id)
             
             success_embed = discord.Embed(
                 title="✅ Support Role Set",
@@ -1341,13 +2202,10 @@ class Tickets(commands.Cog):
             return
         
         try:
-            # Remove support role setting from database
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM ticket_support_roles WHERE guild_id = ?', (ctx.guild.id,))
-            deleted = cursor.rowcount > 0
-            conn.commit()
-            conn.close()
+            # Remove support role setting
+            deleted = self._ticket_settings(ctx.guild.id).support_role_id is not None
+            if deleted:
+                await self.settings.update("tickets", ctx.guild.id, updated_by=ctx.author.id, support_role_id=None)
             
             if deleted:
                 embed = discord.Embed(
@@ -1357,7 +2215,7 @@ class Tickets(commands.Cog):
                 )
                 embed.add_field(
                     name="ℹ️ Note",
-                    value=f"New tickets will fall back to using the default staff role (ID: {self.staff_role_id}) if it exists.\n"
+                    value=f"New tickets will fall back to using the default staff role (ID: {self._ticket_settings(ctx.guild.id).staff_role_id}) if it exists.\n"
                           "Use `/ticketsupport @role` to set a new support role.",
                     inline=False
                 )
@@ -1369,7 +2227,7 @@ class Tickets(commands.Cog):
                 )
                 embed.add_field(
                     name="Current Status",
-                    value=f"Using default staff role (ID: {self.staff_role_id}) if it exists.",
+                    value=f"Using default staff role (ID: {self._ticket_settings(ctx.guild.id).staff_role_id}) if it exists.",
                     inline=False
                 )
             
@@ -1388,68 +2246,120 @@ class Tickets(commands.Cog):
     @commands.has_permissions(manage_messages=True)
     @app_commands.describe(
         status="Filter tickets by status (open, closed, all)",
-        user="Filter tickets by user"
+        user="Filter tickets by user",
+        category="Filter tickets by category",
+        claimer="Filter tickets claimed by this staff member",
+        since="Only tickets created on or after this date (YYYY-MM-DD)",
+        until="Only tickets created on or before this date (YYYY-MM-DD)"
     )
-    async def tickets_list(self, ctx, status: str = "open", user: Optional[discord.User] = None):
-        """View all tickets or filter by status/user"""
-        conn = sqlite3.connect(DATABASE_NAME)
-        cursor = conn.cursor()
-        
-        query = 'SELECT ticket_id, ticket_thread_id, user_id, category, status, claimed_by, created_at FROM tickets'
-        params = []
-        
-        if status != "all":
-            query += ' WHERE status = ?'
-            params.append(status)
+    @app_commands.choices(category=[
+        app_commands.Choice(name=name, value=value) for value, name in TICKET_CATEGORY_NAMES.items()
+    ])
+    async def tickets_list(self, ctx, status: str = "open", user: Optional[discord.User] = None,
+                           category: Optional[str] = None, claimer: Optional[discord.User] = None,
+                           since: Optional[str] = None, until: Optional[str] = None):
+        """View tickets page by page, filtered by status, user, category, claimer or date"""
+        if not ctx.guild:
+            await ctx.send(embed=create_error_embed("Error", "This command can only be used in servers."), ephemeral=True)
+            return
         
-        if user:
-            if params:
-                query += ' AND user_id = ?'
-            else:
-                query += ' WHERE user_id = ?'
-            params.append(user.id)
+        if category and category not in TICKET_CATEGORY_NAMES:
+            await ctx.send(
+                embed=create_error_embed("Invalid Category", f"Choose one of: {', '.join(TICKET_CATEGORY_NAMES)}"),
+                ephemeral=True
+            )
+            return
         
-        query += ' ORDER BY created_at DESC LIMIT 20'
+        try:
+            since_date = datetime.strptime(since, "%Y-%m-%d") if since else None
+            until_date = datetime.strptime(until, "%Y-%m-%d") if until else None
+        except ValueError:
+            await ctx.send(embed=create_error_embed("Invalid Date", "Dates must look like `2025-01-31`."), ephemeral=True)
+            return
         
-        cursor.execute(query, params)
-        tickets = cursor.fetchall()
-        conn.close()
+        filters = {
+            "status": status,
+            "user_id": user.id if user else None,
+            "category": category,
+            "claimed_by": claimer.id if claimer else None,
+            # created_at is stored as 'YYYY-MM-DD HH:MM:SS', so plain string bounds work
+            "since": since_date.strftime("%Y-%m-%d 00:00:00") if since_date else None,
+            "until": (until_date + timedelta(days=1)).strftime("%Y-%m-%d 00:00:00") if until_date else None,
+        }
         
-        if not tickets:
+        view = TicketListView(self, ctx.author.id, ctx.guild, filters)
+        embed = await view.render()
+        if view.empty:
             await ctx.send(
                 embed=create_info_embed("No Tickets", f"No {status} tickets found."),
                 ephemeral=True
             )
             return
         
+        await ctx.send(embed=embed, view=view if view.has_next else None)
+    
+    def _fetch_ticket_page(self, guild_id: int, filters: dict, cursor_key: Optional[tuple]) -> list:
+        """One page (plus one row to detect a next page) in created_at, ticket_id order"""
+        query = (
+            'SELECT ticket_id, ticket_number, ticket_thread_id, user_id, category, status, claimed_by, created_at '
+            'FROM tickets WHERE guild_id = ?'
+        )
+        params = [guild_id]
+        
+        if filters["status"] == "all":
+            query += ' AND status != "pending"'
+        else:
+            query += ' AND status = ?'
+            params.append(filters["status"])
+        
+        for column in ("user_id", "category", "claimed_by"):
+            if filters[column] is not None:
+                query += f' AND {column} = ?'
+                params.append(filters[column])
+        
+        if filters["since"]:
+            query += ' AND created_at >= ?'
+            params.append(filters["since"])
+        if filters["until"]:
+            query += ' AND created_at < ?'
+            params.append(filters["until"])
+        
+        if cursor_key:
+            query += ' AND (created_at, ticket_id) < (?, ?)'
+            params.extend(cursor_key)
+        
+        query += ' ORDER BY created_at DESC, ticket_id DESC LIMIT ?'
+        params.append(TICKET_PAGE_SIZE + 1)
+        
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    
+    async def _build_ticket_list_embed(self, guild: discord.Guild, filters: dict, rows: list,
+                                       page: int) -> discord.Embed:
+        if not rows:
+            # Tickets on this page may have been closed or deleted since the previous page was shown
+            return create_info_embed("No Tickets", f"No {filters['status']} tickets found.")
+        
+        user_ids = {row[3] for row in rows} | {row[6] for row in rows if row[6]}
+        names = await self._resolve_user_names(guild, user_ids)
+        
         embed = discord.Embed(
-            title=f" {status.title()} Tickets",
+            title=f" {filters['status'].title()} Tickets",
             color=0x5865F2
         )
         
-        for ticket in tickets[:10]:  # Show max 10
-            ticket_id, thread_id, user_id, category, ticket_status, claimed_by, created_at = ticket
-            
-            try:
-                ticket_user = await self.bot.fetch_user(user_id)
-                user_name = f"{ticket_user.name}"
-            except:
-                user_name = f"Unknown ({user_id})"
-            
+        for ticket_id, ticket_number, thread_id, user_id, category, ticket_status, claimed_by, created_at in rows:
             status_emoji = "🟢" if ticket_status == "open" else ""
-            
-            claimer_text = ""
-            if claimed_by:
-                try:
-                    claimer = await self.bot.fetch_user(claimed_by)
-                    claimer_text = f"\n**Claimed by:** {claimer.name}"
-                except:
-                    claimer_text = "\n**Claimed by:** Unknown"
+            claimer_text = f"\n**Claimed by:** {names.get(claimed_by, 'Unknown')}" if claimed_by else ""
             
             embed.add_field(
-                name=f"{status_emoji} Ticket #{ticket_id}",
+                name=f"{status_emoji} Ticket #{ticket_number or ticket_id}",
                 value=(
-                    f"**User:** {user_name}\n"
+                    f"**User:** {names.get(user_id, f'Unknown ({user_id})')}\n"
                     f"**Category:** {category.title()}\n"
                     f"**Thread:** <#{thread_id}>\n"
                     f"**Created:** <t:{int(datetime.fromisoformat(created_at.replace(' ', 'T')).replace(tzinfo=timezone.utc).timestamp())}:R>"
@@ -1458,47 +2368,96 @@ class Tickets(commands.Cog):
                 inline=True
             )
         
-        embed.set_footer(text=f"Showing {len(tickets[:10])} of {len(tickets)} tickets")
+        embed.set_footer(text=f"Page {page} • {len(rows)} ticket(s) on this page")
+        return embed
+    
+    async def _resolve_user_names(self, guild: discord.Guild, user_ids: set) -> dict:
+        """Display names from the member cache, then the TTL cache, then a bounded concurrent fetch"""
+        names = {}
+        missing = []
+        now = time.monotonic()
+        for user_id in user_ids:
+            member = guild.get_member(user_id) or self.bot.get_user(user_id)
+            if member:
+                names[user_id] = member.name
+                continue
+            cached = self._user_name_cache.get(user_id)
+            if cached and cached[1] > now:
+                names[user_id] = cached[0]
+                self._user_name_cache.move_to_end(user_id)
+            else:
+                missing.append(user_id)
         
-        await ctx.send(embed=embed)
+        async def fetch(user_id: int):
+            async with self._user_fetch_semaphore:
+                try:
+                    user = await self.bot.fetch_user(user_id)
+                    name = user.name
+                except discord.HTTPException:
+                    name = f"Unknown ({user_id})"
+            self._user_name_cache[user_id] = (name, time.monotonic() + USER_NAME_CACHE_TTL)
+            self._user_name_cache.move_to_end(user_id)
+            while len(self._user_name_cache) > USER_NAME_CACHE_SIZE:
+                self._user_name_cache.popitem(last=False)
+            names[user_id] = name
+        
+        if missing:
+            await asyncio.gather(*(fetch(user_id) for user_id in missing))
+        return names
     
     @commands.hybrid_command(name="ticketstats")
     @commands.has_permissions(manage_messages=True)
-    async def ticket_stats(self, ctx):
-        """View ticket statistics"""
+    @app_commands.describe(days="How many days of response-time metrics to include (default 30)")
+    async def ticket_stats(self, ctx, days: app_commands.Range[int, 1, 365] = 30):
+        """View ticket statistics and response times"""
+        if not ctx.guild:
+            await ctx.send(embed=create_error_embed("Error", "This command can only be used in servers."), ephemeral=True)
+            return
+        
         conn = sqlite3.connect(DATABASE_NAME)
         cursor = conn.cursor()
         
-        # Get various stats
-        cursor.execute('SELECT COUNT(*) FROM tickets')
-        total_tickets = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM tickets WHERE status = "open"')
+        # Current backlog, served by idx_tickets_guild_status_user
+        cursor.execute('SELECT COUNT(*) FROM tickets WHERE guild_id = ? AND status = "open"', (ctx.guild.id,))
         open_tickets = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM tickets WHERE status = "closed"')
-        closed_tickets = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT category, COUNT(*) FROM tickets GROUP BY category ORDER BY COUNT(*) DESC')
-        categories = cursor.fetchall()
-        
         conn.close()
         
+        summary = await asyncio.to_thread(self.metrics.summary, ctx.guild.id, days)
+        totals = await asyncio.to_thread(self.metrics.totals, ctx.guild.id)
+        counters = summary["counters"]
+        durations = summary["durations"]
+        
         embed = discord.Embed(
             title="📊 Ticket Statistics",
+            description=f"Last **{days}** day(s)",
             color=0x5865F2
         )
         
         embed.add_field(
             name="📋 Overview",
             value=(
-                f"**Total Tickets:** {total_tickets}\n"
+                f"**Opened:** {counters.get('opened', (0, 0))[0]}\n"
+                f"**🔴 Closed:** {counters.get(METRIC_CLOSE, (0, 0))[0]}\n"
+                f"**🟢 Open Now:** {open_tickets}"
+            ),
+            inline=True
+        )
+        
+        embed.add_field(
+            name="📚 All Time",
+            value=(
+                f"**Total Tickets:** {totals.get('opened', 0)}\n"
                 f"**🟢 Open:** {open_tickets}\n"
-                f"**🔴 Closed:** {closed_tickets}"
+                f"**🔴 Closed:** {totals.get(METRIC_CLOSE, 0)}"
             ),
             inline=True
         )
         
+        categories = sorted(
+            ((metric.split(":", 1)[1], count) for metric, (count, _) in counters.items() if metric.startswith("opened:")),
+            key=lambda item: item[1],
+            reverse=True
+        )
         if categories:
             category_text = "\n".join([f"**{cat.title()}:** {count}" for cat, count in categories[:5]])
             embed.add_field(
@@ -1507,25 +2466,66 @@ class Tickets(commands.Cog):
                 inline=True
             )
         
+        labels = (
+            (METRIC_FIRST_RESPONSE, "First Response"),
+            (METRIC_CLAIM, "Time to Claim"),
+            (METRIC_CLOSE, "Time to Close"),
+        )
+        timing_lines = []
+        for metric, label in labels:
+            stats = durations[metric]
+            if not stats["count"]:
+                timing_lines.append(f"**{label}:** no data")
+                continue
+            timing_lines.append(
+                f"**{label}:** median {self._format_duration(stats['p50'])}, "
+                f"p90 {self._format_duration(stats['p90'])} ({stats['count']})"
+            )
+        embed.add_field(name="⏱️ Response Times", value="\n".join(timing_lines), inline=False)
+        
+        if summary["staff"]:
+            staff_text = "\n".join(
+                f"<@{staff_id}> — {closed} closed, {claimed} claimed, {responses} first replies"
+                for staff_id, claimed, closed, responses in summary["staff"]
+            )
+            embed.add_field(name="👮 Top Staff", value=staff_text, inline=False)
+        
         embed.timestamp = datetime.now(timezone.utc)
         embed.set_footer(text="CodeVerse Ticket System")
         
         await ctx.send(embed=embed)
     
+    @staticmethod
+    def _format_duration(seconds: Optional[float]) -> str:
+        if seconds is None:
+            return "n/a"
+        if seconds < 60:
+            return f"{seconds:.0f}s"
+        if seconds < 3600:
+            return f"{seconds / 60:.0f}m"
+        if seconds < 86400:
+            return f"{seconds / 3600:.1f}h"
+        return f"{seconds / 86400:.1f}d"
+    
     @commands.hybrid_command(name="forceclose")
     @commands.has_permissions(manage_messages=True)
     @app_commands.describe(
-        ticket_id="The ID of the ticket to force close",
+        ticket_number="The number of the ticket to force close",
         reason="Reason for force closing the ticket"
     )
-    async def force_close_ticket(self, ctx, ticket_id: int, *, reason: str = "Force closed by staff"):
-        """Force close a ticket by its ID (Staff only)"""
+    async def force_close_ticket(self, ctx, ticket_number: int, *, reason: str = "Force closed by staff"):
+        """Force close a ticket by its number in this server (Staff only)"""
+        if not ctx.guild:
+            await ctx.send(embed=create_error_embed("Error", "This command can only be used in servers."), ephemeral=True)
+            return
+        
         # Get ticket info from database
         conn = sqlite3.connect(DATABASE_NAME)
         cursor = conn.cursor()
         cursor.execute(
-            'SELECT ticket_thread_id, user_id, category FROM tickets WHERE ticket_id = ? AND status = "open"',
-            (ticket_id,)
+            'SELECT ticket_id, ticket_thread_id, user_id, category, created_at FROM tickets '
+            'WHERE guild_id = ? AND ticket_number = ? AND status = "open"',
+            (ctx.guild.id, ticket_number)
         )
         result = cursor.fetchone()
         
@@ -1533,14 +2533,14 @@ class Tickets(commands.Cog):
             await ctx.send(
                 embed=create_error_embed(
                     "Ticket Not Found", 
-                    f"No open ticket found with ID #{ticket_id}"
+                    f"No open ticket found with number #{ticket_number}"
                 ),
                 ephemeral=True
             )
             conn.close()
             return
         
-        thread_id, user_id, category = result
+        ticket_id, thread_id, user_id, category, created_at = result
         
         # Get the thread
         if ctx.guild:
@@ -1561,11 +2561,14 @@ class Tickets(commands.Cog):
         )
         conn.commit()
         conn.close()
+        self.awaiting_response.pop(thread_id, None)
+        self._untrack_ticket(thread_id)
+        self.metrics.record(ctx.guild.id, METRIC_CLOSE, ticket_age_seconds(created_at), ctx.author.id, "closed")
         
         # Send confirmation to command channel
         embed = discord.Embed(
             title="🔒 Ticket Force Closed",
-            description=f"Ticket **#{ticket_id}** has been force closed.",
+            description=f"Ticket **#{ticket_number}** has been force closed.",
             color=0xe74c3c
         )
         embed.add_field(name="👤 Ticket Owner", value=f"<@{user_id}> ({user_id})", inline=True)
@@ -1598,32 +2601,16 @@ class Tickets(commands.Cog):
                 closure_embed.timestamp = datetime.now(timezone.utc)
                 
                 await thread.send(embed=closure_embed)
-                
-                # Generate transcript before archiving
-                await self._generate_transcript(thread, ticket_id, save_to_log=True)
-                
-                # Archive and lock thread after delay
-                await asyncio.sleep(10)
-                try:
-                    await thread.edit(archived=True, locked=True)
-                    print(f"[Tickets] 🔒 Thread archived for force closed ticket #{ticket_id}")
-                except Exception as e:
-                    print(f"[Tickets] ❌ Failed to archive force closed ticket thread: {e}")
-                
             except Exception as e:
                 print(f"[Tickets] ❌ Failed to send force close message to thread: {e}")
-                # Still continue with logging even if thread message fails
+                # Still continue with archiving and logging even if thread message fails
+            
+            # Transcript and archive/lock run from the job queue
+            self._schedule_close_jobs(thread, ticket_id, category)
         
         # Log to staff channel
         if thread:
-            await self._log_ticket_action(
-                "CLOSED",
-                ticket_id,
-                thread,
-                ctx.author,
-                category,
-                f"Force closed by {ctx.author.name}: {reason}"
-            )
+            self._schedule_log(ticket_id, thread, ctx.author, "CLOSED", category, f"Force closed by {ctx.author.name}: {reason}")
         
         # Try to DM the ticket owner about the force closure
         try:
@@ -1631,7 +2618,7 @@ class Tickets(commands.Cog):
             if user:
                 dm_embed = discord.Embed(
                     title="🔒 Your Ticket Has Been Closed",
-                    description=f"Your ticket **#{ticket_id}** in **{ctx.guild.name}** has been closed by staff.",
+                    description=f"Your ticket **#{ticket_number}** in **{ctx.guild.name}** has been closed by staff.",
                     color=0xe74c3c
                 )
                 dm_embed.add_field(name="📁 Category", value=category.title(), inline=True)
@@ -1644,7 +2631,207 @@ class Tickets(commands.Cog):
         except Exception as e:
             print(f"[Tickets] ❌ Failed to DM user about force closure: {e}")
         
-        print(f"[Tickets] 🔒 Ticket #{ticket_id} force closed by {ctx.author} - Reason: {reason}")
+        print(f"[Tickets] 🔒 Ticket #{ticket_number} force closed by {ctx.author} - Reason: {reason}")
+
+    @commands.hybrid_command(name="transcript")
+    @commands.has_permissions(manage_messages=True)
+    @app_commands.describe(fmt="Transcript format (txt, jsonl or html)")
+    @app_commands.rename(fmt="format")
+    @app_commands.choices(fmt=[app_commands.Choice(name=f.upper(), value=f) for f in TRANSCRIPT_FORMATS])
+    async def ticket_transcript(self, ctx, fmt: str = "txt"):
+        """Export the full transcript of the current ticket thread (Staff only)"""
+        if not isinstance(ctx.channel, discord.Thread):
+            await ctx.send(embed=create_error_embed("Not a Ticket", "This command can only be used in ticket threads."), ephemeral=True)
+            return
+
+        fmt = fmt.lower()
+        if fmt not in TRANSCRIPT_FORMATS:
+            await ctx.send(
+                embed=create_error_embed("Invalid Format", f"Choose one of: {', '.join(TRANSCRIPT_FORMATS)}"),
+                ephemeral=True
+            )
+            return
+
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute('SELECT ticket_id FROM tickets WHERE ticket_thread_id = ?', (ctx.channel.id,))
+        result = cursor.fetchone()
+        conn.close()
+
+        if not result:
+            await ctx.send(embed=create_error_embed("Not a Ticket", "This thread is not a ticket."), ephemeral=True)
+            return
+
+        await ctx.defer()
+
+        writer = TranscriptWriter(fmt, result[0], title=ctx.channel.name)
+        try:
+            async for message in ctx.channel.history(limit=None, oldest_first=True):
+                writer.write_message(message_record(message))
+            writer.finish()
+            await self._send_transcript(ctx, writer, f"Exported by {ctx.author.mention}.")
+        except Exception as e:
+            print(f"[Tickets] Failed to export transcript: {e}")
+            await ctx.send(embed=create_error_embed("Export Failed", "Could not export the transcript."), ephemeral=True)
+        finally:
+            writer.close()
+
+    @commands.hybrid_command(name="ticketattachment")
+    @commands.has_permissions(manage_messages=True)
+    @app_commands.describe(attachment_id="Attachment ID as shown in a ticket transcript")
+    async def ticket_attachment(self, ctx, attachment_id: str):
+        """Re-upload an archived ticket attachment by its transcript ID (Staff only)"""
+        if not ctx.guild:
+            await ctx.send(embed=create_error_embed("Error", "This command can only be used in servers."), ephemeral=True)
+            return
+        
+        entry = await asyncio.to_thread(self.attachments.lookup, int(attachment_id)) if attachment_id.isdigit() else None
+        if not entry or entry["guild_id"] != ctx.guild.id:
+            await ctx.send(embed=create_error_embed("Not Found", "No archived attachment with that ID."), ephemeral=True)
+            return
+        
+        if entry["status"] != STATUS_STORED or not entry["path"].exists():
+            reasons = {
+                "too_large": "it was larger than the archive size limit",
+                "store_full": "the attachment archive was full",
+                "gone": "it had already been deleted from Discord",
+            }
+            reason = reasons.get(entry["status"], "the file is missing")
+            await ctx.send(
+                embed=create_error_embed("Not Archived", f"`{entry['filename']}` was not archived: {reason}."),
+                ephemeral=True
+            )
+            return
+        
+        if entry["size"] > (ctx.guild.filesize_limit or 0):
+            await ctx.send(
+                embed=create_error_embed("Too Large", f"`{entry['filename']}` is above this server's upload limit."),
+                ephemeral=True
+            )
+            return
+        
+        content = f"📎 `{entry['filename']}` from ticket #{entry['ticket_id']}"
+        file = discord.File(entry["path"], filename=entry["filename"])
+        if ctx.interaction is not None:
+            await ctx.send(content=content, file=file, ephemeral=True)
+            return
+        
+        # Prefix commands cannot reply ephemerally, so the file goes to the staff member's DMs
+        try:
+            await ctx.author.send(content=content, file=file)
+        except discord.HTTPException:
+            await ctx.send(embed=create_error_embed(
+                "Could Not Send",
+                "I couldn't DM you the attachment. Enable DMs from this server or use `/ticketattachment`."
+            ))
+            return
+        await ctx.send(embed=create_info_embed("Attachment Sent", f"`{entry['filename']}` was sent to you by DM."))
+    
+    @commands.hybrid_command(name="ticketsearch")
+    @commands.has_permissions(manage_messages=True)
+    @app_commands.describe(query="Words to search for (supports FTS5 syntax like \"exact phrase\", OR, category:report)")
+    async def ticket_search(self, ctx, *, query: str):
+        """Search the transcripts of closed tickets (Staff only)"""
+        if not ctx.guild:
+            await ctx.send(embed=create_error_embed("Error", "This command can only be used in servers."), ephemeral=True)
+            return
+        
+        started = time.perf_counter()
+        results = await asyncio.to_thread(self.archive.search, ctx.guild.id, query)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        if not results:
+            await ctx.send(
+                embed=create_info_embed("No Results", f"No archived tickets matched `{query[:100]}`."),
+                ephemeral=True
+            )
+            return
+        
+        embed = discord.Embed(
+            title="🔎 Ticket Search",
+            description=f"Results for `{query[:100]}`",
+            color=0x5865F2
+        )
+        
+        for result in results:
+            number = result.get("ticket_number") or result["ticket_id"]
+            category = (result.get("category") or "unknown").title()
+            snippet = result["snippet"].replace("\n", " ")
+            if len(snippet) > 300:
+                snippet = snippet[:297] + "..."
+            
+            details = f"**Category:** {category}"
+            if result.get("user_id"):
+                details += f" • <@{result['user_id']}>"
+            if result.get("thread_id"):
+                details += f" • <#{result['thread_id']}>"
+            
+            embed.add_field(
+                name=f"Ticket #{number} — {result['created_at']}",
+                value=f"{details}\n> {snippet}",
+                inline=False
+            )
+        
+        embed.set_footer(text=f"{len(results)} ticket(s) • {elapsed_ms:.0f} ms")
+        await ctx.send(embed=embed, ephemeral=True)
+    
+    @commands.hybrid_command(name="ticketautoclose")
+    @commands.has_permissions(administrator=True)
+    @app_commands.describe(
+        hours=f"Close tickets after this many hours without messages, up to {AUTOCLOSE_MAX_HOURS} (0 disables, leave empty to view)",
+        category="Apply only to this category (default: all categories)",
+        warn_hours="How many hours before closing to post a warning (default 12)"
+    )
+    @app_commands.choices(category=[
+        app_commands.Choice(name=name, value=value) for value, name in TICKET_CATEGORY_NAMES.items()
+    ])
+    async def ticket_autoclose(self, ctx, hours: Optional[app_commands.Range[int, 0, AUTOCLOSE_MAX_HOURS]] = None,
+                               category: Optional[str] = None, warn_hours: app_commands.Range[int, 1, 168] = 12):
+        """Set up or view inactivity auto-close for tickets"""
+        if not ctx.guild:
+            await ctx.send(embed=create_error_embed("Error", "This command can only be used in servers."), ephemeral=True)
+            return
+        
+        if category and category not in TICKET_CATEGORY_NAMES:
+            await ctx.send(
+                embed=create_error_embed("Invalid Category", f"Choose one of: {', '.join(TICKET_CATEGORY_NAMES)}"),
+                ephemeral=True
+            )
+            return
+        
+        if hours is None:
+            lines = []
+            for (guild_id, cat), (idle_hours, cat_warn_hours) in sorted(self.autoclose_settings.items(), key=lambda item: item[0][1]):
+                if guild_id != ctx.guild.id:
+                    continue
+                name = "All categories" if cat == AUTOCLOSE_ALL else TICKET_CATEGORY_NAMES.get(cat, cat)
+                value = "disabled" if idle_hours <= 0 else f"after {idle_hours}h idle, warning {min(cat_warn_hours, idle_hours)}h before"
+                lines.append(f"**{name}:** {value}")
+            await ctx.send(
+                embed=create_info_embed("Ticket Auto-Close", "\n".join(lines) or "Auto-close is not configured."),
+                ephemeral=True
+            )
+            return
+        
+        key = category or AUTOCLOSE_ALL
+        conn = sqlite3.connect(DATABASE_NAME)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO ticket_autoclose_settings (guild_id, category, idle_hours, warn_hours, set_by, set_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (ctx.guild.id, key, hours, warn_hours, ctx.author.id))
+        conn.commit()
+        conn.close()
+        
+        self.autoclose_settings[(ctx.guild.id, key)] = (hours, warn_hours)
+        self._reschedule_autoclose()
+        
+        scope = TICKET_CATEGORY_NAMES[category] if category else "all categories"
+        if hours == 0:
+            message = f"Auto-close disabled for {scope}."
+        else:
+            message = f"Tickets in {scope} will close after **{hours}h** without messages, with a warning {min(warn_hours, hours)}h before."
+        await ctx.send(embed=create_success_embed("Auto-Close Updated", message))
     
     @commands.hybrid_command(name="ticketreport")
     @commands.has_permissions(administrator=True)
@@ -1697,15 +2884,8 @@ class Tickets(commands.Cog):
         
         # Set new report role
         try:
-            # Save the role to database
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO ticket_report_roles (guild_id, role_id, set_by, set_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (ctx.guild.id, role.id, ctx.author.id))
-            conn.commit()
-            conn.close()
+            # Save the setting
+            await self.settings.update("tickets", ctx.guild.id, updated_by=ctx.author.id, report_role_id=role.id)
             
             success_embed = discord.Embed(
                 title="✅ Report Role Set",
@@ -1747,13 +2927,10 @@ class Tickets(commands.Cog):
             return
         
         try:
-            # Remove report role setting from database
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM ticket_report_roles WHERE guild_id = ?', (ctx.guild.id,))
-            deleted = cursor.rowcount > 0
-            conn.commit()
-            conn.close()
+            # Remove report role setting
+            deleted = self._ticket_settings(ctx.guild.id).report_role_id is not None
+            if deleted:
+                await self.settings.update("tickets", ctx.guild.id, updated_by=ctx.author.id, report_role_id=None)
             
             if deleted:
                 embed = discord.Embed(
@@ -1836,15 +3013,8 @@ class Tickets(commands.Cog):
         
         # Set new partner role
         try:
-            # Save the role to database
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO ticket_partner_roles (guild_id, role_id, set_by, set_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (ctx.guild.id, role.id, ctx.author.id))
-            conn.commit()
-            conn.close()
+            # Save the setting
+            await self.settings.update("tickets", ctx.guild.id, updated_by=ctx.author.id, partner_role_id=role.id)
             
             success_embed = discord.Embed(
                 title="✅ Partner Role Set",
@@ -1886,13 +3056,10 @@ class Tickets(commands.Cog):
             return
         
         try:
-            # Remove partner role setting from database
-            conn = sqlite3.connect(DATABASE_NAME)
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM ticket_partner_roles WHERE guild_id = ?', (ctx.guild.id,))
-            deleted = cursor.rowcount > 0
-            conn.commit()
-            conn.close()
+            # Remove partner role setting
+            deleted = self._ticket_settings(ctx.guild.id).partner_role_id is not None
+            if deleted:
+                await self.settings.update("tickets", ctx.guild.id, updated_by=ctx.author.id, partner_role_id=None)
             
             if deleted:
                 embed = discord.Embed(
@@ -0,0 +1,87 @@
+"""
+Per-message cost of counting-channel evaluation, before and after utils.arithmetic.
+Run from the repository root: python tests/bench_arithmetic.py
+The previous evaluator (Counting.safe_eval) is reproduced below for comparison.
+"""
+
+import ast
+import operator
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.arithmetic import evaluate_integer  # noqa: E402
+
+RUNS = 20000
+
+MESSAGES = [
+    ("plain int", "1234"),
+    ("chat", "lol nice one everyone"),
+    ("expression", "(3+4)*6"),
+    ("nested power", "((9**99)**99)**99"),
+]
+
+
+def previous_safe_eval(expr):
+    operators = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+        ast.Pow: operator.pow,
+        ast.BitXor: operator.pow,
+        ast.USub: operator.neg
+    }
+
+    def eval_node(node):
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, (int, float)):
+                return node.value
+            raise TypeError("Not a number")
+        elif isinstance(node, ast.BinOp):
+            op = type(node.op)
+            if op in operators:
+                left = eval_node(node.left)
+                right = eval_node(node.right)
+                if op in (ast.Pow, ast.BitXor):
+                    if right > 100:
+                        raise ValueError("Exponent too large")
+                return operators[op](left, right)
+        elif isinstance(node, ast.UnaryOp):
+            op = type(node.op)
+            if op in operators:
+                return operators[op](eval_node(node.operand))
+        raise TypeError("Unsupported type")
+
+    try:
+        tree = ast.parse(expr, mode='eval')
+        return eval_node(tree.body)
+    except Exception:
+        return None
+
+
+def previous_integer(expr):
+    value = previous_safe_eval(expr)
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    return value
+
+
+def per_call(func, text, runs):
+    return timeit.timeit(lambda: func(text), number=runs) / runs * 1e6
+
+
+def main():
+    print(f"{'message':<14}{'before':>12}{'after':>12}")
+    for label, text in MESSAGES:
+        # The old evaluator computes the nested power in full, so time it once
+        runs = 1 if label == "nested power" else RUNS
+        before = per_call(previous_integer, text, runs)
+        after = per_call(evaluate_integer, text, RUNS)
+        print(f"{label:<14}{before:>10.1f}us{after:>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
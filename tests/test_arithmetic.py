@@ -0,0 +1,102 @@
+"""Bounded arithmetic used by the counting game"""
+
+import random
+
+import pytest
+
+from utils.arithmetic import (
+    MAX_EXPRESSION_DEPTH, MAX_EXPRESSION_LENGTH, MAX_EXPRESSION_NODES, MAX_RESULT_BITS, evaluate, evaluate_integer,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("42", 42),
+    ("-5", -5),
+    ("0", 0),
+    ("  17  ", 17),
+    ("123456789012345678901234567890", 123456789012345678901234567890),
+])
+def test_plain_integers(text, expected):
+    assert evaluate_integer(text) == expected
+
+
+@pytest.mark.parametrize("text", ["0012", "007", "-01"])
+def test_leading_zeros_are_not_numbers(text):
+    assert evaluate_integer(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "", "   ", "hello", "lol nice one everyone", "True", "42 is the answer", "x+1", "__import__('os')", "1; 2",
+])
+def test_chat_is_rejected(text):
+    assert evaluate_integer(text) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("7*6", 42),
+    ("2^6", 64),
+    ("2**6", 64),
+    ("(3+4)*6", 42),
+    ("84/2", 42),
+    ("7/2", None),
+    ("1e3", 1000),
+    ("-(2+3)", -5),
+    ("1**999", 1),
+    ("2**-2000", 0),
+])
+def test_expressions(text, expected):
+    assert evaluate_integer(text) == expected
+
+
+def test_division_keeps_fractions_for_evaluate():
+    assert evaluate("7/2") == 3.5
+
+
+def test_length_limit():
+    assert evaluate_integer("1" * MAX_EXPRESSION_LENGTH) is not None
+    assert evaluate_integer("1" * (MAX_EXPRESSION_LENGTH + 1)) is None
+
+
+def balanced_sum(ones):
+    """A sum of `ones` ones, nested as a balanced tree so depth stays low; it has 2 * ones - 1 nodes"""
+    if ones == 1:
+        return "1"
+    half = ones // 2
+    return f"({balanced_sum(half)}+{balanced_sum(ones - half)})"
+
+
+def test_node_limit():
+    fits = (MAX_EXPRESSION_NODES + 1) // 2
+    assert evaluate_integer(balanced_sum(fits)) == fits
+    assert evaluate_integer(balanced_sum(fits + 1)) is None
+
+
+def test_depth_limit():
+    assert evaluate_integer("-" * MAX_EXPRESSION_DEPTH + "1") == 1
+    assert evaluate_integer("-" * (MAX_EXPRESSION_DEPTH + 1) + "1") is None
+    # Redundant parentheses add no nodes
+    assert evaluate_integer("(" * 30 + "1" + ")" * 30) == 1
+
+
+@pytest.mark.parametrize("text", ["9**9**9", "((9**99)**99)**99", "99999**99", "2^999999999", "(-8)**(1/3)", "1e400"])
+def test_expensive_or_non_real_values_are_refused(text):
+    assert evaluate_integer(text) is None
+
+
+def test_bit_limit():
+    assert evaluate_integer(f"2**{MAX_RESULT_BITS - 1}") == 2 ** (MAX_RESULT_BITS - 1)
+    assert evaluate_integer(f"2**{MAX_RESULT_BITS}") is None
+    # Intermediate values are limited too, even when the result would be small
+    assert evaluate_integer(f"2**{MAX_RESULT_BITS}-2**{MAX_RESULT_BITS}") is None
+
+
+def test_seeded_fuzz_results_are_bounded_integers():
+    rng = random.Random(1)
+    tokens = list("0123456789+-*/^().e ") + ["**", "10", "999"]
+    accepted = 0
+    for _ in range(50000):
+        text = "".join(rng.choice(tokens) for _ in range(rng.randint(1, 25)))
+        result = evaluate_integer(text)
+        assert result is None or (type(result) is int and result.bit_length() <= MAX_RESULT_BITS), text
+        accepted += result is not None
+    assert accepted > 1000  # The fuzz must reach the evaluator, not just the character filter
@@ -0,0 +1,132 @@
+"""AttachmentStore against a local stand-in for the Discord CDN"""
+
+import hashlib
+from contextlib import asynccontextmanager
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils import attachment_store
+from utils.attachment_store import (
+    STATUS_GONE, STATUS_STORE_FULL, STATUS_STORED, STATUS_TOO_LARGE, AttachmentStore,
+)
+
+FILES = {
+    "a.png": b"a" * 1000,
+    "copy.png": b"a" * 1000,
+    "b.txt": b"hello",
+    "big.bin": b"x" * 5000,
+}
+TICKET = {"ticket_id": 1, "guild_id": 2}
+
+
+@asynccontextmanager
+async def cdn():
+    """Serves FILES, answers 404 for anything else and 500 under /broken/"""
+    async def handle(request):
+        name = request.match_info["name"]
+        if name not in FILES:
+            raise web.HTTPNotFound()
+        return web.Response(body=FILES[name])
+
+    async def broken(request):
+        raise web.HTTPInternalServerError()
+
+    app = web.Application()
+    app.router.add_get("/files/{name}", handle)
+    app.router.add_get("/broken/{name}", broken)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        yield str(server.make_url("/"))
+    finally:
+        await server.close()
+
+
+def attachment(attachment_id, base, name, size=None, path="files"):
+    return {
+        "id": attachment_id,
+        "url": f"{base}{path}/{name}",
+        "filename": name,
+        "size": len(FILES.get(name, b"")) if size is None else size,
+        "message_id": 10,
+    }
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(attachment_store, "ATTACHMENT_MAX_BYTES", 4096)
+    return AttachmentStore(tmp_path / "attachments")
+
+
+@pytest.mark.asyncio
+async def test_archive_stores_deduplicates_and_records_missing_files(store):
+    async with cdn() as base:
+        attachments = [
+            attachment(1, base, "a.png"),
+            attachment(2, base, "copy.png"),
+            attachment(3, base, "b.txt"),
+            attachment(4, base, "deleted.png", size=10),
+            attachment(5, base, "big.bin"),
+        ]
+        counts = await store.archive(TICKET, attachments)
+        again = await store.archive(TICKET, attachments)
+
+    assert counts == {"stored": 3, "skipped": 2, "failed": 0}
+    assert again == {"stored": 0, "skipped": 5, "failed": 0}
+
+    first, copy = store.lookup(1), store.lookup(2)
+    assert first["status"] == STATUS_STORED
+    assert first["path"] == copy["path"]
+    assert first["path"].read_bytes() == FILES["a.png"]
+    assert first["path"].name == hashlib.sha256(FILES["a.png"]).hexdigest()
+    assert store.lookup(3)["path"].read_bytes() == b"hello"
+    assert store.lookup(4)["status"] == STATUS_GONE
+    assert store.lookup(5)["status"] == STATUS_TOO_LARGE
+    assert not list(store.root.glob("*.part"))
+
+
+@pytest.mark.asyncio
+async def test_server_errors_raise_for_retry_and_leave_no_record(store):
+    async with cdn() as base:
+        with pytest.raises(RuntimeError):
+            await store.archive(TICKET, [attachment(1, base, "b.txt"), attachment(2, base, "a.png", path="broken")])
+
+    assert store.lookup(1)["status"] == STATUS_STORED
+    assert store.lookup(2) is None
+
+
+@pytest.mark.asyncio
+async def test_store_limit_budget_is_refunded_when_nothing_is_stored(store):
+    async with cdn() as base, aiohttp.ClientSession() as session:
+        budget = [2000]
+        assert await store._archive_one(session, TICKET, attachment(1, base, "gone.png", size=1500), budget) == STATUS_GONE
+        assert budget == [2000]
+
+        with pytest.raises(aiohttp.ClientResponseError):
+            await store._archive_one(session, TICKET, attachment(2, base, "a.png", path="broken"), budget)
+        assert budget == [2000]
+
+        # The declared size is only a reservation; the bytes actually stored are what count
+        assert await store._archive_one(session, TICKET, attachment(3, base, "a.png", size=1500), budget) == STATUS_STORED
+        assert budget == [1000]
+
+        assert await store._archive_one(session, TICKET, attachment(4, base, "b.txt", size=1001), budget) == STATUS_STORE_FULL
+        assert budget == [1000]
+
+
+@pytest.mark.asyncio
+async def test_store_full_and_too_large_are_retried_by_later_jobs(store, monkeypatch):
+    monkeypatch.setattr(attachment_store, "ATTACHMENT_STORE_MAX_BYTES", 100)
+    async with cdn() as base:
+        attachments = [attachment(1, base, "a.png"), attachment(2, base, "big.bin")]
+        assert await store.archive(TICKET, attachments) == {"stored": 0, "skipped": 2, "failed": 0}
+        assert store.lookup(1)["status"] == STATUS_STORE_FULL
+
+        monkeypatch.setattr(attachment_store, "ATTACHMENT_STORE_MAX_BYTES", 10_000)
+        monkeypatch.setattr(attachment_store, "ATTACHMENT_MAX_BYTES", 10_000)
+        assert await store.archive(TICKET, attachments) == {"stored": 2, "skipped": 0, "failed": 0}
+    assert store.lookup(1)["status"] == STATUS_STORED
+    assert store.lookup(2)["path"].read_bytes() == FILES["big.bin"]
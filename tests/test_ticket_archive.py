@@ -0,0 +1,79 @@
+"""Full-text search over archived ticket transcripts"""
+
+import pytest
+
+from utils.ticket_archive import TicketArchive, fts_query
+
+
+def record(message_id, content, author="alice"):
+    return {"id": message_id, "timestamp": "2024-01-01 00:00:00 UTC", "author": author, "content": content,
+            "attachments": []}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = TicketArchive(tmp_path / "archive.db")
+    tickets = [
+        ({"ticket_id": 1, "guild_id": 1, "category": "support", "title": "Login help"},
+         [record(10, "I cannot log in to my account"), record(11, "log in fails with an error")]),
+        ({"ticket_id": 2, "guild_id": 1, "category": "report", "title": "Spam report"},
+         [record(20, "someone is posting spam links", author="bob")]),
+        ({"ticket_id": 3, "guild_id": 2, "category": "support", "title": "Private"},
+         [record(30, "the secret password is hunter2")]),
+    ]
+    for ticket, records in tickets:
+        archive.begin(ticket)
+        archive.add_messages(ticket, records)
+    return archive
+
+
+def ticket_ids(results):
+    return [result["ticket_id"] for result in results]
+
+
+def test_search_returns_one_entry_per_ticket(archive):
+    assert ticket_ids(archive.search(1, "log")) == [1]
+
+
+def test_search_is_scoped_to_the_guild(archive):
+    assert archive.search(1, "secret") == []
+    assert ticket_ids(archive.search(2, "secret")) == [3]
+
+
+@pytest.mark.parametrize("query", [
+    'nomatch) OR (secret',
+    'nomatch) OR guild_key:g2 OR (secret',
+    '") OR ("secret',
+    'guild_key:g2',
+    'secret OR',
+])
+def test_query_syntax_cannot_escape_the_guild_scope(archive, query):
+    assert all(result["ticket_id"] != 3 for result in archive.search(1, query))
+
+
+def test_supported_syntax(archive):
+    assert sorted(ticket_ids(archive.search(1, '"log in" OR spam'))) == [1, 2]
+    assert ticket_ids(archive.search(1, "category:report")) == [2]
+    assert ticket_ids(archive.search(1, "acc*")) == [1]
+    assert ticket_ids(archive.search(1, "log NOT error")) == [1]
+    assert archive.search(1, "((") == []
+
+
+def test_fts_query_quotes_every_term():
+    assert fts_query('nomatch) OR (secret') == '"nomatch" OR "secret"'
+    assert fts_query('title:"spam report" OR bob*') == 'title : "spam report" OR "bob"*'
+    assert fts_query('see http://example AND') == '"see" "http example"'
+
+
+def test_busy_tickets_do_not_crowd_out_others(tmp_path):
+    archive = TicketArchive(tmp_path / "archive.db")
+    busy = {"ticket_id": 1, "guild_id": 1, "title": "Busy"}
+    quiet = {"ticket_id": 2, "guild_id": 1, "title": "Quiet"}
+    archive.begin(busy)
+    archive.add_messages(busy, [record(i, "refund refund refund") for i in range(500)])
+    archive.begin(quiet)
+    archive.add_messages(quiet, [record(1000, "asking about a refund for an order placed last week")])
+
+    results = archive.search(1, "refund")
+    assert ticket_ids(results) == [1, 2]
+    assert "**refund**" in results[1]["snippet"]
@@ -0,0 +1,100 @@
+"""REST calls made by ticket creation, counted against stub Discord objects"""
+
+import types
+
+import discord
+import pytest
+
+from cogs.tickets import Tickets
+
+
+class FakeRole:
+    id = 99
+    name = "Support"
+    mention = "<@&99>"
+    mentionable = True
+
+    def __init__(self, member_count):
+        self.members = [object()] * member_count
+
+
+class FakeThread:
+    id = 555
+    mention = "<#555>"
+
+    def __init__(self, guild, calls):
+        self.guild = guild
+        self.calls = calls
+        self.sent = []
+
+    async def add_user(self, user):
+        self.calls.append("add_user")
+
+    async def send(self, **kwargs):
+        self.calls.append("send")
+        self.sent.append(kwargs)
+
+
+class FakeChannel(discord.TextChannel):
+    id = 10
+    name = "tickets"
+
+    def __init__(self, guild, calls):
+        self._guild = guild
+        self.calls = calls
+        self.thread = None
+
+    async def create_thread(self, **kwargs):
+        self.calls.append("create_thread")
+        self.thread = FakeThread(self._guild, self.calls)
+        return self.thread
+
+
+class FakeGuild:
+    id = 1
+    name = "Guild"
+    text_channels = []
+
+    def __init__(self, staff_count, calls):
+        self.role = FakeRole(staff_count)
+        self.channel = FakeChannel(self, calls)
+        self.me = types.SimpleNamespace(guild_permissions=types.SimpleNamespace(mention_everyone=False))
+
+    def get_role(self, role_id):
+        return self.role if role_id == self.role.id else None
+
+    def get_channel(self, channel_id):
+        return self.channel if channel_id == self.channel.id else None
+
+
+class FakeFollowup:
+    async def send(self, *args, **kwargs):
+        pass
+
+
+class FakeBot:
+    user = None
+    loop = types.SimpleNamespace(create_task=lambda coro: coro.close())
+
+
+@pytest.fixture
+def cog(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # botdata.db is created in the working directory
+    return Tickets(FakeBot())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("staff_count", [10, 100, 1000])
+async def test_ticket_creation_costs_three_calls_whatever_the_team_size(cog, staff_count):
+    calls = []
+    guild = FakeGuild(staff_count, calls)
+    await cog.settings.update("tickets", guild.id, updated_by=1, support_role_id=FakeRole.id)
+    user = types.SimpleNamespace(id=7, name="user", mention="<@7>")
+    interaction = types.SimpleNamespace(guild=guild, user=user, followup=FakeFollowup(), channel_id=FakeChannel.id)
+
+    await cog._create_ticket(interaction, "support")
+
+    assert calls == ["create_thread", "add_user", "send"]
+    welcome = guild.channel.thread.sent[0]
+    assert FakeRole.mention in welcome["content"]
+    assert welcome["allowed_mentions"].roles == [guild.role]
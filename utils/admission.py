@@ -0,0 +1,68 @@
+"""
+Per-key admission queue.
+Bounds how many operations run at once for a key (e.g. a guild), admits the
+rest in arrival order, and remembers who is queued so repeated requests from
+the same member can be recognised instead of starting a second operation.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+
+class AdmissionQueue:
+    """FIFO admission with bounded concurrency per key"""
+
+    def __init__(self, concurrency: int, max_waiting: int):
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self._semaphores: Dict[Hashable, asyncio.Semaphore] = {}
+        self._waiting: Dict[Hashable, Dict[int, None]] = {}  # Insertion-ordered member IDs
+        self._running: Dict[Hashable, set] = {}
+
+    def position(self, key: Hashable, member_id: int) -> Optional[int]:
+        """0 while the member's operation runs, 1+ while waiting, None when not queued"""
+        if member_id in self._running.get(key, ()):
+            return 0
+        waiting = self._waiting.get(key, {})
+        if member_id not in waiting:
+            return None
+        return list(waiting).index(member_id) + 1
+
+    def is_full(self, key: Hashable) -> bool:
+        return len(self._waiting.get(key, ())) >= self.max_waiting
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable, member_id: int,
+                   on_queued: Optional[Callable[[int], Awaitable[None]]] = None):
+        """Wait for a free slot; on_queued(position) is awaited first when the member has to wait"""
+        semaphore = self._semaphores.setdefault(key, asyncio.Semaphore(self.concurrency))
+        waiting = self._waiting.setdefault(key, {})
+        waiting[member_id] = None
+        try:
+            if semaphore.locked() and on_queued:
+                await on_queued(len(waiting))
+            await semaphore.acquire()
+        except BaseException:
+            waiting.pop(member_id, None)
+            self._cleanup(key)
+            raise
+
+        waiting.pop(member_id, None)
+        running = self._running.setdefault(key, set())
+        running.add(member_id)
+        try:
+            yield
+        finally:
+            running.discard(member_id)
+            semaphore.release()
+            self._cleanup(key)
+
+    def _cleanup(self, key: Hashable):
+        if self._waiting.get(key) or self._running.get(key):
+            return
+        semaphore = self._semaphores.get(key)
+        if semaphore is not None and not semaphore.locked():
+            self._semaphores.pop(key, None)
+            self._waiting.pop(key, None)
+            self._running.pop(key, None)
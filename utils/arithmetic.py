@@ -0,0 +1,110 @@
+"""
+Bounded arithmetic evaluation for the counting game.
+Counting channels accept maths ("7*6", "2^6") as well as plain numbers,
+and every message in them is checked. Plain integers are recognised by a
+regex without touching the parser, text that cannot be arithmetic is
+rejected by its characters, and real expressions are evaluated under limits
+on length, node count, nesting depth and the size of every intermediate
+value, so no message can cost more than a few microseconds.
+"""
+
+import ast
+import math
+import operator
+import re
+from typing import List, Optional, Union
+
+Number = Union[int, float]
+
+MAX_EXPRESSION_LENGTH = 200
+MAX_EXPRESSION_NODES = 64
+MAX_EXPRESSION_DEPTH = 16
+MAX_RESULT_BITS = 256  # Applies to every intermediate value, not just the result
+
+_INTEGER_RE = re.compile(r"-?(?:0|[1-9][0-9]*)")
+_EXPRESSION_RE = re.compile(r"[0-9.eE_+\-*/^()\s]+")
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.BitXor: operator.pow,  # Allow ^ for power
+}
+
+
+class ExpressionTooExpensive(ValueError):
+    pass
+
+
+def _check(value) -> Number:
+    if isinstance(value, int):
+        if value.bit_length() > MAX_RESULT_BITS:
+            raise ExpressionTooExpensive("Value too large")
+    elif isinstance(value, float):
+        if not math.isfinite(value) or abs(value) >= 2.0 ** MAX_RESULT_BITS:
+            raise ExpressionTooExpensive("Value too large")
+    else:
+        raise TypeError("Not a real number")
+    return value
+
+
+def _bits(value: Number) -> float:
+    return math.log2(abs(value)) if value else 0.0
+
+
+def _power(base: Number, exponent: Number) -> Number:
+    # Estimate the size first: 9**9**9 must be refused before it is computed
+    if exponent > 0 and abs(base) > 1 and _bits(base) * exponent > MAX_RESULT_BITS:
+        raise ExpressionTooExpensive("Exponent too large")
+    return base ** exponent
+
+
+def _eval_node(node: ast.AST, depth: int, budget: List[int]) -> Number:
+    budget[0] -= 1
+    if budget[0] < 0:
+        raise ExpressionTooExpensive("Expression too long")
+    if depth > MAX_EXPRESSION_DEPTH:
+        raise ExpressionTooExpensive("Expression nested too deeply")
+
+    if isinstance(node, ast.Constant):
+        if type(node.value) in (int, float):
+            return _check(node.value)
+        raise TypeError("Not a number")
+    if isinstance(node, ast.BinOp):
+        op = type(node.op)
+        if op in _BINARY_OPERATORS:
+            left = _eval_node(node.left, depth + 1, budget)
+            right = _eval_node(node.right, depth + 1, budget)
+            if op in (ast.Pow, ast.BitXor):
+                return _check(_power(left, right))
+            return _check(_BINARY_OPERATORS[op](left, right))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_eval_node(node.operand, depth + 1, budget)
+    raise TypeError("Unsupported expression")
+
+
+def evaluate(expr: str) -> Optional[Number]:
+    """The value of a plain number or arithmetic expression, or None if it is neither or too expensive"""
+    expr = expr.strip()
+    if not expr or len(expr) > MAX_EXPRESSION_LENGTH:
+        return None
+    if _INTEGER_RE.fullmatch(expr):
+        return int(expr)
+    if not _EXPRESSION_RE.fullmatch(expr):
+        return None  # Ordinary chat never reaches the parser
+
+    try:
+        tree = ast.parse(expr, mode="eval")
+        return _eval_node(tree.body, 0, [MAX_EXPRESSION_NODES])
+    except Exception:
+        return None
+
+
+def evaluate_integer(expr: str) -> Optional[int]:
+    """Like evaluate(), but only integral values count; 12/2 is 6, 7/2 is None"""
+    value = evaluate(expr)
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    return value
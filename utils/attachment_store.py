@@ -0,0 +1,219 @@
+"""
+Local content-addressed store for ticket attachments.
+Discord CDN links expire, so closed tickets get their attachments downloaded
+into data/attachments. Files are named by their SHA-256, which deduplicates
+identical uploads across tickets; a small SQLite index maps each Discord
+attachment ID (the stable ID transcripts reference) to its blob.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+ATTACHMENT_STORE_PATH = Path("data/attachments")
+
+ATTACHMENT_MAX_BYTES = 25 * 1024 * 1024             # Larger attachments are not archived
+ATTACHMENT_STORE_MAX_BYTES = 5 * 1024 * 1024 * 1024  # Stop archiving once the store holds this much
+ATTACHMENT_DOWNLOAD_CONCURRENCY = 4
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_TIMEOUT = 120  # Seconds per file
+
+STATUS_STORED = "stored"
+STATUS_TOO_LARGE = "too_large"
+STATUS_STORE_FULL = "store_full"
+STATUS_GONE = "gone"
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+class AttachmentStore:
+    """Downloads attachments into hash-named files and answers lookups by attachment ID"""
+
+    def __init__(self, root: Path = ATTACHMENT_STORE_PATH):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / "index.db"
+        self._semaphore = asyncio.Semaphore(ATTACHMENT_DOWNLOAD_CONCURRENCY)
+        self._init_database()
+
+    def _init_database(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS attachment_blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE TABLE IF NOT EXISTS ticket_attachments (
+                attachment_id INTEGER PRIMARY KEY,
+                ticket_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                message_id INTEGER,
+                filename TEXT,
+                size INTEGER,
+                sha256 TEXT,
+                status TEXT NOT NULL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_ticket_attachments_ticket
+            ON ticket_attachments(ticket_id);
+        ''')
+        conn.commit()
+        conn.close()
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    def lookup(self, attachment_id: int) -> Optional[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.execute('''
+            SELECT ticket_id, guild_id, message_id, filename, size, sha256, status
+            FROM ticket_attachments WHERE attachment_id = ?
+        ''', (attachment_id,))
+        row = cursor.fetchone()
+        conn.close()
+        if not row:
+            return None
+        ticket_id, guild_id, message_id, filename, size, sha256, status = row
+        return {
+            "attachment_id": attachment_id,
+            "ticket_id": ticket_id,
+            "guild_id": guild_id,
+            "message_id": message_id,
+            "filename": filename,
+            "size": size,
+            "status": status,
+            "path": self.blob_path(sha256) if sha256 else None,
+        }
+
+    def _known(self, attachment_ids: List[int]) -> set:
+        if not attachment_ids:
+            return set()
+        conn = sqlite3.connect(self.db_path)
+        placeholders = ",".join("?" * len(attachment_ids))
+        # Outcomes that depend on the current limits are not final; a later job tries those again
+        cursor = conn.execute(
+            f'SELECT attachment_id FROM ticket_attachments WHERE attachment_id IN ({placeholders}) '
+            f'AND status NOT IN (?, ?)',
+            [*attachment_ids, STATUS_STORE_FULL, STATUS_TOO_LARGE]
+        )
+        known = {row[0] for row in cursor.fetchall()}
+        conn.close()
+        return known
+
+    def _stored_bytes(self) -> int:
+        conn = sqlite3.connect(self.db_path)
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM attachment_blobs').fetchone()[0]
+        conn.close()
+        return total
+
+    def _record(self, ticket: Dict[str, Any], attachment: Dict[str, Any], status: str,
+                sha256: Optional[str] = None, size: Optional[int] = None):
+        conn = sqlite3.connect(self.db_path)
+        if sha256:
+            conn.execute('INSERT OR IGNORE INTO attachment_blobs (sha256, size) VALUES (?, ?)', (sha256, size))
+        conn.execute('''
+            INSERT OR REPLACE INTO ticket_attachments
+            (attachment_id, ticket_id, guild_id, message_id, filename, size, sha256, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            attachment["id"], ticket["ticket_id"], ticket["guild_id"], attachment.get("message_id"),
+            attachment["filename"], size if size is not None else attachment.get("size"), sha256, status,
+        ))
+        conn.commit()
+        conn.close()
+
+    async def archive(self, ticket: Dict[str, Any], attachments: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Download every attachment not archived yet; raises if any download failed so it can be retried"""
+        known = await asyncio.to_thread(self._known, [att["id"] for att in attachments])
+        pending = [att for att in attachments if att["id"] not in known]
+        counts = {"stored": 0, "skipped": len(attachments) - len(pending), "failed": 0}
+        if not pending:
+            return counts
+
+        budget = [ATTACHMENT_STORE_MAX_BYTES - await asyncio.to_thread(self._stored_bytes)]
+        timeout = aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            results = await asyncio.gather(
+                *(self._archive_one(session, ticket, att, budget) for att in pending),
+                return_exceptions=True
+            )
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        counts["failed"] = len(errors)
+        counts["stored"] = sum(1 for result in results if result == STATUS_STORED)
+        counts["skipped"] += len(results) - len(errors) - counts["stored"]
+        if errors:
+            raise RuntimeError(f"{len(errors)} attachment download(s) failed, first error: {errors[0]}")
+        return counts
+
+    async def _archive_one(self, session: aiohttp.ClientSession, ticket: Dict[str, Any],
+                           attachment: Dict[str, Any], budget: List[int]) -> str:
+        size = attachment.get("size") or 0
+        if size > ATTACHMENT_MAX_BYTES:
+            status = STATUS_TOO_LARGE
+        elif size > budget[0]:
+            status = STATUS_STORE_FULL
+        else:
+            # Reserve the declared size so concurrent downloads cannot overshoot the store limit,
+            # then settle it against what was actually stored (nothing if the download failed)
+            budget[0] -= size
+            stored = 0
+            try:
+                async with self._semaphore:
+                    try:
+                        sha256, stored = await self._download(session, attachment["url"])
+                        status = STATUS_STORED
+                    except AttachmentTooLarge:
+                        sha256, status = None, STATUS_TOO_LARGE
+                    except aiohttp.ClientResponseError as e:
+                        if e.status not in (403, 404):
+                            raise
+                        sha256, status = None, STATUS_GONE
+            finally:
+                budget[0] += size - stored
+            if status == STATUS_STORED:
+                size = stored
+                await asyncio.to_thread(self._record, ticket, attachment, status, sha256, size)
+                return status
+        await asyncio.to_thread(self._record, ticket, attachment, status)
+        return status
+
+    async def _download(self, session: aiohttp.ClientSession, url: str) -> tuple:
+        """Stream a file to disk while hashing it; returns (sha256, size)"""
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > ATTACHMENT_MAX_BYTES:
+                            raise AttachmentTooLarge(url)
+                        hasher.update(chunk)
+                        tmp.write(chunk)
+
+            sha256 = hasher.hexdigest()
+            path = self.blob_path(sha256)
+            if path.exists():
+                os.unlink(tmp_name)  # Same content is already stored
+            else:
+                path.parent.mkdir(exist_ok=True)
+                os.replace(tmp_name, path)
+            return sha256, size
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
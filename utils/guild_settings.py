@@ -0,0 +1,152 @@
+"""
+Per-guild settings service.
+Each cog registers a section holding every configured guild, loaded once from
+its own table, plus a function that persists changes. Reads are dictionary
+lookups: because a section is loaded in full, a guild missing from it is
+known to be "not configured" without asking the database. Updates are written
+through to the owning table first, then applied in memory and announced to
+subscribers.
+"""
+
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Defaults that used to be hardcoded in the cogs (CodeVerse Hub IDs)
+DEFAULT_TICKET_STAFF_ROLE_ID = 1417900662053671073
+DEFAULT_TICKET_LOG_CHANNEL_ID = 1438487366305190018
+DEFAULT_REVIEW_CHANNEL_ID = 1400075578391920792
+
+
+class SettingsRecord:
+    """Immutable-by-convention settings record; use replace() to derive a changed copy"""
+
+    __slots__ = ()
+
+    def replace(self, **changes) -> "SettingsRecord":
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return type(self)(**values)
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class StarboardSettings(SettingsRecord):
+    __slots__ = ("channel_id", "threshold", "star_emoji", "enabled", "self_star")
+
+    def __init__(self, channel_id: Optional[int] = None, threshold: int = 3, star_emoji: str = "⭐",
+                 enabled: bool = True, self_star: bool = True):
+        self.channel_id = channel_id
+        self.threshold = threshold
+        self.star_emoji = star_emoji
+        self.enabled = enabled
+        self.self_star = self_star
+
+
+class TicketSettings(SettingsRecord):
+    __slots__ = ("log_channel_id", "support_role_id", "report_role_id", "partner_role_id", "staff_role_id",
+                 "log_digest_seconds")
+
+    def __init__(self, log_channel_id: Optional[int] = None, support_role_id: Optional[int] = None,
+                 report_role_id: Optional[int] = None, partner_role_id: Optional[int] = None,
+                 staff_role_id: int = DEFAULT_TICKET_STAFF_ROLE_ID, log_digest_seconds: Optional[int] = None):
+        self.log_channel_id = log_channel_id
+        self.support_role_id = support_role_id
+        self.report_role_id = report_role_id
+        self.partner_role_id = partner_role_id
+        self.staff_role_id = staff_role_id
+        self.log_digest_seconds = log_digest_seconds  # None: one log message per action
+
+
+class CountingSettings(SettingsRecord):
+    __slots__ = ("channel_id",)
+
+    def __init__(self, channel_id: Optional[int] = None):
+        self.channel_id = channel_id
+
+
+class AfkSettings(SettingsRecord):
+    __slots__ = ("ignored_channels", "max_afk_hours")
+
+    def __init__(self, ignored_channels: frozenset = frozenset(), max_afk_hours: Optional[int] = None):
+        self.ignored_channels = frozenset(ignored_channels)
+        self.max_afk_hours = max_afk_hours  # None: AFK statuses never expire
+
+
+class StaffApplicationSettings(SettingsRecord):
+    __slots__ = ("review_channel_id",)
+
+    def __init__(self, review_channel_id: int = DEFAULT_REVIEW_CHANNEL_ID):
+        self.review_channel_id = review_channel_id
+
+
+# saver(guild_id, old_record_or_None, new_record, updated_by)
+SettingsSaver = Callable[[int, Optional[SettingsRecord], SettingsRecord, Optional[int]], Awaitable[None]]
+SettingsListener = Callable[[int, SettingsRecord], Any]
+
+
+class GuildSettingsService:
+    """In-memory read path over every cog's guild configuration"""
+
+    def __init__(self):
+        self._sections: Dict[str, Dict[int, SettingsRecord]] = {}
+        self._defaults: Dict[str, SettingsRecord] = {}
+        self._savers: Dict[str, SettingsSaver] = {}
+        self._listeners: Dict[str, list] = defaultdict(list)
+
+    def register(self, section: str, records: Dict[int, SettingsRecord], default: SettingsRecord,
+                 saver: SettingsSaver):
+        """Install a fully loaded section; guilds absent from `records` are not configured"""
+        self._sections[section] = dict(records)
+        self._defaults[section] = default
+        self._savers[section] = saver
+
+    def get(self, section: str, guild_id: Optional[int]) -> Optional[SettingsRecord]:
+        """The guild's record, or None when the guild has not configured this section"""
+        return self._sections.get(section, {}).get(guild_id)
+
+    def get_or_default(self, section: str, guild_id: Optional[int]) -> SettingsRecord:
+        record = self._sections.get(section, {}).get(guild_id)
+        return record if record is not None else self._defaults[section]
+
+    def configured(self, section: str) -> Dict[int, SettingsRecord]:
+        return self._sections.get(section, {})
+
+    def subscribe(self, section: str, listener: SettingsListener):
+        """Call listener(guild_id, record) after every change to a section"""
+        self._listeners[section].append(listener)
+
+    def unsubscribe(self, section: str, listener: SettingsListener):
+        """Stop calling a listener added with subscribe(); unknown listeners are ignored"""
+        if listener in self._listeners[section]:
+            self._listeners[section].remove(listener)
+
+    async def update(self, section: str, guild_id: int, *, updated_by: Optional[int] = None,
+                     **changes) -> SettingsRecord:
+        """Persist changed fields, then update memory and notify subscribers"""
+        old = self._sections[section].get(guild_id)
+        new = (old if old is not None else self._defaults[section]).replace(**changes)
+        await self._savers[section](guild_id, old, new, updated_by)
+
+        self._sections[section][guild_id] = new
+        for listener in self._listeners[section]:
+            try:
+                listener(guild_id, new)
+            except Exception as e:
+                print(f"[Settings] Listener for {section} failed: {e}")
+        return new
+
+
+def get_settings(bot) -> GuildSettingsService:
+    """The bot-wide settings service, created on first use"""
+    service = getattr(bot, "guild_settings", None)
+    if service is None:
+        service = GuildSettingsService()
+        bot.guild_settings = service
+    return service
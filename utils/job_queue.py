@@ -0,0 +1,159 @@
+"""
+Durable delayed-job queue.
+Jobs are persisted in SQLite and scheduled from an in-memory min-heap, so a
+single task sleeps until the next job is due and pending jobs survive restarts.
+"""
+
+import asyncio
+import heapq
+import json
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.database import DATABASE_NAME
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 30  # Seconds, doubled on every failed attempt
+
+
+class JobQueue:
+    """Runs registered handlers for persisted jobs once they are due"""
+
+    def __init__(self, bot, db_path: str = DATABASE_NAME):
+        self.bot = bot
+        self.db_path = db_path
+        self._handlers: Dict[str, JobHandler] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+        self._running: set = set()
+        self._init_database()
+
+    def _init_database(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                run_at REAL NOT NULL,
+                attempts INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def register(self, job_type: str, handler: JobHandler):
+        self._handlers[job_type] = handler
+
+    def start(self):
+        """Load pending jobs from disk and start the scheduler"""
+        if self._runner:
+            return
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT run_at, job_id FROM scheduled_jobs')
+        self._heap = [(run_at, job_id) for run_at, job_id in cursor.fetchall()]
+        conn.close()
+        heapq.heapify(self._heap)
+        self._runner = asyncio.create_task(self._run())
+        if self._heap:
+            print(f"[Jobs] Resuming {len(self._heap)} pending job(s)")
+
+    def stop(self):
+        if self._runner:
+            self._runner.cancel()
+            self._runner = None
+        for task in list(self._running):
+            task.cancel()
+
+    def schedule(self, job_type: str, payload: Dict[str, Any], delay: float = 0) -> int:
+        """Persist a job to run after `delay` seconds and return its ID"""
+        run_at = time.time() + delay
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            'INSERT INTO scheduled_jobs (job_type, payload, run_at) VALUES (?, ?, ?)',
+            (job_type, json.dumps(payload), run_at)
+        )
+        job_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+
+        self._push(run_at, job_id)
+        return job_id
+
+    def _push(self, run_at: float, job_id: int):
+        heapq.heappush(self._heap, (run_at, job_id))
+        # Wake the scheduler only if this job is now the earliest one
+        if self._heap[0][1] == job_id:
+            self._wakeup.set()
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, job_id = heapq.heappop(self._heap)
+            task = asyncio.create_task(self._execute(job_id))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job_id: int):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT job_type, payload, attempts FROM scheduled_jobs WHERE job_id = ?', (job_id,))
+        row = cursor.fetchone()
+        conn.close()
+        if not row:
+            return
+
+        job_type, payload, attempts = row
+        handler = self._handlers.get(job_type)
+        try:
+            if handler is None:
+                raise RuntimeError(f"no handler registered for {job_type}")
+            await handler(json.loads(payload))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            attempts += 1
+            if attempts >= MAX_ATTEMPTS:
+                print(f"[Jobs] Giving up on {job_type} job #{job_id} after {attempts} attempts: {e}")
+                self._delete(job_id)
+                return
+            run_at = time.time() + RETRY_BASE_DELAY * 2 ** (attempts - 1)
+            print(f"[Jobs] {job_type} job #{job_id} failed (attempt {attempts}), retrying: {e}")
+            conn = sqlite3.connect(self.db_path)
+            conn.execute(
+                'UPDATE scheduled_jobs SET attempts = ?, run_at = ? WHERE job_id = ?',
+                (attempts, run_at, job_id)
+            )
+            conn.commit()
+            conn.close()
+            self._push(run_at, job_id)
+            return
+
+        self._delete(job_id)
+
+    def _delete(self, job_id: int):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('DELETE FROM scheduled_jobs WHERE job_id = ?', (job_id,))
+        conn.commit()
+        conn.close()
@@ -0,0 +1,275 @@
+"""
+Searchable archive of closed-ticket transcripts.
+Messages are stored in a local SQLite database with an FTS5 index over message
+content, author and ticket metadata. Every indexed message also carries a
+per-guild token ("g<guild_id>"), so a search is answered inside the FTS index
+for that guild alone. All methods are blocking and meant to be called through
+asyncio.to_thread.
+"""
+
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+ARCHIVE_DB_PATH = Path("data/ticket_archive.db")
+
+ARCHIVE_BATCH_SIZE = 500      # Messages buffered before each insert
+SNIPPET_TOKENS = 16
+
+SEARCH_COLUMNS = ("content", "author", "category", "title")  # Columns a query may filter on
+SEARCH_OPERATORS = ("AND", "OR", "NOT")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_QUERY_TERM_RE = re.compile(r'(?:(\w+):)?(?:"([^"]*)"|(\S+))', re.UNICODE)
+
+
+class TicketArchive:
+    """Stores closed-ticket messages and answers ranked full-text queries"""
+
+    def __init__(self, path: Path = ARCHIVE_DB_PATH):
+        self.path = path
+        self.path.parent.mkdir(exist_ok=True)
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_database(self):
+        conn = self._connect()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS archived_tickets (
+                ticket_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                ticket_number INTEGER,
+                thread_id INTEGER,
+                user_id INTEGER,
+                category TEXT,
+                title TEXT,
+                message_count INTEGER DEFAULT 0,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_archived_tickets_guild
+            ON archived_tickets(guild_id, archived_at);
+
+            CREATE TABLE IF NOT EXISTS archived_messages (
+                id INTEGER PRIMARY KEY,
+                ticket_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                message_id INTEGER,
+                author TEXT,
+                content TEXT,
+                category TEXT,
+                title TEXT,
+                created_at TEXT,
+                guild_key TEXT
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_archived_messages_ticket
+            ON archived_messages(ticket_id);
+        ''')
+
+        # Older archives indexed every guild together; add the guild token and rebuild the index
+        rebuild = False
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(archived_messages)')]
+        if 'guild_key' not in columns:
+            conn.executescript('''
+                ALTER TABLE archived_messages ADD COLUMN guild_key TEXT;
+                UPDATE archived_messages SET guild_key = 'g' || guild_id;
+                DROP TRIGGER IF EXISTS archived_messages_ai;
+                DROP TRIGGER IF EXISTS archived_messages_ad;
+                DROP TABLE IF EXISTS archived_messages_fts;
+            ''')
+            rebuild = True
+
+        conn.executescript('''
+            -- External-content index: the text lives once, in archived_messages
+            CREATE VIRTUAL TABLE IF NOT EXISTS archived_messages_fts USING fts5(
+                content,
+                author,
+                category,
+                title,
+                guild_key,
+                content = 'archived_messages',
+                content_rowid = 'id',
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+
+            CREATE TRIGGER IF NOT EXISTS archived_messages_ai AFTER INSERT ON archived_messages BEGIN
+                INSERT INTO archived_messages_fts(rowid, content, author, category, title, guild_key)
+                VALUES (new.id, new.content, new.author, new.category, new.title, new.guild_key);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS archived_messages_ad AFTER DELETE ON archived_messages BEGIN
+                INSERT INTO archived_messages_fts(archived_messages_fts, rowid, content, author, category, title, guild_key)
+                VALUES ('delete', old.id, old.content, old.author, old.category, old.title, old.guild_key);
+            END;
+        ''')
+        if rebuild:
+            conn.execute("INSERT INTO archived_messages_fts(archived_messages_fts) VALUES ('rebuild')")
+        conn.commit()
+        conn.close()
+
+    def begin(self, ticket: Dict[str, Any]):
+        """Register a ticket, replacing anything archived for it before"""
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM archived_messages WHERE ticket_id = ?', (ticket["ticket_id"],))
+            conn.execute('''
+                INSERT OR REPLACE INTO archived_tickets
+                (ticket_id, guild_id, ticket_number, thread_id, user_id, category, title)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                ticket["ticket_id"], ticket["guild_id"], ticket.get("ticket_number"),
+                ticket.get("thread_id"), ticket.get("user_id"), ticket.get("category"), ticket.get("title"),
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def add_messages(self, ticket: Dict[str, Any], records: Iterable[Dict[str, Any]]):
+        """Index one batch of transcript records (as produced by message_record)"""
+        rows = []
+        for record in records:
+            content = record["content"] or ""
+            if record["attachments"]:
+                content += "\n" + " ".join(att["filename"] for att in record["attachments"])
+            rows.append((
+                ticket["ticket_id"], ticket["guild_id"], record["id"], record["author"], content,
+                ticket.get("category") or "", ticket.get("title") or "", record["timestamp"],
+                _guild_key(ticket["guild_id"]),
+            ))
+        if not rows:
+            return
+
+        conn = self._connect()
+        try:
+            conn.executemany('''
+                INSERT INTO archived_messages
+                (ticket_id, guild_id, message_id, author, content, category, title, created_at, guild_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.execute(
+                'UPDATE archived_tickets SET message_count = message_count + ? WHERE ticket_id = ?',
+                (len(rows), ticket["ticket_id"])
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def search(self, guild_id: int, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return the best matching tickets for a query, one entry per ticket"""
+        match = fts_query(query)
+        if not match:
+            return []
+
+        conn = self._connect()
+        try:
+            results = self._best_tickets(conn, guild_id, match, limit)
+            if results:
+                placeholders = ",".join("?" * len(results))
+                cursor = conn.execute(f'''
+                    SELECT ticket_id, ticket_number, thread_id, user_id, category, title, message_count, archived_at
+                    FROM archived_tickets WHERE ticket_id IN ({placeholders})
+                ''', [r["ticket_id"] for r in results])
+                meta = {row[0]: row for row in cursor.fetchall()}
+                for result in results:
+                    row = meta.get(result["ticket_id"])
+                    if row:
+                        (_, result["ticket_number"], result["thread_id"], result["user_id"],
+                         result["category"], result["title"], result["message_count"], result["archived_at"]) = row
+            return results
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _best_tickets(conn: sqlite3.Connection, guild_id: int, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Rank each matching ticket by its best message in one pass, then snippet only the winners"""
+        # bm25() cannot be used in an aggregate, so the scored hits are materialized first;
+        # MIN() then picks each ticket's best message (SQLite takes the bare columns from that row)
+        cursor = conn.execute('''
+            WITH hits AS MATERIALIZED (
+                SELECT archived_messages_fts.rowid AS id, m.ticket_id,
+                       bm25(archived_messages_fts, 1.0, 0.5, 0.5, 2.0, 0.0) AS score
+                FROM archived_messages_fts
+                JOIN archived_messages m ON m.id = archived_messages_fts.rowid
+                WHERE archived_messages_fts MATCH ? AND m.guild_id = ?
+            )
+            SELECT id, ticket_id, MIN(score) AS best FROM hits
+            GROUP BY ticket_id
+            ORDER BY best, id
+            LIMIT ?
+        ''', (_scoped(guild_id, query), guild_id, limit))
+        best = cursor.fetchall()
+        if not best:
+            return []
+
+        placeholders = ",".join("?" * len(best))
+        cursor = conn.execute(f'''
+            SELECT m.id, m.message_id, m.created_at,
+                   snippet(archived_messages_fts, 0, '**', '**', '…', {SNIPPET_TOKENS}),
+                   snippet(archived_messages_fts, 1, '**', '**', '…', {SNIPPET_TOKENS}),
+                   snippet(archived_messages_fts, 3, '**', '**', '…', {SNIPPET_TOKENS})
+            FROM archived_messages_fts
+            JOIN archived_messages m ON m.id = archived_messages_fts.rowid
+            WHERE archived_messages_fts MATCH ? AND archived_messages_fts.rowid IN ({placeholders})
+        ''', [_scoped(guild_id, query), *(row[0] for row in best)])
+        messages = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        results = []
+        for row_id, ticket_id, score in best:
+            message_id, created_at, content, author, title = messages[row_id]
+            # Show context from whichever field matched: message text first, then title, then author
+            snippet = next((s for s in (content, title, author) if s and "**" in s), content)
+            results.append({
+                "ticket_id": ticket_id,
+                "message_id": message_id,
+                "created_at": created_at,
+                "snippet": snippet,
+                "score": score,
+            })
+        return results
+
+
+def _scoped(guild_id: int, query: str) -> str:
+    # The guild token is part of the MATCH, so other guilds' messages are never ranked
+    return f'guild_key : "{_guild_key(guild_id)}" AND ({query})'
+
+
+def fts_query(query: str) -> str:
+    """Rebuild a user query as an FTS5 expression made only of quoted terms
+
+    Words, "phrases", trailing-* prefixes, AND/OR/NOT and column:term filters are kept; anything
+    else (parentheses, stray quotes, other columns) is dropped, so the result can always be
+    nested inside the guild filter without changing its meaning.
+    """
+    parts: List[str] = []
+    for match in _QUERY_TERM_RE.finditer(query):
+        column, phrase, bare = match.groups()
+        if column is None and bare in SEARCH_OPERATORS:
+            if parts and parts[-1] not in SEARCH_OPERATORS:
+                parts.append(bare)
+            continue
+
+        words = _TOKEN_RE.findall(phrase if phrase is not None else bare)
+        if column and column.lower() not in SEARCH_COLUMNS:
+            words.insert(0, column)  # Not a filter, just a word followed by a colon
+            column = None
+        if not words:
+            continue
+        term = '"' + " ".join(words) + '"'
+        if phrase is None and bare.endswith("*"):
+            term += "*"
+        parts.append(f"{column.lower()} : {term}" if column else term)
+
+    while parts and parts[-1] in SEARCH_OPERATORS:
+        parts.pop()
+    return " ".join(parts)
+
+
+def _guild_key(guild_id: int) -> str:
+    return f"g{guild_id}"
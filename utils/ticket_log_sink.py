@@ -0,0 +1,196 @@
+"""
+Batched delivery of ticket log embeds.
+Guilds with a digest interval get their log entries buffered per channel and
+sent together, up to 10 embeds per message, instead of one message per
+action. Priority entries and guilds without an interval are sent right away.
+Buffered entries are also written to SQLite until they are delivered, so a
+restart resends them instead of losing them.
+"""
+
+import asyncio
+import io
+import json
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+from utils.database import DATABASE_NAME
+
+DIGEST_MAX_EMBEDS = 10            # Discord's per-message embed limit
+DIGEST_MAX_CHARACTERS = 6000      # Discord's limit on the combined text of a message's embeds
+DIGEST_MAX_FILES = 10             # Discord's per-message attachment limit
+DIGEST_MAX_FILE_BYTES = 1024 * 1024  # Larger attachments skip the buffer instead of being held in memory
+DIGEST_RETRY_DELAY = 60           # Seconds before a failed digest is sent again
+DIGEST_MAX_ATTEMPTS = 5
+
+# (entry ID, embed, attachment bytes, attachment filename)
+LogEntry = Tuple[int, discord.Embed, Optional[bytes], Optional[str]]
+
+
+class TicketLogSink:
+    """Sends log embeds immediately or as periodic per-channel digests"""
+
+    def __init__(self, db_path: str = DATABASE_NAME):
+        self.db_path = db_path
+        self._buffers: Dict[int, List[LogEntry]] = {}
+        self._channels: Dict[int, discord.abc.Messageable] = {}
+        self._timers: Dict[int, asyncio.Task] = {}
+        self._failures: Dict[int, int] = {}
+        self._init_database()
+        self._load_pending()
+
+    def _init_database(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_log_buffer (
+                entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel_id INTEGER NOT NULL,
+                embed TEXT NOT NULL,
+                file_data BLOB,
+                filename TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _load_pending(self):
+        """Rebuild the buffers left by the previous run; resume() sends them once channels resolve"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT entry_id, channel_id, embed, file_data, filename FROM ticket_log_buffer ORDER BY entry_id')
+        for entry_id, channel_id, embed, data, filename in cursor.fetchall():
+            self._buffers.setdefault(channel_id, []).append(
+                (entry_id, discord.Embed.from_dict(json.loads(embed)), data, filename)
+            )
+        conn.close()
+
+    def _store(self, channel_id: int, embed: discord.Embed, data: Optional[bytes], filename: Optional[str]) -> int:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            'INSERT INTO ticket_log_buffer (channel_id, embed, file_data, filename) VALUES (?, ?, ?, ?)',
+            (channel_id, json.dumps(embed.to_dict()), data, filename)
+        )
+        entry_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return entry_id
+
+    def _delete(self, entries: List[LogEntry]):
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany('DELETE FROM ticket_log_buffer WHERE entry_id = ?', [(entry[0],) for entry in entries])
+        conn.commit()
+        conn.close()
+
+    async def resume(self, bot):
+        """Send the entries buffered before a restart, dropping those whose channel is gone"""
+        for channel_id in list(self._buffers):
+            if channel_id in self._channels:
+                continue
+            channel = bot.get_channel(channel_id)
+            if channel is None:
+                entries = self._buffers.pop(channel_id)
+                print(f"[Tickets] Dropping {len(entries)} buffered log entries for missing channel {channel_id}")
+                self._delete(entries)
+                continue
+            self._channels[channel_id] = channel
+            await self.flush(channel_id)
+
+    async def send(self, channel: discord.abc.Messageable, embed: discord.Embed, *, interval: int = 0,
+                   priority: bool = False, file: Optional[discord.File] = None, file_size: int = 0):
+        """Deliver one log entry, buffering it when the channel is in digest mode"""
+        if interval <= 0 or priority or (file and file_size > DIGEST_MAX_FILE_BYTES):
+            if file:
+                await channel.send(embed=embed, file=file)
+            else:
+                await channel.send(embed=embed)
+            return
+
+        data = await asyncio.to_thread(file.fp.read) if file else None
+        filename = file.filename if file else None
+        entry_id = self._store(channel.id, embed, data, filename)
+        buffer = self._buffers.setdefault(channel.id, [])
+        buffer.append((entry_id, embed, data, filename))
+        self._channels[channel.id] = channel
+
+        if len(buffer) >= DIGEST_MAX_EMBEDS and channel.id not in self._failures:
+            await self.flush(channel.id)
+        elif channel.id not in self._timers:
+            self._timers[channel.id] = asyncio.create_task(self._flush_later(channel.id, interval))
+
+    async def _flush_later(self, channel_id: int, interval: int):
+        await asyncio.sleep(interval)
+        self._timers.pop(channel_id, None)
+        await self.flush(channel_id)
+
+    async def flush(self, channel_id: int):
+        """Send everything buffered for a channel, putting it back for a retry if a send fails"""
+        timer = self._timers.pop(channel_id, None)
+        if timer and timer is not asyncio.current_task():
+            timer.cancel()
+        entries = self._buffers.pop(channel_id, [])
+        channel = self._channels.get(channel_id)
+        if not entries or channel is None:
+            return
+
+        limit = channel.guild.filesize_limit if getattr(channel, "guild", None) else 8 * 1024 * 1024
+        chunks = self._chunks(entries, limit)
+        for index, chunk in enumerate(chunks):
+            files = [discord.File(io.BytesIO(data), filename=name) for _, _, data, name in chunk if data is not None]
+            try:
+                await channel.send(embeds=[embed for _, embed, _, _ in chunk], files=files)
+            except Exception as e:
+                unsent = [entry for rest in chunks[index:] for entry in rest]
+                self._retry(channel_id, unsent, e)
+                return
+            self._delete(chunk)
+        self._failures.pop(channel_id, None)
+        if channel_id not in self._buffers:
+            self._channels.pop(channel_id, None)
+
+    def _retry(self, channel_id: int, unsent: List[LogEntry], error: Exception):
+        attempts = self._failures.get(channel_id, 0) + 1
+        if attempts >= DIGEST_MAX_ATTEMPTS:
+            print(f"[Tickets] Giving up on {len(unsent)} log entries after {attempts} failed digests: {error}")
+            self._failures.pop(channel_id, None)
+            self._delete(unsent)
+            return
+        print(f"[Tickets] Failed to send log digest (attempt {attempts}), retrying: {error}")
+        self._failures[channel_id] = attempts
+        # Entries logged while the send was in flight stay behind the unsent ones
+        self._buffers[channel_id] = unsent + self._buffers.get(channel_id, [])
+        if channel_id not in self._timers:
+            self._timers[channel_id] = asyncio.create_task(self._flush_later(channel_id, DIGEST_RETRY_DELAY))
+
+    async def flush_all(self):
+        for channel_id in list(self._buffers):
+            await self.flush(channel_id)
+
+    @staticmethod
+    def _chunks(entries: List[LogEntry], size_limit: int) -> List[List[LogEntry]]:
+        """Split entries into messages within the embed, text, attachment and upload size limits"""
+        chunks: List[List[LogEntry]] = []
+        current: List[LogEntry] = []
+        files = size = characters = 0
+        for entry in entries:
+            embed, data = entry[1], entry[2]
+            extra = len(data) if data is not None else 0
+            text = len(embed)
+            if current and (
+                len(current) >= DIGEST_MAX_EMBEDS
+                or characters + text > DIGEST_MAX_CHARACTERS
+                or (data is not None and (files >= DIGEST_MAX_FILES or size + extra > size_limit))
+            ):
+                chunks.append(current)
+                current, files, size, characters = [], 0, 0, 0
+            current.append(entry)
+            characters += text
+            if data is not None:
+                files += 1
+                size += extra
+        if current:
+            chunks.append(current)
+        return chunks
@@ -0,0 +1,232 @@
+"""
+Incremental ticket SLA metrics.
+Durations are folded into per-guild daily aggregates as events happen: a
+counter/total row plus a log-scale histogram used as a percentile sketch, and
+per-staff throughput counters. Reporting over a window only sums a handful of
+daily rows instead of scanning tickets. All-time counters are kept alongside
+and seeded once from the tickets table, so they include tickets from before
+metrics were collected; legacy tickets without a guild are added once one is
+assigned to them.
+"""
+
+import math
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from utils.database import DATABASE_NAME
+
+SKETCH_BASE = 1.25  # Bucket width ratio; percentiles are accurate to about ±12%
+
+METRIC_FIRST_RESPONSE = "first_response"
+METRIC_CLAIM = "claim"
+METRIC_CLOSE = "close"
+
+STAFF_COLUMNS = ("claimed", "closed", "responses")
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def sketch_bucket(seconds: float) -> int:
+    return int(math.log1p(max(seconds, 0)) / math.log(SKETCH_BASE))
+
+
+def sketch_value(bucket: int) -> float:
+    """Midpoint (in log space) of a bucket's range"""
+    return SKETCH_BASE ** (bucket + 0.5) - 1
+
+
+def sketch_percentile(buckets: List[Tuple[int, int]], q: float) -> Optional[float]:
+    """Approximate the q-quantile (0-1) of a merged histogram of (bucket, count)"""
+    total = sum(count for _, count in buckets)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for bucket, count in sorted(buckets):
+        seen += count
+        if seen >= rank:
+            return sketch_value(bucket)
+    return sketch_value(max(bucket for bucket, _ in buckets))
+
+
+def ticket_age_seconds(created_at: str) -> float:
+    """Seconds since a tickets.created_at value (SQLite CURRENT_TIMESTAMP, UTC)"""
+    created = datetime.fromisoformat(created_at.replace(' ', 'T')).replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - created).total_seconds()
+
+
+class TicketMetrics:
+    """Writes and reads the per-guild aggregate tables"""
+
+    def __init__(self, db_path: str = DATABASE_NAME):
+        self.db_path = db_path
+        self._init_database()
+
+    def _init_database(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_metric_daily (
+                guild_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                count INTEGER DEFAULT 0,
+                total_seconds REAL DEFAULT 0,
+                PRIMARY KEY (guild_id, day, metric)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_metric_buckets (
+                guild_id INTEGER NOT NULL,
+                metric TEXT NOT NULL,
+                day TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                count INTEGER DEFAULT 0,
+                PRIMARY KEY (guild_id, metric, day, bucket)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_staff_daily (
+                guild_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                staff_id INTEGER NOT NULL,
+                claimed INTEGER DEFAULT 0,
+                closed INTEGER DEFAULT 0,
+                responses INTEGER DEFAULT 0,
+                PRIMARY KEY (guild_id, day, staff_id)
+            )
+        ''')
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('ticket_metric_totals', 'tickets')")
+        existing = {row[0] for row in cursor.fetchall()}
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_metric_totals (
+                guild_id INTEGER NOT NULL,
+                metric TEXT NOT NULL,
+                count INTEGER DEFAULT 0,
+                PRIMARY KEY (guild_id, metric)
+            )
+        ''')
+        if 'ticket_metric_totals' not in existing and 'tickets' in existing:
+            # First run: start the all-time counters from the tickets created so far
+            cursor.execute('''
+                INSERT INTO ticket_metric_totals (guild_id, metric, count)
+                SELECT guild_id, 'opened', COUNT(*) FROM tickets
+                WHERE guild_id IS NOT NULL AND status != 'pending' GROUP BY guild_id
+            ''')
+            cursor.execute(f'''
+                INSERT INTO ticket_metric_totals (guild_id, metric, count)
+                SELECT guild_id, '{METRIC_CLOSE}', COUNT(*) FROM tickets
+                WHERE guild_id IS NOT NULL AND status = 'closed' GROUP BY guild_id
+            ''')
+        conn.commit()
+        conn.close()
+
+    def record(self, guild_id: int, metric: str, seconds: Optional[float] = None,
+               staff_id: Optional[int] = None, staff_column: Optional[str] = None):
+        """Count one event, optionally with a duration and a staff throughput credit"""
+        day = _today()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO ticket_metric_daily (guild_id, day, metric, count, total_seconds)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT(guild_id, day, metric) DO UPDATE SET
+                count = count + 1,
+                total_seconds = total_seconds + excluded.total_seconds
+        ''', (guild_id, day, metric, seconds or 0))
+        cursor.execute('''
+            INSERT INTO ticket_metric_totals (guild_id, metric, count) VALUES (?, ?, 1)
+            ON CONFLICT(guild_id, metric) DO UPDATE SET count = count + 1
+        ''', (guild_id, metric))
+
+        if seconds is not None:
+            cursor.execute('''
+                INSERT INTO ticket_metric_buckets (guild_id, metric, day, bucket, count)
+                VALUES (?, ?, ?, ?, 1)
+                ON CONFLICT(guild_id, metric, day, bucket) DO UPDATE SET count = count + 1
+            ''', (guild_id, metric, day, sketch_bucket(seconds)))
+
+        if staff_id is not None and staff_column in STAFF_COLUMNS:
+            cursor.execute(f'''
+                INSERT INTO ticket_staff_daily (guild_id, day, staff_id, {staff_column})
+                VALUES (?, ?, ?, 1)
+                ON CONFLICT(guild_id, day, staff_id) DO UPDATE SET {staff_column} = {staff_column} + 1
+            ''', (guild_id, day, staff_id))
+
+        conn.commit()
+        conn.close()
+
+    def credit_tickets(self, ticket_ids: List[int]):
+        """Add tickets that were just given a guild to the all-time counters (the seed skipped them)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        for start in range(0, len(ticket_ids), 500):
+            chunk = ticket_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f'''
+                SELECT guild_id, COUNT(*), SUM(status = 'closed') FROM tickets
+                WHERE ticket_id IN ({placeholders}) AND guild_id IS NOT NULL AND status != 'pending'
+                GROUP BY guild_id
+            ''', chunk)
+            for guild_id, opened, closed in cursor.fetchall():
+                for metric, count in (("opened", opened), (METRIC_CLOSE, closed)):
+                    if count:
+                        cursor.execute('''
+                            INSERT INTO ticket_metric_totals (guild_id, metric, count) VALUES (?, ?, ?)
+                            ON CONFLICT(guild_id, metric) DO UPDATE SET count = count + excluded.count
+                        ''', (guild_id, metric, count))
+        conn.commit()
+        conn.close()
+
+    def totals(self, guild_id: int) -> Dict[str, int]:
+        """All-time event counts per metric"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.execute('SELECT metric, count FROM ticket_metric_totals WHERE guild_id = ?', (guild_id,))
+        totals = dict(cursor.fetchall())
+        conn.close()
+        return totals
+
+    def summary(self, guild_id: int, days: int = 30) -> Dict[str, object]:
+        """Counts, means, percentiles and top staff for the last `days` days"""
+        since = f"-{days - 1} days"
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT metric, SUM(count), SUM(total_seconds) FROM ticket_metric_daily
+            WHERE guild_id = ? AND day >= date('now', ?)
+            GROUP BY metric
+        ''', (guild_id, since))
+        counters = {metric: (count, total) for metric, count, total in cursor.fetchall()}
+
+        durations = {}
+        for metric in (METRIC_FIRST_RESPONSE, METRIC_CLAIM, METRIC_CLOSE):
+            cursor.execute('''
+                SELECT bucket, SUM(count) FROM ticket_metric_buckets
+                WHERE guild_id = ? AND metric = ? AND day >= date('now', ?)
+                GROUP BY bucket
+            ''', (guild_id, metric, since))
+            buckets = cursor.fetchall()
+            count, total = counters.get(metric, (0, 0))
+            durations[metric] = {
+                "count": count,
+                "mean": total / count if count else None,
+                "p50": sketch_percentile(buckets, 0.5),
+                "p90": sketch_percentile(buckets, 0.9),
+            }
+
+        cursor.execute('''
+            SELECT staff_id, SUM(claimed), SUM(closed), SUM(responses) FROM ticket_staff_daily
+            WHERE guild_id = ? AND day >= date('now', ?)
+            GROUP BY staff_id
+            ORDER BY SUM(closed) + SUM(claimed) + SUM(responses) DESC
+            LIMIT 5
+        ''', (guild_id, since))
+        staff = cursor.fetchall()
+        conn.close()
+
+        return {"counters": counters, "durations": durations, "staff": staff}
@@ -0,0 +1,162 @@
+"""
+Streaming transcript export for ticket threads.
+Messages are written one at a time to a spooled temp file, so memory use stays
+bounded no matter how long the ticket is.
+"""
+
+import gzip
+import html
+import json
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import discord
+
+TRANSCRIPT_FORMATS = ("txt", "jsonl", "html")
+
+SPOOL_MAX_SIZE = 1024 * 1024           # Bytes kept in memory before spilling to disk
+COMPRESS_THRESHOLD = 1024 * 1024       # Transcripts larger than this are gzipped for upload
+COPY_CHUNK_SIZE = 64 * 1024
+
+HTML_STYLE = (
+    "body{font-family:Segoe UI,Helvetica,Arial,sans-serif;background:#313338;color:#dbdee1;margin:24px}"
+    "h1{font-size:20px;margin:0 0 4px}.meta{color:#949ba4;font-size:12px;margin-bottom:16px}"
+    ".msg{padding:6px 0;border-bottom:1px solid #3f4147}.author{font-weight:600;color:#f2f3f5}"
+    ".ts{color:#949ba4;font-size:12px;margin-left:6px}.content{white-space:pre-wrap;margin-top:2px}"
+    ".att a{color:#00a8fc;font-size:13px}"
+)
+
+
+def message_record(message: discord.Message) -> Dict[str, Any]:
+    """Flatten a message into the fields every transcript format uses"""
+    return {
+        "id": message.id,
+        "timestamp": message.created_at.strftime("%Y-%m-%d %H:%M:%S UTC"),
+        "author": message.author.display_name,
+        "author_id": message.author.id,
+        "content": message.content,
+        # Attachment IDs stay valid after the CDN URL expires; the files are archived under them
+        "attachments": [
+            {"id": att.id, "filename": att.filename, "url": att.url, "size": att.size}
+            for att in message.attachments
+        ],
+    }
+
+
+class TranscriptWriter:
+    """Incrementally writes a ticket transcript in one of TRANSCRIPT_FORMATS"""
+
+    def __init__(self, fmt: str, ticket_id: int, title: Optional[str] = None):
+        if fmt not in TRANSCRIPT_FORMATS:
+            raise ValueError(f"Unknown transcript format: {fmt}")
+        self.fmt = fmt
+        self.ticket_id = ticket_id
+        self.title = title or f"Ticket #{ticket_id}"
+        self.message_count = 0
+        self.size = 0  # Uncompressed bytes written
+        self.generated_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+        self._file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode="w+b")
+        self._payload: Optional[Any] = None
+        self._finished = False
+        self._write_header()
+
+    def _write(self, text: str):
+        self.size += self._file.write(text.encode("utf-8"))
+
+    def _write_header(self):
+        if self.fmt == "txt":
+            self._write(f"Ticket #{self.ticket_id} Transcript\n")
+            self._write(f"Generated: {self.generated_at}\n")
+            self._write("=" * 80 + "\n\n")
+        elif self.fmt == "jsonl":
+            self._write(json.dumps({
+                "type": "ticket",
+                "ticket_id": self.ticket_id,
+                "title": self.title,
+                "generated_at": self.generated_at,
+            }, ensure_ascii=False) + "\n")
+        else:
+            title = html.escape(self.title)
+            self._write(
+                "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+                f"<title>{title}</title><style>{HTML_STYLE}</style></head><body>"
+                f"<h1>{title}</h1><div class=\"meta\">Ticket #{self.ticket_id} &middot; "
+                f"Generated {html.escape(self.generated_at)}</div>\n"
+            )
+
+    def write_message(self, record: Dict[str, Any]):
+        """Append one message (as produced by message_record)"""
+        self.message_count += 1
+        if self.fmt == "txt":
+            content = record["content"] or "[No text content]"
+            for att in record["attachments"]:
+                content += f"\n[Attachment {att['id']}: {att['filename']} {att['url']}]"
+            self._write(f"[{record['timestamp']}] {record['author']}: {content}\n")
+        elif self.fmt == "jsonl":
+            self._write(json.dumps({"type": "message", **record}, ensure_ascii=False) + "\n")
+        else:
+            attachments = "".join(
+                f"<div class=\"att\" data-attachment-id=\"{att['id']}\"><a href=\"{html.escape(att['url'])}\">"
+                f"{html.escape(att['filename'])}</a> <span class=\"ts\">#{att['id']}</span></div>"
+                for att in record["attachments"]
+            )
+            self._write(
+                f"<div class=\"msg\"><span class=\"author\">{html.escape(record['author'])}</span>"
+                f"<span class=\"ts\">{html.escape(record['timestamp'])}</span>"
+                f"<div class=\"content\">{html.escape(record['content'] or '')}</div>{attachments}</div>\n"
+            )
+
+    def finish(self):
+        """Write the closing part of the document"""
+        if self._finished:
+            return
+        if self.fmt == "html":
+            self._write(f"<div class=\"meta\">{self.message_count} messages</div></body></html>\n")
+        self._finished = True
+
+    @property
+    def filename(self) -> str:
+        return f"ticket-{self.ticket_id}-transcript.{self.fmt}"
+
+    def _compressed(self) -> Optional[tempfile.SpooledTemporaryFile]:
+        """The gzipped copy of a large transcript, built on first use; None for small ones"""
+        self.finish()
+        if self.size <= COMPRESS_THRESHOLD:
+            return None
+        if self._payload is None:
+            # Compress chunk by chunk into a second spooled file
+            self._payload = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode="w+b")
+            self._file.seek(0)
+            with gzip.GzipFile(filename=self.filename, mode="wb", fileobj=self._payload) as gz:
+                shutil.copyfileobj(self._file, gz, COPY_CHUNK_SIZE)
+        return self._payload
+
+    def to_file(self) -> discord.File:
+        """Build an upload for the transcript, gzipped when it is large"""
+        payload = self._compressed()
+        if payload is None:
+            self._file.seek(0)
+            return discord.File(self._file, filename=self.filename)
+        payload.seek(0)
+        return discord.File(payload, filename=f"{self.filename}.gz")
+
+    def upload_size(self) -> int:
+        """Size in bytes of what to_file uploads"""
+        payload = self._compressed()
+        if payload is None:
+            return self.size
+        return payload.seek(0, 2)
+
+    def close(self):
+        # discord.File stubs out the close() of files it wraps, so call the class method directly
+        tempfile.SpooledTemporaryFile.close(self._file)
+        if self._payload is not None:
+            tempfile.SpooledTemporaryFile.close(self._payload)
+
+    def __enter__(self) -> "TranscriptWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()